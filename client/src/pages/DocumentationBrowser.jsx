@@ -8,6 +8,7 @@ import {
   getDocumentationRevision,
   downloadDocumentationRevision,
   updateDocumentationRevision,
+  searchDocumentation,
 } from "../services/documentationService";
 
 const fmtElapsed = (secs) => {
@@ -37,7 +38,10 @@ const SidebarSection = ({ title, items, selectedId, onSelect }) => (
             onClick={() => onSelect(it.id)}
             title={`Rev ${it.id}`}
           >
-            <div className="text-xs font-mono truncate">{it.id}</div>
+            <div className="text-xs font-mono truncate">
+              {it.pinned ? "📌 " : ""}
+              {it.id}
+            </div>
             <div className="text-[10px] text-gray-500 truncate">
               {(it.created_at_iso ||
                 new Date(it.created_at * 1000).toISOString()) +
@@ -57,11 +61,17 @@ export default function DocumentationBrowser() {
 
   const [loading, setLoading] = useState(true);
   const [revisions, setRevisions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [selectedId, setSelectedId] = useState(null);
   const [selected, setSelected] = useState(null);
 
   const [filter, setFilter] = useState("all"); // all | html | pdf | md
 
+  // Search across revisions
+  const [query, setQuery] = useState("");
+  const [search, setSearch] = useState(null); // { results, page, has_more }
+  const [searching, setSearching] = useState(false);
+
   // Metadata editing state
   const [editingMeta, setEditingMeta] = useState(false);
   const [metaTitle, setMetaTitle] = useState("");
@@ -77,6 +87,7 @@ export default function DocumentationBrowser() {
         const data = await listDocumentationRevisions(projectId, token);
         const revs = data?.revisions || [];
         setRevisions(revs);
+        setNextCursor(data?.next_cursor || null);
         if (revs[0]?.id) setSelectedId(revs[0].id);
       } catch (e) {
         setRevisions([]);
@@ -121,6 +132,42 @@ export default function DocumentationBrowser() {
     return groups;
   }, [revisions]);
 
+  const runSearch = async (page = 0) => {
+    const q = query.trim();
+    if (!q) {
+      setSearch(null);
+      return;
+    }
+    setSearching(true);
+    try {
+      const data = await searchDocumentation(projectId, token, q, { page });
+      setSearch((prev) =>
+        page > 0 && prev
+          ? { ...data, results: [...prev.results, ...(data?.results || [])] }
+          : data
+      );
+    } catch (e) {
+      setSearch({ results: [], page: 0, has_more: false });
+    } finally {
+      setSearching(false);
+    }
+  };
+
+  const onTogglePin = async (pinned) => {
+    if (!selected?.id) return;
+    try {
+      await updateDocumentationRevision(projectId, selected.id, token, {
+        pinned,
+      });
+      setSelected((prev) => (prev ? { ...prev, pinned } : prev));
+      setRevisions((prev) =>
+        prev.map((r) => (r.id === selected.id ? { ...r, pinned } : r))
+      );
+    } catch (e) {
+      // no-op
+    }
+  };
+
   const onSaveMeta = async () => {
     if (!selected?.id) return;
     setSavingMeta(true);
@@ -135,9 +182,10 @@ export default function DocumentationBrowser() {
       const rev = await getDocumentationRevision(projectId, selected.id, token);
       setSelected(rev);
       setEditingMeta(false);
-      // Refresh list to reflect any metadata displayed there in future
-      const data = await listDocumentationRevisions(projectId, token);
-      setRevisions(data?.revisions || []);
+      // Patch the edited row in place so older pages loaded so far stay listed
+      setRevisions((prev) =>
+        prev.map((r) => (r.id === selected.id ? { ...r, ...payload } : r))
+      );
     } catch (e) {
       // no-op
     } finally {
@@ -170,6 +218,67 @@ export default function DocumentationBrowser() {
           </div>
         </Card.Header>
         <Card.Content className="overflow-auto space-y-4">
+          <form
+            onSubmit={(e) => {
+              e.preventDefault();
+              runSearch(0);
+            }}
+          >
+            <label className="block text-xs text-gray-600 mb-1">
+              Search functions, classes and docstrings
+            </label>
+            <input
+              type="search"
+              value={query}
+              onChange={(e) => setQuery(e.target.value)}
+              placeholder="e.g. parse token"
+              className="w-full border rounded px-2 py-1 text-sm"
+            />
+          </form>
+          {search && (
+            <div className="space-y-1">
+              {searching && !search.results?.length ? (
+                <div className="text-xs text-gray-500">Searching…</div>
+              ) : null}
+              {!searching && !search.results?.length ? (
+                <div className="text-xs text-gray-500">No matches</div>
+              ) : null}
+              {(search.results || []).map((hit, i) => (
+                <button
+                  key={`${hit.file}-${hit.name}-${i}`}
+                  type="button"
+                  onClick={() =>
+                    hit.latest_revision_id &&
+                    setSelectedId(hit.latest_revision_id)
+                  }
+                  className="block w-full text-left rounded px-2 py-1 hover:bg-gray-100"
+                >
+                  <div className="text-sm font-medium">
+                    {hit.parent_class ? `${hit.parent_class}.` : ""}
+                    {hit.name}{" "}
+                    <span className="text-xs text-gray-500">
+                      {hit.kind} • {hit.file}
+                    </span>
+                  </div>
+                  {hit.snippet && (
+                    <div className="text-xs text-gray-600 truncate">
+                      {hit.snippet}
+                    </div>
+                  )}
+                </button>
+              ))}
+              {search.has_more && (
+                <Button
+                  variant="outline"
+                  size="sm"
+                  disabled={searching}
+                  onClick={() => runSearch((search.page || 0) + 1)}
+                >
+                  More results
+                </Button>
+              )}
+            </div>
+          )}
           <div>
             <label className="block text-xs text-gray-600 mb-1">
               Filter by format
@@ -209,6 +318,25 @@ export default function DocumentationBrowser() {
               onSelect={setSelectedId}
             />
           ) : null}
+          {nextCursor && (
+            <Button
+              variant="outline"
+              size="sm"
+              onClick={async () => {
+                try {
+                  const data = await listDocumentationRevisions(
+                    projectId,
+                    token,
+                    nextCursor
+                  );
+                  setRevisions((prev) => [...prev, ...(data?.revisions || [])]);
+                  setNextCursor(data?.next_cursor || null);
+                } catch {}
+              }}
+            >
+              Load older revisions
+            </Button>
+          )}
         </Card.Content>
         <Card.Footer className="flex justify-between">
           <Button
@@ -268,6 +396,14 @@ export default function DocumentationBrowser() {
                   new Date(selected.created_at * 1000).toISOString()) +
                   fmtElapsed(selected.generation_time_seconds)}
               </div>
+              <Button
+                size="sm"
+                variant="outline"
+                title="Pinned revisions are kept out of the archive"
+                onClick={() => onTogglePin(!selected.pinned)}
+              >
+                {selected.pinned ? "Unpin" : "Pin"}
+              </Button>
               <Button
                 size="sm"
                 variant="secondary"
@@ -1,10 +1,13 @@
-import React, { useEffect, useState } from "react";
+import React, { useCallback, useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/authContext";
 import { Button, Card, LoadingSpinner } from "../components/ui";
 import {
   getDocumentationRevision,
+  getDocumentationToc,
+  getDocumentationItems,
   downloadDocumentationRevision,
+  downloadDocumentationSite,
   updateDocumentationRevision,
 } from "../services/documentationService";
 import { updateProject } from "../services/projectService";
@@ -26,20 +29,45 @@ export default function DocumentationDetails() {
   const [metaFilename, setMetaFilename] = useState("");
   const [savingMeta, setSavingMeta] = useState(false);
   const [metaDescription, setMetaDescription] = useState("");
+  // Item bodies are fetched a page at a time: { [pageIndex]: items }
+  const [pages, setPages] = useState({});
+  const [loadingPage, setLoadingPage] = useState(false);
+  const [pendingAnchor, setPendingAnchor] = useState(null);
+  // Full rendered document (HTML/Markdown) is only loaded on request
+  const [fullContent, setFullContent] = useState(null);
+  const [loadingFull, setLoadingFull] = useState(false);
+
+  const loadPage = useCallback(
+    async (page, anchor) => {
+      if (!projectId || !revisionId || !token) return;
+      setLoadingPage(true);
+      try {
+        const data = await getDocumentationItems(projectId, revisionId, token, {
+          page,
+          anchor,
+        });
+        setPages((prev) => ({ ...prev, [data.page]: data.items }));
+      } catch (e) {
+        logger.error("Failed to load documentation items", e);
+      } finally {
+        setLoadingPage(false);
+      }
+    },
+    [projectId, revisionId, token]
+  );
 
   useEffect(() => {
     let mounted = true;
     const load = async () => {
       if (!projectId || !revisionId || !token) return;
       setLoading(true);
+      setPages({});
+      setFullContent(null);
       try {
-        const data = await getDocumentationRevision(
-          projectId,
-          revisionId,
-          token
-        );
+        const data = await getDocumentationToc(projectId, revisionId, token);
         if (mounted) {
           setDoc(data);
+          if (data?.toc?.entries > 0) loadPage(0);
           // Initialize editor fields from loaded doc
           setMetaTitle(data?.title || "");
           setMetaFilename(data?.filename || "");
@@ -61,7 +89,17 @@ export default function DocumentationDetails() {
     return () => {
       mounted = false;
     };
-  }, [projectId, revisionId, token]);
+  }, [projectId, revisionId, token, loadPage]);
+
+  useEffect(() => {
+    // Scroll to an item picked from the contents once its page is loaded
+    if (!pendingAnchor) return;
+    const el = document.getElementById(`item-${pendingAnchor}`);
+    if (el) {
+      el.scrollIntoView({ behavior: "smooth", block: "start" });
+      setPendingAnchor(null);
+    }
+  }, [pendingAnchor, pages]);
 
   useEffect(() => {
     // If PDF, prefetch as blob and create object URL to render under auth
@@ -86,15 +124,13 @@ export default function DocumentationDetails() {
     fetchPdf();
   }, [doc, projectId, revisionId, token]);
 
-  const onDownload = async () => {
+  const onDownload = async (site = false) => {
     if (!projectId || !revisionId || !token) return;
     setDownloading(true);
     try {
-      const res = await downloadDocumentationRevision(
-        projectId,
-        revisionId,
-        token
-      );
+      const res = site
+        ? await downloadDocumentationSite(projectId, revisionId, token)
+        : await downloadDocumentationRevision(projectId, revisionId, token);
       const blob = new Blob([res.data], {
         type: res.headers["content-type"] || "application/octet-stream",
       });
@@ -126,13 +162,10 @@ export default function DocumentationDetails() {
       if (typeof metaDescription === "string")
         payload.description = metaDescription;
       await updateDocumentationRevision(projectId, revisionId, token, payload);
-      // Re-fetch to refresh preview content (title affects rendered output)
-      const updated = await getDocumentationRevision(
-        projectId,
-        revisionId,
-        token
-      );
+      // Re-fetch metadata; the full preview (title affects it) reloads on demand
+      const updated = await getDocumentationToc(projectId, revisionId, token);
       setDoc(updated);
+      setFullContent(null);
       setEditingMeta(false);
     } catch (e) {
       logger.error("Failed to update metadata", e);
@@ -141,6 +174,27 @@ export default function DocumentationDetails() {
     }
   };
 
+  const onLoadFull = async () => {
+    if (!projectId || !revisionId || !token) return;
+    setLoadingFull(true);
+    try {
+      const data = await getDocumentationRevision(projectId, revisionId, token);
+      setFullContent(data?.content || "");
+    } catch (e) {
+      logger.error("Failed to load rendered output", e);
+    } finally {
+      setLoadingFull(false);
+    }
+  };
+
+  const onJumpTo = (entry) => {
+    const pageSize = doc?.page_size || 50;
+    if (!pages[Math.floor(entry.index / pageSize)]) {
+      loadPage(undefined, entry.anchor);
+    }
+    setPendingAnchor(entry.anchor);
+  };
+
   if (loading) {
     return (
       <div className="p-6">
@@ -163,7 +217,13 @@ export default function DocumentationDetails() {
   }
 
   const fmt = (doc.format || "HTML").toUpperCase();
-  const totalItems = Array.isArray(doc.results) ? doc.results.length : 0;
+  const toc = doc.toc || { entries: 0, functions: [], classes: [] };
+  const totalItems = doc.item_count ?? toc.item_count ?? 0;
+  const pageSize = doc.page_size || 50;
+  const totalPages = Math.ceil((toc.entries || 0) / pageSize);
+  const loadedPages = Object.keys(pages)
+    .map(Number)
+    .sort((a, b) => a - b);
   const generatedCount = totalItems; // all items generated for a revision
   const successRate = totalItems > 0 ? 100 : 0;
   const elapsedSecs =
@@ -207,7 +267,18 @@ export default function DocumentationDetails() {
           <Button variant="secondary" onClick={() => setEditingMeta((v) => !v)}>
             {editingMeta ? "Cancel" : "Edit Metadata"}
           </Button>
-          <Button variant="primary" onClick={onDownload} disabled={downloading}>
+          <Button
+            variant="secondary"
+            onClick={() => onDownload(true)}
+            disabled={downloading}
+          >
+            Export Site (zip)
+          </Button>
+          <Button
+            variant="primary"
+            onClick={() => onDownload()}
+            disabled={downloading}
+          >
             {downloading ? "Downloading..." : "Download"}
           </Button>
         </div>
@@ -316,59 +387,148 @@ export default function DocumentationDetails() {
                 Loading PDF preview...
               </div>
             )
+          ) : fullContent === null ? (
+            <div className="flex items-center gap-3 text-sm text-gray-500">
+              <span>
+                The full document is loaded on request; browse items below.
+              </span>
+              <Button
+                variant="secondary"
+                onClick={onLoadFull}
+                disabled={loadingFull}
+              >
+                {loadingFull ? "Loading..." : "Show full preview"}
+              </Button>
+            </div>
           ) : fmt === "MARKDOWN" ? (
             <SyntaxHighlighter
               language="markdown"
               style={atomOneLight}
               customStyle={{ maxHeight: "75vh" }}
             >
-              {doc.content}
+              {fullContent}
             </SyntaxHighlighter>
           ) : (
             <iframe
               title="doc-html"
-              srcDoc={doc.content}
+              srcDoc={fullContent}
               className="w-full h-[75vh] border rounded"
             />
           )}
         </Card.Content>
       </Card>
 
-      {/* Items Summary Grid (original simple view) */}
-      {Array.isArray(doc.results) && doc.results.length > 0 && (
+      {/* Items: contents up front, bodies loaded page by page */}
+      {toc.entries > 0 && (
         <Card>
           <Card.Header>
-            <Card.Title>Items Overview</Card.Title>
+            <Card.Title>Items</Card.Title>
           </Card.Header>
           <Card.Content>
-            <div className="grid grid-cols-1 md:grid-cols-2 xl:grid-cols-3 gap-4">
-              {doc.results.map((r, idx) => (
-                <div key={idx} className="border rounded p-3 bg-white">
-                  <div className="flex items-center gap-2 mb-1">
-                    <span
-                      className={`px-2 py-0.5 text-xs rounded border uppercase ${
-                        r.type === "function"
-                          ? "bg-green-100 text-green-800 border-green-200"
-                          : r.type === "class"
-                          ? "bg-blue-100 text-blue-800 border-blue-200"
-                          : "bg-purple-100 text-purple-800 border-purple-200"
-                      }`}
+            <div className="grid grid-cols-1 lg:grid-cols-[260px_1fr] gap-4">
+              <nav className="border rounded p-3 max-h-[75vh] overflow-auto text-sm">
+                <div className="font-semibold mb-1">Functions</div>
+                {toc.functions.length === 0 && (
+                  <div className="text-gray-400">None</div>
+                )}
+                {toc.functions.map((e) => (
+                  <button
+                    key={e.anchor}
+                    className="block text-left w-full py-0.5 hover:underline font-mono break-all"
+                    onClick={() => onJumpTo(e)}
+                  >
+                    {e.name}
+                  </button>
+                ))}
+                <div className="font-semibold mt-3 mb-1">Classes</div>
+                {toc.classes.length === 0 && (
+                  <div className="text-gray-400">None</div>
+                )}
+                {toc.classes.map((c) => (
+                  <div key={c.anchor}>
+                    <button
+                      className="block text-left w-full py-0.5 hover:underline font-mono break-all"
+                      onClick={() => onJumpTo(c)}
                     >
-                      {r.type}
-                    </span>
-                    <span className="font-mono text-sm break-all font-semibold">
-                      {r.name}
-                      {r.parent_class ? ` (class ${r.parent_class})` : ""}
-                    </span>
-                  </div>
-                  <div className="text-xs text-gray-500 break-all mb-2">
-                    {r.file}
+                      {c.name}
+                    </button>
+                    {c.methods.map((m) => (
+                      <button
+                        key={m.anchor}
+                        className="block text-left w-full py-0.5 pl-4 text-gray-600 hover:underline font-mono break-all"
+                        onClick={() => onJumpTo(m)}
+                      >
+                        {m.name}
+                      </button>
+                    ))}
                   </div>
-                  <pre className="bg-gray-50 rounded p-2 text-xs overflow-auto max-h-40 whitespace-pre-wrap">
-                    {r.generated_docstring}
-                  </pre>
-                </div>
-              ))}
+                ))}
+              </nav>
+              <div className="space-y-3 max-h-[75vh] overflow-auto">
+                {loadedPages.map((page, i) => (
+                  <React.Fragment key={page}>
+                    {i > 0 && loadedPages[i - 1] !== page - 1 && (
+                      <Button
+                        variant="secondary"
+                        onClick={() => loadPage(loadedPages[i - 1] + 1)}
+                        disabled={loadingPage}
+                      >
+                        Show items {(loadedPages[i - 1] + 1) * pageSize + 1}–
+                        {page * pageSize}
+                      </Button>
+                    )}
+                    {pages[page].map((r) => (
+                      <div
+                        key={r.anchor}
+                        id={`item-${r.anchor}`}
+                        className="border rounded p-3 bg-white"
+                      >
+                        <div className="flex items-center gap-2 mb-1">
+                          <span
+                            className={`px-2 py-0.5 text-xs rounded border uppercase ${
+                              r.kind === "function"
+                                ? "bg-green-100 text-green-800 border-green-200"
+                                : r.kind === "class"
+                                ? "bg-blue-100 text-blue-800 border-blue-200"
+                                : "bg-purple-100 text-purple-800 border-purple-200"
+                            }`}
+                          >
+                            {r.kind}
+                          </span>
+                          <span className="font-mono text-sm break-all font-semibold">
+                            {r.title}
+                          </span>
+                        </div>
+                        <div className="text-xs text-gray-500 break-all mb-2">
+                          {r.file}
+                        </div>
+                        {r.code && (
+                          <pre className="bg-gray-50 rounded p-2 text-xs overflow-auto max-h-60 whitespace-pre-wrap">
+                            {r.code}
+                          </pre>
+                        )}
+                        {r.docstring && (
+                          <pre className="rounded p-2 mt-2 text-xs border overflow-auto max-h-60 whitespace-pre-wrap">
+                            {r.docstring}
+                          </pre>
+                        )}
+                      </div>
+                    ))}
+                  </React.Fragment>
+                ))}
+                {loadedPages.length > 0 &&
+                  loadedPages[loadedPages.length - 1] < totalPages - 1 && (
+                    <Button
+                      variant="secondary"
+                      onClick={() =>
+                        loadPage(loadedPages[loadedPages.length - 1] + 1)
+                      }
+                      disabled={loadingPage}
+                    >
+                      {loadingPage ? "Loading..." : "Load more"}
+                    </Button>
+                  )}
+              </div>
             </div>
           </Card.Content>
         </Card>
@@ -213,6 +213,8 @@ export default function GenerateDocumentation() {
             setModelStatus("booting");
           } else if (modelHeader === "paused") {
             setModelStatus("paused");
+          } else if (modelHeader === "failing") {
+            setModelStatus("failing");
           } else if (status && status >= 500) {
             setModelStatus("booting");
           } else if (status && status >= 400) {
@@ -583,6 +585,8 @@ export default function GenerateDocumentation() {
                 ? "Model service is booting up..."
                 : modelStatus === "paused"
                 ? "Model is currently unavailable. Please try again later."
+                : modelStatus === "failing"
+                ? "Model service is returning errors. Please try again later."
                 : modelStatus === "processing"
                 ? "Generating documentation"
                 : "Generating documentation"}
@@ -36,6 +36,7 @@ const AdminDocs = () => {
   const { token } = useAuth();
   const navigate = useNavigate();
   const [rows, setRows] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -44,7 +45,8 @@ const AdminDocs = () => {
       setLoading(true);
       try {
         const data = await adminListDocumentations(token);
-        setRows(Array.isArray(data) ? data : []);
+        setRows(data?.documentations || []);
+        setNextCursor(data?.next_cursor || null);
       } catch (e) {
         setRows([]);
       } finally {
@@ -54,6 +56,15 @@ const AdminDocs = () => {
     load();
   }, [token]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const data = await adminListDocumentations(token, nextCursor);
+      setRows((prev) => [...prev, ...(data?.documentations || [])]);
+      setNextCursor(data?.next_cursor || null);
+    } catch {}
+  };
+
   const onDelete = async (doc) => {
     if (!window.confirm("Delete this documentation revision?")) return;
     try {
@@ -118,6 +129,11 @@ const AdminDocs = () => {
               onOpen={onOpen}
             />
           ))}
+          {nextCursor && (
+            <Button variant="outline" size="sm" onClick={loadMore}>
+              Load more
+            </Button>
+          )}
         </div>
       )}
     </main>
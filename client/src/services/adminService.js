@@ -86,9 +86,10 @@ export async function cleanupOrphans(token) {
 }
 
 // Documentations
-export async function adminListDocumentations(token) {
+export async function adminListDocumentations(token, cursor) {
   const res = await axios.get(`${API_URL}/admin/documentations`, {
     headers: { Authorization: `Bearer ${token}` },
+    params: cursor ? { cursor } : undefined,
   });
   return res.data;
 }
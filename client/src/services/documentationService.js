@@ -61,7 +61,21 @@ export async function generateDocumentation(projectId, token, opts = {}) {
   }
 }
 
-export async function listDocumentationRevisions(projectId, token) {
+export async function cancelDocumentationGeneration(projectId, token) {
+  try {
+    const res = await axios.post(
+      `${API_URL}/documentation/projects/${projectId}/generate/cancel`,
+      {},
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+    return res.data;
+  } catch (error) {
+    logger.error("Cancel generation error:", error.response?.data || error);
+    throw error;
+  }
+}
+
+export async function listDocumentationRevisions(projectId, token, cursor) {
   const res = await axios.get(
     `${API_URL}/documentation/projects/${projectId}/revisions`,
     {
@@ -70,7 +84,7 @@ export async function listDocumentationRevisions(projectId, token) {
         "Cache-Control": "no-cache",
         Pragma: "no-cache",
       },
-      params: { t: Date.now() },
+      params: cursor ? { t: Date.now(), cursor } : { t: Date.now() },
     }
   );
   return res.data;
@@ -86,6 +100,37 @@ export async function getDocumentationRevision(projectId, revisionId, token) {
   return res.data;
 }
 
+// Revision metadata and table of contents (no item bodies)
+export async function getDocumentationToc(projectId, revisionId, token) {
+  const res = await axios.get(
+    `${API_URL}/documentation/projects/${projectId}/revisions/${revisionId}/toc`,
+    {
+      headers: { Authorization: `Bearer ${token}` },
+    }
+  );
+  return res.data;
+}
+
+// One page of item bodies; pass `anchor` to get the page holding that item
+export async function getDocumentationItems(
+  projectId,
+  revisionId,
+  token,
+  { page = 0, pageSize, anchor } = {}
+) {
+  const params = { page };
+  if (pageSize) params.page_size = pageSize;
+  if (anchor) params.anchor = anchor;
+  const res = await axios.get(
+    `${API_URL}/documentation/projects/${projectId}/revisions/${revisionId}/items`,
+    {
+      headers: { Authorization: `Bearer ${token}` },
+      params,
+    }
+  );
+  return res.data;
+}
+
 export async function downloadDocumentationRevision(
   projectId,
   revisionId,
@@ -101,6 +146,38 @@ export async function downloadDocumentationRevision(
   return res;
 }
 
+// Ranked search over the project's documented items (all revisions unless revisionId)
+export async function searchDocumentation(
+  projectId,
+  token,
+  q,
+  { page = 0, limit, revisionId } = {}
+) {
+  const params = { q, page };
+  if (limit) params.limit = limit;
+  if (revisionId) params.revision_id = revisionId;
+  const res = await axios.get(
+    `${API_URL}/documentation/projects/${projectId}/search`,
+    {
+      headers: { Authorization: `Bearer ${token}` },
+      params,
+    }
+  );
+  return res.data;
+}
+
+// Static multi-page site (zip) with an offline search index
+export async function downloadDocumentationSite(projectId, revisionId, token) {
+  const res = await axios.get(
+    `${API_URL}/documentation/projects/${projectId}/revisions/${revisionId}/export/site`,
+    {
+      headers: { Authorization: `Bearer ${token}` },
+      responseType: "blob",
+    }
+  );
+  return res;
+}
+
 export async function updateDocumentationRevision(
   projectId,
   revisionId,
@@ -0,0 +1,87 @@
+"""
+Docstring cleaner micro-benchmarks.
+
+Times clean_for_markdown / clean_for_html / clean_for_pdf on typical generated
+docstrings, and strip_examples_sections on adversarial docstrings with thousands of
+"Example:" headers (back to back, and interleaved with headers that are kept). The
+per-header cost should stay flat as the header count grows.
+
+    python -m benchmarks.cleaner_bench
+    python -m benchmarks.cleaner_bench --headers 1000,10000,20000 --json
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.render_bench import _DOCSTRINGS
+from utils.doc_cleaner import clean_for_html, clean_for_markdown, clean_for_pdf, strip_examples_sections
+
+CLEANERS = {"markdown": clean_for_markdown, "html": clean_for_html, "pdf": clean_for_pdf}
+
+
+def adversarial(headers: int, interleaved: bool) -> str:
+    block = "Example:\n    >>> f()\n\n"
+    if interleaved:
+        # Kept headers between the examples: every section scan has to walk past them
+        block = "Usage:\n    call it\n" + block
+    return "Intro\n\n" + block * headers + "Raises:\n    ValueError: bad"
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run_bench(docstrings: int, headers: List[int], repeat: int) -> Dict[str, Any]:
+    corpus = [_DOCSTRINGS[i % len(_DOCSTRINGS)] for i in range(docstrings)]
+    report: Dict[str, Any] = {"docstrings": docstrings, "repeat": repeat}
+
+    typical = {fmt: _timed(lambda fn=fn: [fn(d) for d in corpus], repeat) for fmt, fn in CLEANERS.items()}
+    report["typical_us_per_docstring"] = {k: round(v / docstrings * 1e6, 2) for k, v in typical.items()}
+
+    rows = []
+    for n in headers:
+        for interleaved in (False, True):
+            text = adversarial(n, interleaved)
+            strip = _timed(lambda: strip_examples_sections(text), repeat)
+            html = _timed(lambda: clean_for_html(text), repeat)
+            rows.append({
+                "headers": n,
+                "interleaved": interleaved,
+                "strip_seconds": round(strip, 4),
+                "strip_us_per_header": round(strip / n * 1e6, 2),
+                "clean_html_seconds": round(html, 4),
+            })
+    report["adversarial"] = rows
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Docstring cleaner micro-benchmarks")
+    parser.add_argument("--docstrings", type=int, default=3000, help="typical docstrings cleaned per format")
+    parser.add_argument("--headers", default="1000,5000,20000", help="comma-separated Example header counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (median is reported)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = parser.parse_args()
+
+    headers = [int(h) for h in args.headers.split(",") if h.strip()]
+    report = run_bench(max(1, args.docstrings), headers, max(1, args.repeat))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"typical docstrings={report['docstrings']} repeat={report['repeat']} us/docstring: "
+          + " ".join(f"{k}={v:.1f}" for k, v in report["typical_us_per_docstring"].items()))
+    for row in report["adversarial"]:
+        shape = "interleaved" if row["interleaved"] else "back-to-back"
+        print(f"headers={row['headers']:>6} {shape:<12} strip={row['strip_seconds']:.4f}s "
+              f"({row['strip_us_per_header']:.2f} us/header) clean_html={row['clean_html_seconds']:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+End-to-end load benchmark for generate_documentation_with_hf against the HF stand-in.
+
+Seeds synthetic projects into MongoDB (use a throwaway DB_NAME), runs generations
+concurrently and reports throughput, p50/p95/p99 latency and retry amplification.
+
+    DB_NAME=exceptionals-bench python -m benchmarks.generation_bench --items 400 --runs 4 --concurrency 2
+    DB_NAME=exceptionals-bench python -m benchmarks.generation_bench --warmup-requests 5 --burst-every 40 --burst-length 5
+
+By default the stand-in runs in-process (httpx.ASGITransport); pass --endpoint to
+drive an external stand-in or a real endpoint instead (HF_TOKEN must be set then).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from bson import ObjectId
+
+from benchmarks.hf_standin import StandinConfig, create_app, _caster
+from controller.DocumentationController import generate_documentation_with_hf
+from utils.db import db
+from utils.hf_client import start_hf_client, close_hf_client, hf_metrics
+from utils.index_common import FETCH_CHUNK, chunks
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _synthetic_function(i: int, duplicate: bool) -> Dict[str, str]:
+    name = "helper" if duplicate else f"compute_{i}"
+    body = "\n".join(f"    total += value * {j}" for j in range(1 + i % 12)) if not duplicate else "    total += value"
+    return {
+        "name": name,
+        "code": f"def {name}(value, scale=1):\n    total = 0\n{body}\n    if total < 0:\n        raise ValueError('negative')\n    return total * scale",
+    }
+
+
+async def seed_project(db, items: int, files: int, duplicate_ratio: float) -> str:
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({
+        "_id": ObjectId(proj_id),
+        "name": f"bench-{proj_id[-6:]}",
+        "description": "Synthetic generation benchmark project",
+        "user_id": "bench",
+        "tags": ["bench"],
+        "status": "in_progress",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    })
+    per_file = max(1, items // max(1, files))
+    dup_every = int(1 / duplicate_ratio) if duplicate_ratio > 0 else 0
+    docs = []
+    n = 0
+    for f in range(files):
+        funcs = []
+        for _ in range(per_file if f < files - 1 else items - n):
+            funcs.append(_synthetic_function(n, bool(dup_every) and n % dup_every == 0))
+            n += 1
+        docs.append({"project_id": proj_id, "filename": f"pkg/module_{f}.py", "functions": funcs, "classes": []})
+    await db.files.insert_many(docs)
+    await db.preferences.insert_one({
+        "project_id": proj_id,
+        "directory_exclusion": {"exclude_files": [], "exclude_dirs": []},
+        "per_file_exclusion": [],
+        "format": "HTML",
+    })
+    return proj_id
+
+
+async def cleanup(db, project_ids: List[str]) -> None:
+    scope = {"project_id": {"$in": project_ids}}
+    refs = set()
+    for revisions in (db.documentations, db.documentation_archive):
+        async for doc in revisions.find(scope, {"result_refs": 1}):
+            refs.update(doc.get("result_refs") or [])
+    for name in (
+        "files", "preferences", "documentations", "documentation_archive", "documentation_search",
+        "generation_checkpoints", "generation_tasks", "symbols",
+    ):
+        await db[name].delete_many(scope)
+    await db.projects.delete_many({"_id": {"$in": [ObjectId(p) for p in project_ids]}})
+    # Result items are shared by content; keep the ones other revisions still point to
+    for chunk in chunks(sorted(refs), FETCH_CHUNK):
+        shared = set()
+        for revisions in (db.documentations, db.documentation_archive):
+            async for doc in revisions.find({"result_refs": {"$in": chunk}}, {"result_refs": 1}):
+                shared.update(doc.get("result_refs") or [])
+        await db.documentation_items.delete_many({"_id": {"$in": [r for r in chunk if r not in shared]}})
+
+
+async def run_bench(args) -> Dict[str, Any]:
+    standin_cfg = StandinConfig(**{f.name: getattr(args, f.name) for f in fields(StandinConfig)})
+    standin = None
+    if args.endpoint:
+        os.environ["HF_ENDPOINT"] = args.endpoint
+    else:
+        standin = create_app(standin_cfg)
+        os.environ["HF_ENDPOINT"] = "http://hf-standin/generate"
+        os.environ.setdefault("HF_TOKEN", "bench")
+
+    if standin is not None:
+        await start_hf_client(transport=httpx.ASGITransport(app=standin))
+    else:
+        await start_hf_client()
+
+    project_ids = [await seed_project(db, args.items, args.files, args.duplicate_ratio) for _ in range(args.runs)]
+    before = hf_metrics()
+    gate = asyncio.Semaphore(max(1, args.concurrency))
+    run_latencies: List[float] = []
+    failures: List[str] = []
+    items_done = 0
+
+    async def one(pid: str):
+        nonlocal items_done
+        async with gate:
+            t0 = time.perf_counter()
+            try:
+                resp = await generate_documentation_with_hf(pid, db, batch_size=args.batch_size, resume=False)
+                items_done += resp.total_items
+                run_latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {getattr(e, 'detail', e)}")
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(pid) for pid in project_ids))
+    finally:
+        wall = time.perf_counter() - started
+        after = hf_metrics()
+        await close_hf_client()
+        if not args.keep:
+            await cleanup(db, project_ids)
+
+    requests_sent = after["client"]["requests"] - before["client"]["requests"]
+    ideal_requests = args.runs * math.ceil(args.items / args.batch_size)
+    report: Dict[str, Any] = {
+        "runs": args.runs,
+        "items_per_run": args.items,
+        "batch_size": args.batch_size,
+        "failed_runs": len(failures),
+        "failures": failures[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_items_per_sec": round(items_done / wall, 2) if wall else None,
+        "run_latency_seconds": {
+            "p50": percentile(run_latencies, 50),
+            "p95": percentile(run_latencies, 95),
+            "p99": percentile(run_latencies, 99),
+        },
+        "hf_requests": requests_sent,
+        # >1 means retries/fallbacks; <1 means dedupe/coalescing saved calls
+        "retry_amplification": round(requests_sent / ideal_requests, 3) if ideal_requests else None,
+        "final_concurrency_limit": after["concurrency"]["limit"],
+        "circuit_state": after["circuit"]["state"],
+    }
+    if standin is not None:
+        st = standin.state.stats
+        lat = st.latencies_ms
+        report["endpoint"] = {
+            **st.as_dict(),
+            "prompt_amplification": round(st.prompts_received / (args.runs * args.items), 3) if args.items else None,
+            "request_latency_ms": {"p50": percentile(lat, 50), "p95": percentile(lat, 95), "p99": percentile(lat, 99)},
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end documentation generation benchmark")
+    parser.add_argument("--items", type=int, default=200, help="items per project")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=4, help="number of generations (one project each)")
+    parser.add_argument("--concurrency", type=int, default=2, help="generations running at once")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="fraction of copy-pasted helpers")
+    parser.add_argument("--endpoint", default=None, help="external endpoint URL instead of the in-process stand-in")
+    parser.add_argument("--keep", action="store_true", help="keep seeded projects and revisions")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    for f in fields(StandinConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", dest=f.name, default=getattr(StandinConfig, f.name, None), type=_caster(f))
+    args = parser.parse_args()
+
+    report = asyncio.run(run_bench(args))
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    print(f"runs={report['runs']} items/run={report['items_per_run']} batch={report['batch_size']} failed={report['failed_runs']}")
+    print(f"wall={report['wall_seconds']}s throughput={report['throughput_items_per_sec']} items/s")
+    lat = report["run_latency_seconds"]
+    print("run latency s: " + " ".join(f"{k}={v:.3f}" if v is not None else f"{k}=n/a" for k, v in lat.items()))
+    print(f"hf requests={report['hf_requests']} retry amplification={report['retry_amplification']}x "
+          f"limit={report['final_concurrency_limit']} circuit={report['circuit_state']}")
+    if "endpoint" in report:
+        ep = report["endpoint"]
+        print(f"endpoint: ok={ep['ok']} 429={ep['status_429']} 503={ep['status_503']} 500={ep['status_500']} "
+              f"prompt amplification={ep['prompt_amplification']}x")
+        print("request latency ms: " + " ".join(f"{k}={v:.1f}" if v is not None else f"{k}=n/a" for k, v in ep["request_latency_ms"].items()))
+    for f in report["failures"]:
+        print(f"  failure: {f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-in for the HF inference endpoint, for load tests that shouldn't hit the paid endpoint.
+
+Speaks the same schema as utils.hf_client.hf_generate_batch_async:
+POST {"inputs": [...], "parameters": {...}} -> [{"generated_text": "..."}, ...]
+
+Run standalone and point the server at it:
+
+    python -m benchmarks.hf_standin --port 8081 --token-latency-ms 4 --warmup-requests 3
+    HF_ENDPOINT=http://127.0.0.1:8081/generate HF_TOKEN=local uvicorn server:app
+
+or mount `create_app()` in-process through httpx.ASGITransport (see benchmarks.generation_bench).
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def _caster(f):
+    return int if f.type in (int, Optional[int]) else float
+
+
+@dataclass
+class StandinConfig:
+    token_latency_ms: float = 4.0          # decode cost per generated token (whole batch decodes in lockstep)
+    prompt_token_latency_ms: float = 0.05  # prefill cost per prompt token
+    padding_cost_ms: float = 0.02          # cost per padded token: batch_size * longest prompt
+    base_latency_ms: float = 20.0          # fixed per-request overhead
+    max_concurrency: int = 8               # requests beyond this get 429
+    warmup_requests: int = 0               # first N requests answer 503 "loading"
+    warmup_seconds: float = 0.0            # ...or every request within T seconds of startup
+    burst_every: int = 0                   # every N requests, start a 429 burst
+    burst_length: int = 0                  # ...of this many requests
+    error_rate: float = 0.0                # probability of a 500
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "StandinConfig":
+        cfg = cls()
+        for f in fields(cls):
+            raw = os.getenv(f"HF_STANDIN_{f.name.upper()}")
+            if raw is None or raw == "":
+                continue
+            try:
+                setattr(cfg, f.name, _caster(f)(raw))
+            except ValueError:
+                pass
+        return cfg
+
+
+@dataclass
+class StandinStats:
+    requests: int = 0
+    prompts_received: int = 0
+    prompts: int = 0
+    ok: int = 0
+    status_503: int = 0
+    status_429: int = 0
+    status_500: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = {k: v for k, v in self.__dict__.items() if k != "latencies_ms"}
+        d["latency_samples"] = len(self.latencies_ms)
+        return d
+
+
+def _tokens(text: str) -> int:
+    # ~4 characters per token; good enough for cost modelling
+    return max(1, len(text) // 4)
+
+
+def _fake_docstring(prompt: str) -> str:
+    header = next((ln for ln in prompt.splitlines() if ":" in ln and ln.split(":", 1)[0].isupper()), "ITEM: item")
+    kind, name = [p.strip() for p in header.split(":", 1)]
+    return f"{name.split(' ')[0]} {kind.lower()}.\n\nArgs:\n    value: Input value.\n\nReturns:\n    The computed result."
+
+
+def create_app(config: Optional[StandinConfig] = None) -> FastAPI:
+    cfg = config or StandinConfig.from_env()
+    rng = random.Random(cfg.seed)
+    stats = StandinStats()
+    state = {"in_flight": 0, "started": time.monotonic(), "burst_left": 0}
+    app = FastAPI(title="HF inference stand-in")
+    app.state.config = cfg
+    app.state.stats = stats
+
+    @app.get("/stats")
+    async def get_stats():
+        return {"config": cfg.__dict__, "stats": stats.as_dict(), "in_flight": state["in_flight"]}
+
+    @app.post("/generate")
+    @app.post("/")
+    async def generate(request: Request):
+        stats.requests += 1
+        n = stats.requests
+        raw = await request.body()
+        if request.headers.get("content-encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        payload = json.loads(raw or b"{}")
+        inputs = payload.get("inputs") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        params = payload.get("parameters") or {}
+        stats.prompts_received += len(inputs)
+
+        if n <= cfg.warmup_requests or (time.monotonic() - state["started"]) < cfg.warmup_seconds:
+            stats.status_503 += 1
+            return JSONResponse(status_code=503, content={"error": "Model is currently loading", "estimated_time": 20.0})
+
+        if cfg.burst_every and n % cfg.burst_every == 0:
+            state["burst_left"] = cfg.burst_length
+        if state["burst_left"] > 0:
+            state["burst_left"] -= 1
+            stats.status_429 += 1
+            return JSONResponse(status_code=429, content={"error": "Rate limit reached"})
+
+        if state["in_flight"] >= cfg.max_concurrency:
+            stats.status_429 += 1
+            return JSONResponse(status_code=429, content={"error": "Too many concurrent requests"})
+
+        if cfg.error_rate and rng.random() < cfg.error_rate:
+            stats.status_500 += 1
+            return JSONResponse(status_code=500, content={"error": "Internal inference error"})
+
+        state["in_flight"] += 1
+        started = time.monotonic()
+        try:
+            prompt_tokens = [_tokens(p) for p in inputs] or [0]
+            new_tokens = int(params.get("max_new_tokens") or params.get("max_length") or 128)
+            cost_ms = (
+                cfg.base_latency_ms
+                + cfg.prompt_token_latency_ms * sum(prompt_tokens)
+                + cfg.padding_cost_ms * len(inputs) * max(prompt_tokens)
+                + cfg.token_latency_ms * new_tokens
+            )
+            await asyncio.sleep(cost_ms / 1000.0)
+        finally:
+            state["in_flight"] -= 1
+        stats.ok += 1
+        stats.prompts += len(inputs)
+        stats.latencies_ms.append((time.monotonic() - started) * 1000.0)
+        return [{"generated_text": _fake_docstring(p)} for p in inputs]
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HF inference endpoint stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    defaults = StandinConfig.from_env()
+    for f in fields(StandinConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", dest=f.name, default=getattr(defaults, f.name),
+                            type=_caster(f))
+    args = parser.parse_args()
+    cfg = StandinConfig(**{f.name: getattr(args, f.name) for f in fields(StandinConfig)})
+
+    import uvicorn
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Rendering benchmark: one synthetic revision rendered to Markdown, HTML and PDF.
+
+Compares rendering each format straight from the result rows (every render regroups,
+resorts and re-cleans every docstring) with building the shared document model once
+and rendering all formats from it. No database or endpoint needed.
+
+    python -m benchmarks.render_bench --items 10000
+    python -m benchmarks.render_bench --items 2000 --repeat 3 --json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from utils.doc_ir import HTML, MARKDOWN, PDF, build_document
+from utils.doc_templates import render_html, render_markdown, render_pdf
+
+RENDERERS = {"markdown": render_markdown, "html": render_html, "pdf": render_pdf}
+FORMATS = {"markdown": MARKDOWN, "html": HTML, "pdf": PDF}
+
+_DOCSTRINGS = [
+    "Compute the total.\n\nArgs:\n    value (int): Input value.\n    scale (int): Multiplier.\n\nReturns:\n    int: The scaled total.\n\nRaises:\n    ValueError: If the total is negative.",
+    "Load the *config* from `path`.\n\nParameters:\n  * path: Where to read from.\n\nExample:\n```python\nload('a.toml')\n```\n\nReturns:\n    dict: Parsed settings.",
+    "# Summary\nA small helper.\n\n- first point\n- second point\n\nNote:\n    Uses :func:`other` internally.",
+]
+
+
+def synthetic_results(items: int, files: int = 50, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    rows: List[Dict[str, Any]] = []
+    n_classes = max(1, items // 10)
+    for i in range(items):
+        kind = "function" if i % 3 == 0 else ("class" if i % 10 == 1 else "method")
+        cls = f"Service{i % n_classes}"
+        name = cls if kind == "class" else f"handle_{i}"
+        body = "\n".join(f"    total += value * {j}" for j in range(1 + i % 8))
+        rows.append({
+            "name": name,
+            "type": kind,
+            "file": f"pkg/module_{i % files}.py",
+            "parent_class": cls if kind == "method" else None,
+            "original_code": f"def {name}(value, scale=1):\n    total = 0\n{body}\n    return total * scale",
+            "generated_docstring": rng.choice(_DOCSTRINGS),
+        })
+    return rows
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run_bench(items: int, repeat: int, formats: List[str]) -> Dict[str, Any]:
+    rows = synthetic_results(items)
+    report: Dict[str, Any] = {"items": items, "repeat": repeat, "formats": formats}
+
+    # Baseline: every format regroups and re-cleans from the rows
+    direct = {fmt: _timed(lambda fmt=fmt: RENDERERS[fmt]("bench", rows, revision_id="bench"), repeat) for fmt in formats}
+    report["direct_seconds"] = {k: round(v, 4) for k, v in direct.items()}
+    report["direct_total_seconds"] = round(sum(direct.values()), 4)
+
+    # Shared model: grouping once, per-format text once, then pure layout per render
+    build = _timed(lambda: build_document(rows), repeat)
+    prepare, shared = {}, {}
+    for fmt in formats:
+        document = build_document(rows)
+        prepare[fmt] = _timed(lambda: build_document(rows).prepare(FORMATS[fmt]), repeat) - build
+        document.prepare(FORMATS[fmt])
+        shared[fmt] = _timed(lambda fmt=fmt, document=document: RENDERERS[fmt]("bench", document, revision_id="bench"), repeat)
+    report["build_seconds"] = round(build, 4)
+    report["prepare_seconds"] = {k: round(max(0.0, v), 4) for k, v in prepare.items()}
+    report["shared_render_seconds"] = {k: round(v, 4) for k, v in shared.items()}
+    report["shared_total_seconds"] = round(build + sum(max(0.0, v) for v in prepare.values()) + sum(shared.values()), 4)
+    # A second view of an already prepared revision only pays the layout
+    report["warm_render_total_seconds"] = round(sum(shared.values()), 4)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Documentation rendering benchmark")
+    parser.add_argument("--items", type=int, default=10000, help="items in the synthetic revision")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement (median is reported)")
+    parser.add_argument("--formats", default="markdown,html,pdf", help="comma-separated subset of markdown,html,pdf")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip() in RENDERERS]
+    report = run_bench(args.items, max(1, args.repeat), formats)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"items={report['items']} repeat={report['repeat']}")
+    print("direct render s: " + " ".join(f"{k}={v:.3f}" for k, v in report["direct_seconds"].items()) + f" total={report['direct_total_seconds']:.3f}")
+    print(f"shared model: build={report['build_seconds']:.3f}s "
+          + "prepare " + " ".join(f"{k}={v:.3f}" for k, v in report["prepare_seconds"].items()))
+    print("shared render s: " + " ".join(f"{k}={v:.3f}" for k, v in report["shared_render_seconds"].items())
+          + f" total={report['shared_total_seconds']:.3f} warm={report['warm_render_total_seconds']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
+from typing import Optional
 from fastapi import HTTPException
 from bson import ObjectId
 from utils.db import get_db
 from utils.auth import hash_password
+from utils.render_cache import render_cache
+from utils.render_pool import render_pool
+from utils.hf_client import hf_metrics
+from utils.doc_ir import document_cache
+from utils.revision_listing import list_revision_summaries
+from utils.result_store import resolve_revision_results, collect_unreferenced_items, migrate_embedded_results, backfill_docstring_variants
+from utils.search_index import rebuild_search_index, unindex_projects, unindex_revisions
+from utils.symbol_index import find_symbols, rebuild_symbol_index, unindex_files
+from utils.revision_archive import compact_revisions, find_revision
 
 # Helper: ensure current_user is admin; if no admins exist, bootstrap by promoting current user
 async def _ensure_admin_or_bootstrap(db, current_user):
@@ -69,17 +79,24 @@ async def admin_delete_project(project_id: str, db, current_user):
     await _ensure_admin_or_bootstrap(db, current_user)
     oid = ObjectId(project_id)
     await db.files.delete_many({"project_id": project_id})
+    await db.symbols.delete_many({"project_id": project_id})
     res = await db.projects.delete_one({"_id": oid})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
     await db.documentations.delete_many({"project_id": project_id})
+    await db.documentation_archive.delete_many({"project_id": project_id})
+    await unindex_projects(db, [project_id])
     return {"detail": "Project, files and docs deleted"}
 
 async def admin_delete_all_projects(db, current_user):
     await _ensure_admin_or_bootstrap(db, current_user)
     # Delete all files and docs then projects
     res_files = await db.files.delete_many({})
+    await db.symbols.delete_many({})
     res_docs = await db.documentations.delete_many({})
+    await db.documentation_archive.delete_many({})
+    await db.documentation_items.delete_many({})
+    await db.documentation_search.delete_many({})
     res_proj = await db.projects.delete_many({})
     return {
         "detail": f"Deleted {res_proj.deleted_count} projects, {res_files.deleted_count} files, {res_docs.deleted_count} docs",
@@ -103,11 +120,13 @@ async def cleanup_orphaned_files(db, current_user):
     orphan_ids = [f["_id"] for f in orphans if f.get("project_id") not in project_ids]
     if orphan_ids:
         await db.files.delete_many({"_id": {"$in": orphan_ids}})
+        await unindex_files(db, [str(i) for i in orphan_ids])
     return {"detail": f"Removed {len(orphan_ids)} orphaned files"}
 
 async def admin_delete_all_files(db, current_user):
     await _ensure_admin_or_bootstrap(db, current_user)
     res = await db.files.delete_many({})
+    await db.symbols.delete_many({})
     return {"detail": f"Deleted {res.deleted_count} files"}
 
 async def cleanup_orphaned_projects(db, current_user):
@@ -123,10 +142,13 @@ async def cleanup_orphaned_projects(db, current_user):
     if orphan_project_ids:
         # Delete files of those projects
         res_files = await db.files.delete_many({"project_id": {"$in": orphan_project_ids}})
+        await db.symbols.delete_many({"project_id": {"$in": orphan_project_ids}})
         deleted_files = res_files.deleted_count or 0
         # Delete docs of those projects
         res_docs = await db.documentations.delete_many({"project_id": {"$in": orphan_project_ids}})
         deleted_docs = res_docs.deleted_count or 0
+        await db.documentation_archive.delete_many({"project_id": {"$in": orphan_project_ids}})
+        await unindex_projects(db, orphan_project_ids)
         # Delete projects
         res_proj = await db.projects.delete_many({"_id": {"$in": [ObjectId(pid) for pid in orphan_project_ids]}})
         deleted_projects = res_proj.deleted_count or 0
@@ -143,24 +165,49 @@ async def cleanup_orphaned_documentations(db, current_user):
     if orphan_doc_ids:
         res = await db.documentations.delete_many({"_id": {"$in": orphan_doc_ids}})
         deleted_docs = res.deleted_count or 0
-    return {"detail": f"Removed {deleted_docs} orphaned documentation revisions"}
+        await db.documentation_archive.delete_many({"_id": {"$in": orphan_doc_ids}})
+        await unindex_revisions(db, [str(i) for i in orphan_doc_ids])
+    # Result items no remaining revision points to
+    deleted_items = await collect_unreferenced_items(db)
+    return {"detail": f"Removed {deleted_docs} orphaned documentation revisions, {deleted_items} unreferenced items"}
+
+async def migrate_documentation_results(db, current_user):
+    await _ensure_admin_or_bootstrap(db, current_user)
+    migrated = await migrate_embedded_results(db)
+    backfilled = await backfill_docstring_variants(db)
+    indexed = await rebuild_search_index(db)
+    return {"detail": f"Moved results of {migrated} revisions into the item store, pre-cleaned {backfilled} items, indexed {indexed} revisions for search"}
+
+async def compact_documentations(db, current_user, keep: Optional[int] = None):
+    await _ensure_admin_or_bootstrap(db, current_user)
+    stats = await compact_revisions(db, keep=keep)
+    return {"detail": f"Archived {stats['archived']} revisions across {stats['projects']} projects", **stats}
+
+async def admin_find_symbols(db, current_user, prefix: str, kind: Optional[str] = None, project_id: Optional[str] = None, limit: Optional[int] = None):
+    await _ensure_admin_or_bootstrap(db, current_user)
+    return {"symbols": await find_symbols(db, prefix, project_id=project_id, kind=kind, limit=limit)}
+
+async def admin_rebuild_symbols(db, current_user):
+    await _ensure_admin_or_bootstrap(db, current_user)
+    indexed = await rebuild_symbol_index(db)
+    return {"detail": f"Rebuilt symbols of {indexed} files"}
 
 # Documentations
-async def list_documentations(db, current_user):
+async def list_documentations(db, current_user, limit: Optional[int] = None, cursor: Optional[str] = None, project_id: Optional[str] = None):
     await _ensure_admin_or_bootstrap(db, current_user)
-    docs = await db.documentations.find({}).sort("created_at", -1).to_list(length=None)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-        d.pop("binary", None)
-    return docs
+    query = {"project_id": project_id} if project_id else {}
+    docs, next_cursor = await list_revision_summaries(db, query, limit, cursor)
+    return {"documentations": docs, "next_cursor": next_cursor}
 
 async def admin_get_documentation(revision_id: str, db, current_user):
     await _ensure_admin_or_bootstrap(db, current_user)
     oid = ObjectId(revision_id)
-    doc = await db.documentations.find_one({"_id": oid})
+    doc = await find_revision(db, {"_id": oid})
     if not doc:
         raise HTTPException(status_code=404, detail="Documentation revision not found")
     doc["id"] = str(doc.pop("_id"))
+    doc["results"] = await resolve_revision_results(db, doc)
+    doc.pop("result_refs", None)
     # Avoid sending binary in JSON
     if "binary" in doc:
         doc.pop("binary", None)
@@ -172,9 +219,21 @@ async def admin_delete_documentation(revision_id: str, db, current_user):
     res = await db.documentations.delete_one({"_id": oid})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Documentation revision not found")
+    await db.documentation_archive.delete_one({"_id": oid})
+    await unindex_revisions(db, [revision_id])
+    render_cache.invalidate(revision_id)
+    document_cache.invalidate(revision_id)
     return {"detail": "Documentation revision deleted"}
 
 async def admin_delete_all_documentations(db, current_user):
     await _ensure_admin_or_bootstrap(db, current_user)
     res = await db.documentations.delete_many({})
-    return {"detail": f"Deleted {res.deleted_count} documentation revisions"}
\ No newline at end of file
+    await db.documentation_archive.delete_many({})
+    await db.documentation_items.delete_many({})
+    await db.documentation_search.delete_many({})
+    return {"detail": f"Deleted {res.deleted_count} documentation revisions"}
+
+# Metrics
+async def admin_metrics(db, current_user):
+    await _ensure_admin_or_bootstrap(db, current_user)
+    return {"hf": hf_metrics(), "render_cache": render_cache.snapshot(), "render_pool": render_pool.snapshot()}
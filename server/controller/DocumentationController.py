@@ -1,15 +1,27 @@
-from typing import List, Dict, Optional, Set
+from typing import Awaitable, Callable, List, Dict, Optional, Set
 from fastapi import HTTPException
 from model.DocumentationModel import DocumentationPlan, DocstringItem, DocumentationResult, DocumentationGenerationResponse
-from utils.hf_client import hf_generate_batch_async
+from utils.hf_client import hf_generate_batch_async, hf_breaker, hf_breaker_allows, hf_limiter, hf_scheduler, HFCircuitOpenError
 import time
 # from utils.doc_templates import render_html, render_markdown, render_pdf  # no rendering here anymore
 from bson import ObjectId, Binary
 import asyncio
 from datetime import datetime
-from utils.doc_cleaner import clean_results_docstrings
+from utils.doc_cleaner import clean_for_html
+from utils.prompt_compactor import compact_code, compaction_stats, estimate_tokens
+from utils.inference_scheduler import inference_job, INTERACTIVE, BATCH
+from utils.generation_queue import distributed_enabled, enqueue_run, wait_for_run, delete_run
+from utils.generation_runner import GenerationStatus, OutputsCallback, generate_outputs
+from utils.generation_estimator import throughput_model, throughput_sample
+from utils.result_store import store_results, resolve_revision_results
+from utils.search_index import index_revision
 import os
 import httpx
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger("documentation")
 
 def normalize_path(p: Optional[str]) -> str:
     # Remove leading './', '/', and 'root/' for consistency
@@ -189,20 +201,20 @@ async def plan_documentation_generation(project_id: str, db) -> DocumentationPla
         included_files=sorted(set(included_file_paths)),
     )
 
-def _make_prompt_for_item(it: DocstringItem) -> str:
+def _make_prompt_for_item(it: DocstringItem, code: Optional[str] = None) -> str:
     """
     Create a concise prompt for the HF model to generate docstrings.
-    Keep it short due to MAX_INPUT_LENGTH=256 tokens in your handler.
+    Keep it short due to MAX_INPUT_LENGTH=256 tokens in your handler: the code is
+    compacted to signature, docstring and return/raise paths within a token budget.
+    Pass `code` when the caller already compacted it.
     """
     header = f"{it.type.upper()}: {it.name}"
     if it.parent_class:
         header += f" (class {it.parent_class})"
-    
-    # Truncate code if too long to fit within token limit
-    code = it.code
-    if len(code) > 800:  # Rough character limit to stay under 256 tokens
-        code = code[:800] + "..."
-    
+
+    if code is None:
+        code = compact_code(it.code)
+
     return f"""Generate a clear docstring for this {it.type}:
 
 {header}
@@ -212,7 +224,135 @@ def _make_prompt_for_item(it: DocstringItem) -> str:
 
 Docstring:"""
 
-async def generate_documentation_with_hf(project_id: str, db, batch_size: int = 4, parameters: dict = None, created_by: Optional[dict] = None) -> DocumentationGenerationResponse:
+def _model_unavailable(model_status: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Model endpoint is unavailable; try again shortly",
+        headers={"X-Model-Status": model_status, "Retry-After": str(int(retry_after))},
+    )
+
+async def _generate_outputs_distributed(
+    db,
+    project_id: str,
+    prompts: List[str],
+    merged_outputs: List[Optional[str]],
+    params: dict,
+    batch_size: int,
+    job,
+    on_outputs: Optional[OutputsCallback] = None,
+) -> GenerationStatus:
+    """Same contract as generate_outputs, but batches are run by generation workers
+    (python -m worker.generation) leasing tasks from db.generation_tasks.
+    """
+    status = GenerationStatus()
+    pending = [i for i, o in enumerate(merged_outputs) if o is None]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    if not batches:
+        return status
+    run_id = str(ObjectId())
+    await enqueue_run(db, run_id, project_id, prompts, batches, params, job.tenant, job.lane)
+
+    async def on_task(task: dict):
+        job.record_wait(float(task.get("queue_wait_seconds") or 0.0))
+        failure = task.get("failure") or {}
+        if failure.get("circuit_open"):
+            co = failure["circuit_open"]
+            status.circuit_open = HFCircuitOpenError(co.get("model_status") or "booting", float(co.get("retry_after") or 0))
+        status.saw_5xx = status.saw_5xx or bool(failure.get("saw_5xx"))
+        status.saw_4xx = status.saw_4xx or bool(failure.get("saw_4xx"))
+        outs = {idx: out for idx, out in zip(task.get("indices") or [], task.get("outputs") or []) if out}
+        for idx, out in outs.items():
+            merged_outputs[idx] = out
+        if on_outputs and outs:
+            await on_outputs(outs)
+
+    try:
+        finished = await wait_for_run(db, run_id, on_task)
+        if not finished:
+            logger.warning("[GEN] project=%s run=%s timed out waiting for workers", project_id, run_id)
+    finally:
+        # Also withdraws unclaimed work if the request was cancelled
+        await delete_run(db, run_id)
+    return status
+
+# ---------- Checkpoints (resume partially completed generations) ----------
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+def _params_key(params: dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+async def _load_checkpoint(db, project_id: str, params_key: str) -> Dict[str, str]:
+    try:
+        ckpt = await db.generation_checkpoints.find_one({"project_id": project_id, "params_key": params_key})
+    except Exception as e:
+        logger.warning("Could not load generation checkpoint for %s: %s", project_id, e)
+        return {}
+    return (ckpt or {}).get("outputs") or {}
+
+async def _save_checkpoint(db, project_id: str, params_key: str, outputs: Dict[str, str]) -> None:
+    if not outputs:
+        return
+    update = {f"outputs.{k}": v for k, v in outputs.items()}
+    update["updated_at"] = datetime.utcnow()
+    try:
+        await db.generation_checkpoints.update_one(
+            {"project_id": project_id, "params_key": params_key},
+            {"$set": update, "$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        # Checkpointing is best-effort; generation continues without it
+        logger.warning("Could not save generation checkpoint for %s: %s", project_id, e)
+
+async def _clear_checkpoint(db, project_id: str, params_key: str) -> None:
+    try:
+        await db.generation_checkpoints.delete_many({"project_id": project_id, "params_key": params_key})
+    except Exception as e:
+        logger.warning("Could not clear generation checkpoint for %s: %s", project_id, e)
+
+def _live_inference_stats() -> dict:
+    return {**hf_limiter.snapshot(), "queue_depth": hf_scheduler.queue_depth}
+
+async def estimate_documentation_generation(plan: DocumentationPlan, db, batch_size: int = 4, parameters: Optional[dict] = None) -> dict:
+    """Expected batches, prompt tokens, duration (and cost, if configured) for running this plan."""
+    items = plan.items or []
+    # Compacting every item is CPU-bound; keep it off the event loop
+    prompts = await asyncio.to_thread(lambda: list(dict.fromkeys(_make_prompt_for_item(it) for it in items)))
+    max_new = int((parameters or {}).get("max_length") or 128)
+    return await throughput_model.estimate(
+        db, batch_size, len(prompts), sum(estimate_tokens(p) for p in prompts),
+        max_new_tokens=max_new, live=_live_inference_stats(),
+    )
+
+ResultsCallback = Callable[[List[dict]], Awaitable[None]]
+
+def _stream_row(it: DocstringItem, text: Optional[str]) -> dict:
+    # Streamed rows leave out original_code; clients already have the sources
+    return {
+        "name": it.name,
+        "type": it.type,
+        "file": it.file,
+        "parent_class": it.parent_class,
+        "generated_docstring": str(text or "").strip(),
+    }
+
+async def generate_documentation_with_hf(
+    project_id: str,
+    db,
+    batch_size: int = 4,
+    parameters: dict = None,
+    created_by: Optional[dict] = None,
+    resume: bool = True,
+    on_results: Optional[ResultsCallback] = None,
+    include_results: bool = True,
+) -> DocumentationGenerationResponse:
+    """
+    Generate docstrings for every planned item and save them as a new revision.
+    on_results, if given, receives cleaned rows (without original_code) as soon as each
+    batch returns; include_results=False leaves them out of the returned response.
+    """
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID format.")
 
@@ -224,13 +364,33 @@ async def generate_documentation_with_hf(project_id: str, db, batch_size: int =
     if not items:
         raise HTTPException(status_code=400, detail="No items available to generate documentation.")
 
+    # Fail fast while the inference endpoint is known to be down (half-open: the probe is started)
+    if not hf_breaker_allows():
+        raise _model_unavailable(hf_breaker.model_status, hf_breaker.retry_after())
+
     # Fetch project metadata
     project = await db.projects.find_one({"_id": ObjectId(project_id)})
     project_name = (project or {}).get("name") or f"Project {project_id}"
     project_description = (project or {}).get("description") or None
 
-    prompts = [_make_prompt_for_item(it) for it in items]
-    outputs: List[str] = []
+    # Compacted once: the same code goes into the prompt and the token stats
+    compacted = [compact_code(it.code) for it in items]
+    prompts = [_make_prompt_for_item(it, code) for it, code in zip(items, compacted)]
+    prompt_stats = compaction_stats(
+        sum(estimate_tokens(it.code) for it in items),
+        sum(estimate_tokens(code) for code in compacted),
+        len(items),
+    )
+    logger.info("[GEN] project=%s prompt code tokens %d -> %d (-%s%%)", project_id,
+                prompt_stats["original_code_tokens"], prompt_stats["compacted_code_tokens"], prompt_stats["reduction_pct"])
+    # Copy-pasted helpers and repeated bodies produce identical prompts; generate each once
+    unique_prompts = list(dict.fromkeys(prompts))
+    unique_index = {p: i for i, p in enumerate(unique_prompts)}
+    positions: Dict[int, List[int]] = {}
+    for n, p in enumerate(prompts):
+        positions.setdefault(unique_index[p], []).append(n)
+    if len(unique_prompts) < len(prompts):
+        logger.info("[GEN] project=%s deduplicated %d of %d prompts", project_id, len(prompts) - len(unique_prompts), len(prompts))
 
     default_params = {
         "max_length": 128,
@@ -240,102 +400,89 @@ async def generate_documentation_with_hf(project_id: str, db, batch_size: int =
     if parameters:
         default_params.update(parameters)
 
-    # Limit concurrency (configurable) to fully utilize GPU/CPU
+    # Resume from a previous (crashed/cancelled) run with the same prompts and parameters
+    params_key = _params_key(default_params)
+    if not resume:
+        await _clear_checkpoint(db, project_id, params_key)
+    done = await _load_checkpoint(db, project_id, params_key)
+    unique_outputs: List[Optional[str]] = [done.get(_prompt_key(p)) for p in unique_prompts]
+    emitted: Set[int] = set()
+    cleaned_outputs: Dict[int, str] = {}
+
+    def cleaned(u: int) -> str:
+        # Each unique output is cleaned once, for streamed rows and stored results alike
+        if u not in cleaned_outputs:
+            cleaned_outputs[u] = clean_for_html(str(unique_outputs[u] or "").strip())
+        return cleaned_outputs[u]
+
+    async def emit(unique_idxs) -> None:
+        if on_results is None:
+            return
+        rows = []
+        for u in unique_idxs:
+            if u in emitted:
+                continue
+            emitted.add(u)
+            rows.extend(_stream_row(items[n], cleaned(u)) for n in positions.get(u, []))
+        if rows:
+            await on_results(rows)
+
+    # Checkpointed outputs are available right away
+    await emit([i for i, o in enumerate(unique_outputs) if o is not None])
+
+    async def checkpoint(outs: Dict[int, str]):
+        await _save_checkpoint(db, project_id, params_key, {_prompt_key(unique_prompts[i]): o for i, o in outs.items() if o.strip()})
+        await emit(outs.keys())
+
+    pending_prompts = [p for p, o in zip(unique_prompts, unique_outputs) if o is None]
+    pending_tokens = sum(estimate_tokens(p) for p in pending_prompts)
+    estimate = await throughput_model.estimate(
+        db, batch_size, len(pending_prompts), pending_tokens,
+        max_new_tokens=int(default_params.get("max_length") or 128), live=_live_inference_stats(),
+    )
+
+    # Small, quick runs (single files, a handful of items) take the interactive lane; the
+    # scheduler shares inference slots fairly between users either way
     try:
-        max_conc = int(os.getenv("HF_MAX_CONCURRENCY", "6"))
+        interactive_max = int(os.getenv("HF_INTERACTIVE_MAX_ITEMS", "16"))
+        interactive_seconds = float(os.getenv("HF_INTERACTIVE_MAX_SECONDS", "60"))
     except Exception:
-        max_conc = 6
-    max_conc = max(1, min(32, max_conc))
-    semaphore = asyncio.Semaphore(max_conc)
-
-    async def generate_batch(batch):
-        async with semaphore:
-            return await hf_generate_batch_async(batch, parameters=default_params)
-
-    # Create batched tasks with indices so we can recover failed batches
-    batches = [(i, prompts[i:i + batch_size]) for i in range(0, len(prompts), batch_size)]
-    tasks = [generate_batch(batch_prompts) for _, batch_prompts in batches]
-
-    # Collect results; do not fail early on errors
-    results_or_ex = await asyncio.gather(*tasks, return_exceptions=True)
-
-    # Prepare an array for all outputs in original order, fill with None initially
-    merged_outputs: List[Optional[str]] = [None] * len(prompts)
-
-    # Track whether we saw upstream errors to decide error headers if needed
-    saw_5xx = False
-    saw_4xx = False
-
-    # Process batch results
-    for (start_idx, batch_prompts), batch_result in zip(batches, results_or_ex):
-        if isinstance(batch_result, Exception):
-            # Mark batch as failed; will fallback per-prompt below
-            if isinstance(batch_result, httpx.HTTPStatusError):
-                try:
-                    code = getattr(batch_result, "response", None).status_code if getattr(batch_result, "response", None) is not None else 0
-                except Exception:
-                    code = 0
-                if code >= 500:
-                    saw_5xx = True
-                elif code >= 400:
-                    saw_4xx = True
-            # leave as None -> fallback
+        interactive_max, interactive_seconds = 16, 60.0
+    tenant = created_by.get("id") if isinstance(created_by, dict) else None
+    lane = INTERACTIVE if len(unique_prompts) <= interactive_max and estimate["estimated_seconds"] <= interactive_seconds else BATCH
+    gen_started = time.time()
+    with inference_job(tenant or f"project:{project_id}", lane) as job:
+        if distributed_enabled():
+            status = await _generate_outputs_distributed(db, project_id, unique_prompts, unique_outputs, default_params, batch_size, job, on_outputs=checkpoint)
         else:
-            # Successful batch; ensure length matches, else fallback missing ones
-            for offset, out in enumerate(batch_result):
-                idx = start_idx + offset
-                if idx < len(merged_outputs):
-                    merged_outputs[idx] = str(out) if out is not None else ""
-            # If model returned fewer outputs than prompts in batch, remaining will be None -> fallback
-
-    # Fallback per-missing prompt
-    for idx, current in enumerate(merged_outputs):
-        if current is None:
-            p = prompts[idx]
-            try:
-                single = await hf_generate_batch_async([p], parameters=default_params)
-                if isinstance(single, list) and len(single) > 0:
-                    merged_outputs[idx] = str(single[0]).strip()
-                else:
-                    merged_outputs[idx] = ""
-            except httpx.HTTPStatusError as e:
-                # Track for potential header mapping
-                code = getattr(e, "response", None).status_code if getattr(e, "response", None) is not None else 0
-                if code >= 500:
-                    saw_5xx = True
-                elif code >= 400:
-                    saw_4xx = True
-                merged_outputs[idx] = ""
-            except Exception:
-                merged_outputs[idx] = ""
-            await asyncio.sleep(0.05)
-
-    # If still any Nones (shouldn't), coerce to empty strings
-    merged_outputs = [o if o is not None else "" for o in merged_outputs]
+            status = await generate_outputs(unique_prompts, unique_outputs, default_params, batch_size, on_outputs=checkpoint, generate=hf_generate_batch_async)
+    throughput = throughput_sample(batch_size, len(items), len(pending_prompts), pending_tokens, time.time() - gen_started)
+    logger.info("[GEN] project=%s lane=%s queue wait %.3fs over %d requests", project_id, lane, job.queue_wait_seconds, job.requests)
+
+    # Fan results back out to every item; any Nones (shouldn't happen) become empty strings
+    by_prompt = dict(zip(unique_prompts, unique_outputs))
+    merged_outputs = [by_prompt.get(p) or "" for p in prompts]
 
     # If everything failed, bubble up an error with a helpful header
     if all((o or "").strip() == "" for o in merged_outputs):
+        if status.circuit_open is not None:
+            raise _model_unavailable(status.circuit_open.model_status, status.circuit_open.retry_after)
         headers = {}
-        if saw_5xx:
+        if status.saw_5xx:
             headers["X-Model-Status"] = "booting"
-        elif saw_4xx:
+        elif status.saw_4xx:
             headers["X-Model-Status"] = "paused"
         raise HTTPException(status_code=502, detail="Model generation failed for all items", headers=headers or None)
 
-    results = []
-    for item, generated_text in zip(items, merged_outputs):
-        results.append(DocumentationResult(
-            name=item.name,
-            type=item.type,
-            file=item.file,
-            parent_class=item.parent_class,
-            original_code=item.code,
-            generated_docstring=str(generated_text).strip()
-        ))
+    # Items whose prompt failed still get a (blank) row
+    await emit(range(len(unique_prompts)))
 
-    # Clean docstrings to remove special characters/markup
-    results_dicts = [r.dict() for r in results]
-    results_dicts = clean_results_docstrings(results_dicts)
+    # Clean docstrings to remove special characters/markup; the raw model output is kept
+    # with the item, and store_results adds the per-format variants the renderers use
+    results_dicts = [
+        {**_stream_row(item, cleaned(unique_index[p])), "original_code": item.code, "raw_docstring": generated_text or ""}
+        for item, p, generated_text in zip(items, prompts, merged_outputs)
+    ]
 
     generation_time = time.time() - start_time
 
@@ -351,13 +498,17 @@ async def generate_documentation_with_hf(project_id: str, db, batch_size: int =
     if not prefs_raw:
         prefs_raw = await get_project_preferences(db, project_id)
 
+    # Rows live in documentation_items, shared with earlier revisions that have the same content
+    result_refs = await store_results(db, results_dicts)
+
     doc_record = {
         "project_id": project_id,
         "format": fmt,
         "content": None,
         "content_type": None,
         "binary": None,
-        "results": results_dicts,
+        "result_refs": result_refs,
+        "item_count": len(result_refs),
         "included_files": plan.included_files,
         "excluded_files": plan.excluded_files,
         "created_at": time.time(),
@@ -366,8 +517,19 @@ async def generate_documentation_with_hf(project_id: str, db, batch_size: int =
         "created_by": created_by or None,
         "user_id": (created_by.get("id") if isinstance(created_by, dict) else None),
         "generation_time_seconds": round(generation_time, 2),
+        "prompt_stats": prompt_stats,
+        "scheduling": job.summary(),
+        "throughput": throughput,
+        "estimate": estimate,
     }
     inserted = await db.documentations.insert_one(doc_record)
+    throughput_model.observe(throughput)
+    try:
+        await index_revision(db, project_id, str(inserted.inserted_id), doc_record["created_at"], result_refs)
+    except Exception as e:
+        # Search can be rebuilt from the admin migrate endpoint; don't fail the generation
+        logger.warning(f"[SEARCH] Could not index revision {inserted.inserted_id}: {e}")
+    await _clear_checkpoint(db, project_id, params_key)
 
     # Mark project as completed once a documentation is generated
     try:
@@ -384,6 +546,117 @@ async def generate_documentation_with_hf(project_id: str, db, batch_size: int =
         total_items=len(items),
         included_files=plan.included_files,
         excluded_files=plan.excluded_files,
-        results=[DocumentationResult(**r) for r in results_dicts],
-        generation_time_seconds=round(generation_time, 2)
-    )
\ No newline at end of file
+        results=[DocumentationResult(**r) for r in results_dicts] if include_results else [],
+        generation_time_seconds=round(generation_time, 2),
+        revision_id=str(inserted.inserted_id),
+        queue_wait_seconds=round(job.queue_wait_seconds, 3),
+    )
+# ---------- Per-project single-flight ----------
+
+class _GenerationRun:
+    """A generation in progress for one project, shared by every request that attaches to it."""
+
+    def __init__(self, project_id: str, created_by: Optional[dict]):
+        self.project_id = project_id
+        self.started_by = (created_by or {}).get("id") if isinstance(created_by, dict) else None
+        self.started_at = time.time()
+        self.attached = 1
+        self.task: Optional[asyncio.Task] = None
+        self.items_done = 0
+        self._listeners: List[ResultsCallback] = []
+
+    async def publish(self, rows: List[dict]) -> None:
+        self.items_done += len(rows)
+        for listener in list(self._listeners):
+            await listener(rows)
+
+    async def subscribe(self, listener: ResultsCallback) -> None:
+        # Rows are not kept for replay: a late listener gets rows from now on, and
+        # /generate/status tells it how many items were done before it attached
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ResultsCallback) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def info(self) -> dict:
+        return {
+            "project_id": self.project_id,
+            "running": self.task is not None and not self.task.done(),
+            "started_at": self.started_at,
+            "started_by": self.started_by,
+            "attached": self.attached,
+            "items_done": self.items_done,
+        }
+
+# Process-local: requests for the same project on one API node share a run
+_active_runs: Dict[str, _GenerationRun] = {}
+
+def get_generation_run(project_id: str) -> Optional[_GenerationRun]:
+    run = _active_runs.get(project_id)
+    return run if run is not None and run.task is not None and not run.task.done() else None
+
+async def cancel_generation(project_id: str) -> bool:
+    """Cancel the running generation for a project; outstanding batches are dropped and
+    their limiter/scheduler slots freed. Finished batches stay checkpointed for a resume."""
+    run = get_generation_run(project_id)
+    if run is None:
+        return False
+    run.task.cancel()
+    try:
+        await run.task
+    except (asyncio.CancelledError, Exception):
+        pass
+    logger.info("[GEN] project=%s generation cancelled", project_id)
+    return True
+
+async def _with_results(db, resp: DocumentationGenerationResponse) -> DocumentationGenerationResponse:
+    # A run started by a streaming request doesn't keep results; read them back from the revision
+    if resp.results or not resp.revision_id or not resp.total_items:
+        return resp
+    doc = await db.documentations.find_one({"_id": ObjectId(resp.revision_id)}, {"results": 1, "result_refs": 1})
+    results = await resolve_revision_results(db, doc or {})
+    return resp.model_copy(update={"results": [DocumentationResult(**r) for r in results]})
+
+async def generate_documentation_single_flight(
+    project_id: str,
+    db,
+    force: bool = False,
+    on_results: Optional[ResultsCallback] = None,
+    include_results: bool = True,
+    **kwargs,
+) -> DocumentationGenerationResponse:
+    """
+    Start a generation for the project, or attach to the one already running so a
+    double click or a retried request doesn't pay for a second run. force=True cancels
+    the running generation and starts over.
+    """
+    run = get_generation_run(project_id)
+    if run is not None and force:
+        await cancel_generation(project_id)
+        run = None
+    if run is None:
+        run = _GenerationRun(project_id, kwargs.get("created_by"))
+        run.task = asyncio.create_task(generate_documentation_with_hf(
+            project_id, db, on_results=run.publish, include_results=include_results, **kwargs,
+        ))
+        _active_runs[project_id] = run
+
+        def _forget(_t, run=run):
+            if _active_runs.get(project_id) is run:
+                del _active_runs[project_id]
+        run.task.add_done_callback(_forget)
+    else:
+        run.attached += 1
+        logger.info("[GEN] project=%s attached to running generation (%d requests)", project_id, run.attached)
+    if on_results is not None:
+        await run.subscribe(on_results)
+
+    try:
+        # Shielded: one client going away doesn't cancel the run for the others
+        resp = await asyncio.shield(run.task)
+    except asyncio.CancelledError:
+        if run.task.cancelled():
+            raise HTTPException(status_code=409, detail="Generation was cancelled")
+        raise
+    return await _with_results(db, resp) if include_results else resp
@@ -8,10 +8,18 @@ from utils.build_tree import build_file_tree
 from utils.db import get_db
 from utils.timestamp_helper import update_project_timestamp
 from utils.parser import extract_functions_classes_from_content, extract_py_files_from_zip
+from utils.symbol_index import index_files, unindex_files
 
 MAX_FILES_PER_UPLOAD = 100
 MAX_ITEMS_PER_UPLOAD = 500  # functions + classes + methods
 
+async def _index_symbols(db, project_id: str, docs: list):
+    # Inserted docs carry their _id; insert_one/insert_many fill it in
+    try:
+        await index_files(db, docs)
+    except Exception as e:
+        print(f"Warning: Could not index symbols for project {project_id}. Error: {e}")
+
 async def upload_file(project_id: str, file: UploadFile = File(...), db=Depends(get_db)):
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID format.")
@@ -36,6 +44,7 @@ async def upload_file(project_id: str, file: UploadFile = File(...), db=Depends(
             "classes": parsed["classes"]
         }
         result = await db.files.insert_one(file_data)
+        await _index_symbols(db, project_id, [file_data])
         
         try:
             all_project_files = await db.files.find({"project_id": project_id}).to_list(length=None)
@@ -96,6 +105,7 @@ async def upload_project_files(project_id: str, files: list[UploadFile], db=Depe
             # backfill ids
             for i, _id in enumerate(res.inserted_ids):
                 uploaded_files[i]["file_id"] = str(_id)
+            await _index_symbols(db, project_id, docs)
 
         # Update project status after all uploads
         try:
@@ -149,6 +159,7 @@ async def upload_project_zip(project_id: str, zip_file: UploadFile = File(...),
             })
         if docs:
             await db.files.insert_many(docs)
+            await _index_symbols(db, project_id, docs)
         
         try:
             all_project_files = await db.files.find({"project_id": project_id}).to_list(length=None)
@@ -239,6 +250,7 @@ async def delete_file(project_id: str, file_id: str, db=Depends(get_db)):
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="File not found")
+    await unindex_files(db, [file_id])
 
     try:
         all_project_files = await db.files.find({"project_id": project_id}).to_list(length=None)
@@ -260,6 +272,7 @@ async def delete_project_files(project_id: str, db=Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid project ID format.")
 
     result = await db.files.delete_many({"project_id": project_id})    
+    await db.symbols.delete_many({"project_id": project_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="No files found for this project")
     # Recalculate project status and update timestamp
@@ -5,6 +5,7 @@ from model.ProjectModel import FileProcessSummary, ProcessFilesSummaryResponse,
 from utils.db import get_db
 from utils.timestamp_helper import update_project_timestamp
 from bson import ObjectId
+from utils.search_index import unindex_projects
 
 def calculate_project_status(files):
     if not files:
@@ -168,13 +169,18 @@ async def delete_project(project_id: str, db):
     try:
         # 1. Delete all associated files from the 'files' collection
         await db.files.delete_many({"project_id": project_id})
+        await db.symbols.delete_many({"project_id": project_id})
 
         # 2. Delete associated preferences (both current and legacy collections if any)
         await db.preferences.delete_one({"project_id": project_id})
         await db.project_preferences.delete_many({"project_id": project_id})
 
-        # 3. Delete all documentation revisions for this project
+        # 3. Delete all documentation revisions (and unfinished generation checkpoints) for this project
         await db.documentations.delete_many({"project_id": project_id})
+        await db.documentation_archive.delete_many({"project_id": project_id})
+        await unindex_projects(db, [project_id])
+        await db.generation_checkpoints.delete_many({"project_id": project_id})
+        await db.generation_tasks.delete_many({"project_id": project_id})
 
         # 4. Delete the project itself
         result = await db.projects.delete_one({"_id": project_oid})
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Literal
+from typing import Any, Dict, Optional, List, Literal
 from bson import ObjectId
 
 class DocstringItem(BaseModel):
@@ -16,6 +16,7 @@ class DocumentationPlan(BaseModel):
     items: List[DocstringItem]
     excluded_files: List[str]
     included_files: List[str]
+    estimate: Optional[Dict[str, Any]] = None
 
     @field_validator("project_id")
     @classmethod
@@ -40,6 +41,8 @@ class DocumentationGenerationResponse(BaseModel):
     excluded_files: List[str]
     results: List[DocumentationResult]
     generation_time_seconds: Optional[float] = Field(default=None, ge=0)
+    queue_wait_seconds: Optional[float] = Field(default=None, ge=0)
+    revision_id: Optional[str] = None
 
     @field_validator("project_id")
     @classmethod
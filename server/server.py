@@ -12,9 +12,16 @@ from view.AdminView import router as admin_router
 from view.GithubAuthView import router as github_auth_router
 from view.GithubImportView import router as github_import_router
 from view.GithubRepoView import router as github_repo_router
+from controller.AdminController import admin_metrics
+from controller.AuthController import get_current_user
+import asyncio
+import contextlib
 import logging
 import os
 from utils.db import get_db, db
+from utils.hf_client import hf_health, start_hf_client, close_hf_client
+from utils.render_pool import render_pool
+from utils.revision_archive import compact_interval, retention_keep, run_compactor
 from uuid import uuid4
 import time
 from contextlib import asynccontextmanager
@@ -39,11 +46,49 @@ async def lifespan(app: FastAPI):
         await db.projects.create_index(
             [("user_id", 1), ("updated_at", -1)], name="proj_user_updated"
         )
+        await db.generation_checkpoints.create_index(
+            [("project_id", 1), ("params_key", 1)], name="gen_ckpt_project_params", unique=True
+        )
+        await db.generation_tasks.create_index(
+            [("status", 1), ("lane", -1), ("created_at", 1)], name="gen_task_claim"
+        )
+        await db.generation_tasks.create_index([("run_id", 1), ("status", 1)], name="gen_task_run")
+        await db.documentations.create_index(
+            [("throughput.endpoint", 1), ("created_at", -1)], name="doc_throughput_endpoint"
+        )
+        # Keyset pagination of revision lists orders by (created_at, _id)
+        await db.documentations.create_index(
+            [("project_id", 1), ("created_at", -1), ("_id", -1)], name="doc_project_created_id"
+        )
+        await db.documentations.create_index([("created_at", -1), ("_id", -1)], name="doc_created_id")
+        # Documentation search: text index scoped by project, weighted so name hits rank first
+        await db.documentation_search.create_index(
+            [("project_id", 1), ("name", "text"), ("keywords", "text"), ("parent_class", "text"), ("file", "text"), ("docstring", "text")],
+            weights={"name": 10, "keywords": 6, "parent_class": 4, "file": 3, "docstring": 1},
+            name="search_text",
+        )
+        await db.documentation_search.create_index([("revision_ids", 1)], name="search_revision")
+        # Symbol prefix lookups, per project and across projects, already in result order
+        await db.symbols.create_index([("project_id", 1), ("name_lower", 1), ("file", 1), ("lineno", 1)], name="sym_project_name")
+        await db.symbols.create_index([("project_id", 1), ("qualified_lower", 1), ("file", 1), ("lineno", 1)], name="sym_project_qualified")
+        await db.symbols.create_index([("name_lower", 1), ("file", 1), ("lineno", 1)], name="sym_name")
+        await db.symbols.create_index([("qualified_lower", 1), ("file", 1), ("lineno", 1)], name="sym_qualified")
+        await db.symbols.create_index([("file_id", 1)], name="sym_file")
+        await db.documentation_archive.create_index([("project_id", 1), ("created_at", -1)], name="archive_project_created")
         logging.getLogger("db").info("MongoDB indexes ensured")
     except Exception as e:
         logging.getLogger("db").exception("Failed to ensure MongoDB indexes: %s", e)
+    # Long-lived pooled client for the inference endpoint
+    await start_hf_client()
+    # Archives revisions beyond the retention policy (REVISION_RETENTION_KEEP=0 turns it off)
+    compactor = asyncio.create_task(run_compactor(db)) if retention_keep() > 0 and compact_interval() > 0 else None
     yield
-    # (Optional) Add shutdown logic here
+    if compactor is not None:
+        compactor.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await compactor
+    await close_hf_client()
+    render_pool.shutdown()
 
 app = FastAPI(
     title="Exceptionals",
@@ -105,10 +150,15 @@ async def ready(db_conn=Depends(get_db)):
     try:
         # motor database has an async command helper
         await db.command("ping")
-        return {"status": "ready"}
+        return {"status": "ready", "inference": hf_health()}
     except Exception as e:
         logger.exception("Readiness check failed: %s", e)
-        return {"status": "degraded", "error": str(e)}
+        return {"status": "degraded", "error": str(e), "inference": hf_health()}
+
+# Inference client metrics (adaptive concurrency limit, queue depth) and render cache counters; admins only
+@app.get("/metrics")
+async def metrics(db_conn=Depends(get_db), current_user=Depends(get_current_user)):
+    return await admin_metrics(db_conn, current_user)
 
 @app.get("/public/test-zip", include_in_schema=True)
 async def download_test_zip_root():
@@ -8,15 +8,20 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 MONGO_URI = os.getenv("MONGO_LOCAL_URI", "mongodb://localhost:27017")
 TEST_DB_NAME = os.getenv("TEST_DB_NAME", "test-db")
+COLLECTIONS = [
+    "projects", "files", "preferences", "documentations", "documentation_results", "documentation_items", "users",
+    "symbols", "documentation_search", "documentation_archive", "generation_tasks", "generation_checkpoints",
+    "maintenance_leases",
+]
 
 @pytest.fixture
 async def db():
     client = AsyncIOMotorClient(MONGO_URI)
     database = client[TEST_DB_NAME]
-    for name in ["projects", "files", "preferences", "documentations", "documentation_results", "users"]:
+    for name in COLLECTIONS:
         await database[name].delete_many({})
     yield database
-    for name in ["projects", "files", "preferences", "documentations", "documentation_results", "users"]:
+    for name in COLLECTIONS:
         await database[name].delete_many({})
     client.close()
 
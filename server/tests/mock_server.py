@@ -36,6 +36,35 @@ async def lifespan(app: FastAPI):
         await db.projects.create_index(
             [("user_id", 1), ("updated_at", -1)], name="proj_user_updated"
         )
+        await db.generation_checkpoints.create_index(
+            [("project_id", 1), ("params_key", 1)], name="gen_ckpt_project_params", unique=True
+        )
+        await db.generation_tasks.create_index(
+            [("status", 1), ("lane", -1), ("created_at", 1)], name="gen_task_claim"
+        )
+        await db.generation_tasks.create_index([("run_id", 1), ("status", 1)], name="gen_task_run")
+        await db.documentations.create_index(
+            [("throughput.endpoint", 1), ("created_at", -1)], name="doc_throughput_endpoint"
+        )
+        # Keyset pagination of revision lists orders by (created_at, _id)
+        await db.documentations.create_index(
+            [("project_id", 1), ("created_at", -1), ("_id", -1)], name="doc_project_created_id"
+        )
+        await db.documentations.create_index([("created_at", -1), ("_id", -1)], name="doc_created_id")
+        # Documentation search: text index scoped by project, weighted so name hits rank first
+        await db.documentation_search.create_index(
+            [("project_id", 1), ("name", "text"), ("keywords", "text"), ("parent_class", "text"), ("file", "text"), ("docstring", "text")],
+            weights={"name": 10, "keywords": 6, "parent_class": 4, "file": 3, "docstring": 1},
+            name="search_text",
+        )
+        await db.documentation_search.create_index([("revision_ids", 1)], name="search_revision")
+        # Symbol prefix lookups, per project and across projects, already in result order
+        await db.symbols.create_index([("project_id", 1), ("name_lower", 1), ("file", 1), ("lineno", 1)], name="sym_project_name")
+        await db.symbols.create_index([("project_id", 1), ("qualified_lower", 1), ("file", 1), ("lineno", 1)], name="sym_project_qualified")
+        await db.symbols.create_index([("name_lower", 1), ("file", 1), ("lineno", 1)], name="sym_name")
+        await db.symbols.create_index([("qualified_lower", 1), ("file", 1), ("lineno", 1)], name="sym_qualified")
+        await db.symbols.create_index([("file_id", 1)], name="sym_file")
+        await db.documentation_archive.create_index([("project_id", 1), ("created_at", -1)], name="archive_project_created")
         logging.getLogger("db").info("Test MongoDB indexes ensured")
     except Exception as e:
         logging.getLogger("db").exception("Failed to ensure test MongoDB indexes: %s", e)
@@ -30,7 +30,8 @@ async def test_generate_documentation_with_mock_hf(monkeypatch, db, project_with
     assert resp.included_files
     assert resp.format == "HTML"
     stored = await db.documentations.find({"project_id": proj_id}).to_list(length=None)
-    assert stored and stored[0].get("results")
+    assert stored and stored[0].get("result_refs")
+    assert stored[0]["item_count"] == resp.total_items
 
 
 @pytest.mark.asyncio
@@ -10,6 +10,7 @@ from controller.DocumentationController import (
     generate_documentation_with_hf,
 )
 from model.DocumentationModel import DocstringItem
+from utils.result_store import load_results, resolve_revision_results
 
 
 def test_normalize_and_file_excluded_helpers():
@@ -97,3 +98,208 @@ async def test_generate_documentation_partial_batch_fallback(monkeypatch, db):
     # Project should be marked completed by generator
     proj = await db.projects.find_one({"_id": ObjectId(proj_id)})
     assert proj.get("status") == "completed"
+
+
+@pytest.mark.asyncio
+async def test_generate_documentation_resumes_from_checkpoint(monkeypatch, db):
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({"_id": ObjectId(proj_id), "name": "ResumeProj", "description": "", "user_id": "u", "tags": [], "status": "empty"})
+    await db.files.insert_one({
+        "project_id": proj_id,
+        "filename": "a.py",
+        "functions": [{"name": "f", "code": "def f():\n  return 1"}, {"name": "g", "code": "def g():\n  return 2"}],
+        "classes": [],
+    })
+    plan = await plan_documentation_generation(proj_id, db)
+    done_prompt = doc_ctrl._make_prompt_for_item(next(it for it in plan.items if it.name == "f"))
+    params_key = doc_ctrl._params_key({"max_length": 128, "temperature": 0.7, "do_sample": True})
+    await db.generation_checkpoints.insert_one({
+        "project_id": proj_id,
+        "params_key": params_key,
+        "outputs": {doc_ctrl._prompt_key(done_prompt): "Checkpointed doc."},
+    })
+
+    sent = []
+
+    async def fake_hf(prompts, parameters=None):
+        sent.extend(prompts)
+        return ["Fresh doc." for _ in prompts]
+
+    monkeypatch.setattr(doc_ctrl, "hf_generate_batch_async", fake_hf)
+
+    resp = await generate_documentation_with_hf(proj_id, db, batch_size=4)
+    by_name = {r.name: r.generated_docstring for r in resp.results}
+    assert by_name["f"] == "Checkpointed doc."
+    assert by_name["g"] == "Fresh doc."
+    assert done_prompt not in sent
+    # Checkpoint is dropped once the revision is saved
+    assert await db.generation_checkpoints.count_documents({"project_id": proj_id}) == 0
+
+
+@pytest.mark.asyncio
+async def test_generate_documentation_streams_rows_as_batches_finish(monkeypatch, db):
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({"_id": ObjectId(proj_id), "name": "StreamProj", "description": "", "user_id": "u", "tags": [], "status": "empty"})
+    await db.files.insert_one({
+        "project_id": proj_id,
+        "filename": "a.py",
+        "functions": [{"name": f"f{i}", "code": f"def f{i}():\n  return {i}"} for i in range(3)],
+        "classes": [],
+    })
+
+    async def fake_hf(prompts, parameters=None):
+        return ["Streamed doc." for _ in prompts]
+
+    monkeypatch.setattr(doc_ctrl, "hf_generate_batch_async", fake_hf)
+    rows = []
+
+    async def on_results(batch):
+        rows.extend(batch)
+
+    resp = await generate_documentation_with_hf(proj_id, db, batch_size=1, on_results=on_results, include_results=False)
+    assert sorted(r["name"] for r in rows) == ["f0", "f1", "f2"]
+    assert all("original_code" not in r and r["generated_docstring"] == "Streamed doc." for r in rows)
+    assert resp.results == [] and resp.revision_id
+    saved = await db.documentations.find_one({"_id": ObjectId(resp.revision_id)})
+    stored = await load_results(db, saved["result_refs"])
+    assert len(stored) == 3 and stored[0]["original_code"]
+
+
+@pytest.mark.asyncio
+async def test_revisions_share_unchanged_result_items(monkeypatch, db):
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({"_id": ObjectId(proj_id), "name": "Shared", "description": "", "user_id": "u", "tags": [], "status": "empty"})
+    await db.files.insert_one({
+        "project_id": proj_id,
+        "filename": "m.py",
+        "functions": [{"name": f"f{i}", "code": f"def f{i}():\n  return {i}"} for i in range(4)],
+        "classes": [],
+    })
+
+    async def fake_hf(prompts, parameters=None):
+        return ["Same doc." for _ in prompts]
+
+    monkeypatch.setattr(doc_ctrl, "hf_generate_batch_async", fake_hf)
+    first = await generate_documentation_with_hf(proj_id, db, batch_size=2)
+    second = await generate_documentation_with_hf(proj_id, db, batch_size=2)
+    revs = await db.documentations.find({"project_id": proj_id}).sort("created_at", 1).to_list(length=None)
+    assert len(revs) == 2 and all("results" not in r for r in revs)
+    assert revs[0]["result_refs"] == revs[1]["result_refs"]
+    # Storage grows with unique content, not with revisions
+    assert await db.documentation_items.count_documents({}) == 4
+    resolved = await resolve_revision_results(db, revs[1])
+    assert [r["name"] for r in resolved] == [r.name for r in second.results] == [r.name for r in first.results]
+    # Older revisions that still embed their rows resolve the same way
+    legacy = {"results": [{"name": "x", "generated_docstring": "d"}]}
+    assert await resolve_revision_results(db, legacy) == legacy["results"]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_generation_lines_and_early_errors():
+    import json
+    from fastapi import HTTPException
+    from view.DocumentationView import _ndjson_generation
+    from model.DocumentationModel import DocumentationGenerationResponse
+
+    async def run(on_results):
+        await on_results([{"name": "f", "type": "function", "file": "a.py", "parent_class": None, "generated_docstring": "Doc."}])
+        return DocumentationGenerationResponse(
+            project_id=str(ObjectId()), format="HTML", total_items=1, included_files=["a.py"], excluded_files=[],
+            results=[], revision_id="rev1",
+        )
+
+    resp = await _ndjson_generation(run)
+    lines = [json.loads(chunk) async for chunk in resp.body_iterator]
+    assert [l["event"] for l in lines] == ["item", "summary"]
+    assert lines[0]["type"] == "function"
+    assert lines[1]["revision_id"] == "rev1" and "results" not in lines[1]
+
+    async def failing(on_results):
+        raise HTTPException(status_code=503, detail="down", headers={"X-Model-Status": "booting"})
+
+    with pytest.raises(HTTPException) as exc:
+        await _ndjson_generation(failing)
+    assert exc.value.status_code == 503
+
+
+async def _seed_small_project(db, name):
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({"_id": ObjectId(proj_id), "name": name, "description": "", "user_id": "u", "tags": [], "status": "empty"})
+    await db.files.insert_one({
+        "project_id": proj_id,
+        "filename": "a.py",
+        "functions": [{"name": "f", "code": "def f():\n  return 1"}],
+        "classes": [],
+    })
+    return proj_id
+
+
+@pytest.mark.asyncio
+async def test_concurrent_generations_of_a_project_share_one_run(monkeypatch, db):
+    import asyncio
+    proj_id = await _seed_small_project(db, "SingleFlight")
+    calls = []
+    gate = asyncio.Event()
+
+    async def fake_hf(prompts, parameters=None):
+        calls.append(prompts)
+        await gate.wait()
+        return ["Doc." for _ in prompts]
+
+    monkeypatch.setattr(doc_ctrl, "hf_generate_batch_async", fake_hf)
+    first = asyncio.create_task(doc_ctrl.generate_documentation_single_flight(proj_id, db, batch_size=2))
+    await asyncio.sleep(0.05)
+    second = asyncio.create_task(doc_ctrl.generate_documentation_single_flight(proj_id, db, batch_size=2))
+    await asyncio.sleep(0.05)
+    assert doc_ctrl.get_generation_run(proj_id).attached == 2
+    gate.set()
+    r1, r2 = await asyncio.gather(first, second)
+    assert r1.revision_id == r2.revision_id
+    assert len(calls) == 1
+    assert await db.documentations.count_documents({"project_id": proj_id}) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_generation_stops_the_run(monkeypatch, db):
+    import asyncio
+    from fastapi import HTTPException
+    proj_id = await _seed_small_project(db, "CancelProj")
+
+    async def never(prompts, parameters=None):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(doc_ctrl, "hf_generate_batch_async", never)
+    waiter = asyncio.create_task(doc_ctrl.generate_documentation_single_flight(proj_id, db, batch_size=2))
+    await asyncio.sleep(0.05)
+    assert await doc_ctrl.cancel_generation(proj_id) is True
+    with pytest.raises(HTTPException) as exc:
+        await waiter
+    assert exc.value.status_code == 409
+    assert doc_ctrl.get_generation_run(proj_id) is None
+    assert await doc_ctrl.cancel_generation(proj_id) is False
+    assert await db.documentations.count_documents({"project_id": proj_id}) == 0
+
+
+@pytest.mark.asyncio
+async def test_revision_listing_projects_summaries_and_pages(db):
+    from utils.revision_listing import list_revision_summaries
+
+    proj_id = str(ObjectId())
+    await db.documentations.insert_many([
+        {"project_id": proj_id, "format": "HTML", "created_at": 1000.0 + (i // 2), "result_refs": ["r"] * 3, "item_count": 3,
+         "preferences_snapshot": {"big": "x" * 1000}, "title": f"t{i}"}
+        for i in range(5)
+    ])
+    # A revision from before the item store: count comes from the embedded rows
+    await db.documentations.insert_one({"project_id": proj_id, "format": "PDF", "created_at": 999.0, "results": [{"name": "a"}, {"name": "b"}]})
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await list_revision_summaries(db, {"project_id": proj_id}, limit=2, cursor=cursor)
+        assert all("result_refs" not in d and "results" not in d and "preferences_snapshot" not in d for d in page)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 6 and len({d["id"] for d in seen}) == 6
+    assert [d["created_at"] for d in seen] == sorted((d["created_at"] for d in seen), reverse=True)
+    assert seen[-1]["item_count"] == 2 and seen[0]["item_count"] == 3
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import utils.generation_runner as generation_runner
+from controller.DocumentationController import generate_documentation_with_hf
+from utils.generation_queue import DONE, LEASED, PENDING, claim_task, complete_task, enqueue_run
+from worker.generation import run_worker
+
+
+@pytest.fixture
+async def tasks_db(db):
+    await db.generation_tasks.delete_many({})
+    yield db
+    await db.generation_tasks.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_and_stale_result_rejected(tasks_db):
+    db = tasks_db
+    await enqueue_run(db, "run-1", "p1", ["a", "b"], [[0, 1]], {}, "u", "batch")
+    first = await claim_task(db, "worker-a", lease=30)
+    assert first["status"] == LEASED and first["attempts"] == 1
+    # Nothing else is claimable while the lease is live
+    assert await claim_task(db, "worker-b") is None
+
+    # worker-a dies: its lease runs out and worker-b takes over
+    await db.generation_tasks.update_one({"_id": first["_id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    second = await claim_task(db, "worker-b")
+    assert second["_id"] == first["_id"] and second["attempts"] == 2
+
+    assert await complete_task(db, first["_id"], "worker-a", ["stale", "stale"]) is False
+    assert await complete_task(db, first["_id"], "worker-b", ["doc a", "doc b"]) is True
+    task = await db.generation_tasks.find_one({"_id": first["_id"]})
+    assert task["status"] == DONE and task["outputs"] == ["doc a", "doc b"]
+
+
+@pytest.mark.asyncio
+async def test_generation_runs_through_workers(monkeypatch, tasks_db):
+    db = tasks_db
+    proj_id = str(ObjectId())
+    await db.projects.insert_one({"_id": ObjectId(proj_id), "name": "WorkerProj", "description": "", "user_id": "u", "tags": [], "status": "empty"})
+    await db.files.insert_one({
+        "project_id": proj_id,
+        "filename": "a.py",
+        "functions": [{"name": f"f{i}", "code": f"def f{i}():\n  return {i}"} for i in range(5)],
+        "classes": [],
+    })
+
+    async def fake_hf(prompts, parameters=None):
+        return [f"Doc {p.split('return ')[-1].split()[0]}." for p in prompts]
+
+    # Workers send batches through the shared runner
+    monkeypatch.setattr(generation_runner, "hf_generate_batch_async", fake_hf)
+    monkeypatch.setenv("GENERATION_WORKERS", "mongo")
+    monkeypatch.setenv("GENERATION_POLL_SECONDS", "0.05")
+
+    stop = asyncio.Event()
+    worker = asyncio.create_task(run_worker(db, "w1", concurrency=2, poll_seconds=0.05, stop=stop))
+    try:
+        resp = await generate_documentation_with_hf(proj_id, db, batch_size=2)
+    finally:
+        stop.set()
+        await worker
+    by_name = {r.name: r.generated_docstring for r in resp.results}
+    assert by_name == {f"f{i}": f"Doc {i}." for i in range(5)}
+    # Run's tasks are removed once aggregated into the revision
+    assert await db.generation_tasks.count_documents({"project_id": proj_id}) == 0
+    assert await db.generation_tasks.count_documents({"status": PENDING}) == 0
@@ -1,3 +1,6 @@
+import json
+import os
+
 from utils.doc_cleaner import clean_for_html, clean_for_markdown, clean_for_pdf, strip_examples_sections
 
 
@@ -27,3 +30,25 @@ def test_clean_for_pdf_basic():
     out = clean_for_pdf(raw)
     assert "Title" in out  # heading kept as plain text (not markdown style)
     assert "```" not in out
+
+
+def _golden_cases():
+    path = os.path.join(os.path.dirname(__file__), "data", "doc_cleaner_golden.json")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_cleaners_match_golden_corpus():
+    # Expected outputs were recorded from the multi-pass cleaner this one replaced
+    cases = _golden_cases()
+    assert len(cases) > 200
+    cleaners = {"markdown": clean_for_markdown, "html": clean_for_html, "pdf": clean_for_pdf}
+    mismatches = [(i, fmt) for i, case in enumerate(cases) for fmt, fn in cleaners.items() if fn(case["input"]) != case[fmt]]
+    assert mismatches == []
+
+
+def test_strip_examples_sections_many_headers():
+    text = "Intro\n\n" + "Example:\n    >>> f()\n\n" * 5000 + "Raises:\n    ValueError: bad"
+    assert strip_examples_sections(text) == "Intro\n\nRaises:\n    ValueError: bad"
+    # Unterminated: everything from the first Examples header is dropped
+    assert strip_examples_sections("Intro\n" + "Examples:\n  x\n" * 3) == "Intro\n"
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+from utils.doc_ir import DOCSTRINGS_VERSION, HTML, MARKDOWN, PDF, DocumentCache, build_document, docstring_variants
+from utils.doc_templates import render_html, render_markdown, render_pdf
+
+RESULTS = [
+    {"name": "zeta", "type": "function", "file": "a.py", "original_code": "def zeta(): ...", "generated_docstring": "Z."},
+    {"name": "Alpha", "type": "function", "file": "a.py", "original_code": "def Alpha(): ...", "generated_docstring": "A `code`."},
+    {"name": "run", "type": "method", "file": "a.py", "parent_class": "Worker", "original_code": "def run(self): ...", "generated_docstring": "Runs."},
+    {"name": "Worker", "type": "class", "file": "a.py", "original_code": "class Worker: ...", "generated_docstring": "Works."},
+    {"name": "close", "type": "method", "file": "b.py", "parent_class": "Conn", "original_code": "def close(self): ...", "generated_docstring": ""},
+]
+
+
+def test_grouping_order_and_anchors():
+    doc = build_document(RESULTS)
+    assert [f.name for f in doc.functions] == ["Alpha", "zeta"]
+    assert [(c.name, c.anchor, c.item is not None) for c in doc.classes] == [("Conn", "cls-0", False), ("Worker", "cls-1", True)]
+    assert [m.anchor for m in doc.classes[1].methods] == ["cls-1-m-0"]
+    assert doc.classes[1].methods[0].title == "Worker::run"
+    assert [it.name for it in doc.items()] == ["Alpha", "zeta", "close", "Worker", "run"]
+
+
+def test_class_defined_twice_in_a_file_is_one_card():
+    results = RESULTS + [
+        {"name": "Worker", "type": "class", "file": "a.py", "original_code": "class Worker:  # again", "generated_docstring": "Works again."},
+        {"name": "stop", "type": "method", "file": "a.py", "parent_class": "Worker", "original_code": "def stop(self): ...", "generated_docstring": "Stops."},
+    ]
+    doc = build_document(results)
+    assert [c.name for c in doc.classes] == ["Conn", "Worker"]
+    worker = doc.classes[1]
+    # The later definition wins; methods of both stay on the one card
+    assert worker.item.code == "class Worker:  # again"
+    assert [m.name for m in worker.methods] == ["run", "stop"]
+    html = render_html("p", results)
+    assert html.count("Works again.") == 1 and "Works." not in html.replace("Works again.", "")
+
+
+def test_each_format_is_cleaned_once_and_shared_by_renders():
+    doc = build_document(RESULTS)
+    with patch("utils.doc_ir.clean_for_html", side_effect=lambda s: s.upper()) as cleaner:
+        first = render_html("p", doc)
+        second = render_html("p", doc)
+    assert first == second and "A `CODE`." in first
+    assert cleaner.call_count == len(RESULTS)
+    # Same output whether the renderers get the rows or the prepared model
+    assert render_markdown("p", doc.prepare(MARKDOWN)) == render_markdown("p", RESULTS)
+    assert render_pdf("p", doc.prepare(PDF)).startswith(b"%PDF")
+    assert doc.functions[0].text(HTML)[0] == "def Alpha(): ..."
+
+
+def test_stored_variants_skip_the_cleaners():
+    rows = [{**r, "docstrings": docstring_variants(r["generated_docstring"]), "docstrings_version": DOCSTRINGS_VERSION} for r in RESULTS]
+    expected = render_markdown("p", RESULTS)
+    with patch("utils.doc_ir.clean_for_html") as html, patch("utils.doc_ir.clean_for_pdf") as pdf, patch("utils.doc_ir.process_docstring_for_markdown") as md:
+        assert render_markdown("p", rows) == expected
+        assert "A code." in render_html("p", rows)
+        render_pdf("p", rows)
+    assert html.call_count == pdf.call_count == md.call_count == 0
+    # Variants written by an older cleaner version are ignored
+    stale = build_document([{**rows[1], "docstrings": {HTML: "stale"}, "docstrings_version": DOCSTRINGS_VERSION - 1}])
+    assert stale.functions[0].text(HTML)[1] == "A code."
+
+
+def test_document_cache_is_lru():
+    cache = DocumentCache(max_entries=2)
+    a = cache.get_or_build("a", RESULTS)
+    cache.get_or_build("b", [])
+    assert cache.get("a") is a
+    cache.get_or_build("c", [])
+    assert cache.get("b") is None and cache.get("a") is a
@@ -0,0 +1,24 @@
+from utils.doc_templates import iter_html, iter_markdown, render_html, render_markdown
+
+RESULTS = [
+    {"name": "helper", "type": "function", "file": "a.py", "original_code": "def helper(x):\n    return x < 1", "generated_docstring": "Helps.\n\nArgs:\n  x (int): value"},
+    {"name": "Thing", "type": "class", "file": "a.py", "original_code": "class Thing: ...", "generated_docstring": "A thing."},
+    {"name": "run", "type": "method", "file": "a.py", "parent_class": "Thing", "original_code": "def run(self): ...", "generated_docstring": "Runs."},
+    {"name": "stop", "type": "method", "file": "b.py", "parent_class": "Orphan", "original_code": "def stop(self): ...", "generated_docstring": ""},
+]
+
+
+def test_streaming_renderers_emit_header_then_one_chunk_per_item():
+    html_chunks = list(iter_html("p", RESULTS, project_name="Demo", revision_id="r1"))
+    # head, 5 cards (helper, Orphan, Orphan::stop, Thing, Thing::run), tail
+    assert html_chunks[0].lstrip().startswith("<!doctype html>") and "</html>" in html_chunks[-1]
+    assert len(html_chunks) == 2 + 5
+    assert "x &lt; 1" in "".join(html_chunks)
+    md_chunks = list(iter_markdown("p", RESULTS, project_name="Demo", revision_id="r1"))
+    assert md_chunks[0].startswith("# Demo") and len(md_chunks) > 4
+
+
+def test_joined_chunks_match_whole_document_renderers():
+    assert "".join(iter_html("p", RESULTS, project_name="Demo")) == render_html("p", RESULTS, project_name="Demo")
+    assert "".join(iter_markdown("p", RESULTS, project_name="Demo")) == render_markdown("p", RESULTS, project_name="Demo")
+    assert render_markdown("p", []).startswith("# Project p")
@@ -0,0 +1,67 @@
+import pytest
+
+from utils.generation_estimator import ThroughputModel, endpoint_key, throughput_sample
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        async def gen():
+            for d in self.docs:
+                yield d
+        return gen()
+
+
+class _FakeDB:
+    def __init__(self, docs):
+        self.queries = 0
+        outer = self
+
+        class _Coll:
+            def find(self, *args, **kwargs):
+                outer.queries += 1
+                return _Cursor(list(docs))
+
+        self.documentations = _Coll()
+
+
+@pytest.mark.asyncio
+async def test_estimate_uses_history_for_same_batch_size(monkeypatch):
+    monkeypatch.setenv("HF_ENDPOINT", "https://hf.example/models/x")
+    monkeypatch.setenv("HF_ENDPOINT_COST_PER_HOUR", "3.6")
+    docs = [{"throughput": throughput_sample(4, 40, 40, 4000, 20.0)}, {"throughput": throughput_sample(4, 8, 8, 800, 6.0)}]
+    assert docs[0]["throughput"]["endpoint"] == endpoint_key() == "hf.example/models/x"
+    db = _FakeDB(docs)
+    model = ThroughputModel()
+    est = await model.estimate(db, batch_size=4, unique_prompts=20, prompt_tokens=2000)
+    # Median of 2.0 and 3.0 seconds per batch over 5 batches
+    assert est["basis"] == "history" and est["batches"] == 5
+    assert est["estimated_seconds"] == 12.5
+    assert est["estimated_cost"] == round(12.5 / 3600 * 3.6, 4)
+    # Cached: a second estimate doesn't query again
+    await model.estimate(db, batch_size=8, unique_prompts=20, prompt_tokens=2000)
+    assert db.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_estimate_falls_back_to_live_metrics_and_warns(monkeypatch):
+    monkeypatch.setenv("GENERATION_WARN_SECONDS", "60")
+    model = ThroughputModel()
+    live = {"limit": 4, "latency_ewma_seconds": 10.0, "queue_depth": 8}
+    est = await model.estimate(_FakeDB([]), batch_size=8, unique_prompts=160, prompt_tokens=9000, live=live)
+    assert est["basis"] == "live"
+    # 20 batches, 4 at a time, 10s each; plus 8 queued requests ahead
+    assert est["estimated_queue_seconds"] == 20.0
+    assert est["estimated_seconds"] == 70.0
+    assert "warning" in est
+    est = await model.estimate(_FakeDB([]), batch_size=8, unique_prompts=8, prompt_tokens=100)
+    assert est["basis"] == "default"
@@ -0,0 +1,63 @@
+import pytest
+
+from utils.generation_queue import DONE, FAILED, LEASED, PENDING, wait_for_run
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Tasks:
+    """Tasks finish in a scripted order, a few per poll."""
+
+    def __init__(self, n, finish_order):
+        self.docs = [{"_id": i, "run_id": "r", "seq": i, "status": LEASED} for i in range(n)]
+        self.finish_order = list(finish_order)
+        self.queries = []
+
+    async def update_many(self, query, update):
+        pass
+
+    async def count_documents(self, query):
+        # Two more tasks finish between polls
+        for seq in self.finish_order[:2]:
+            self.docs[seq]["status"] = FAILED if seq == 3 else DONE
+        del self.finish_order[:2]
+        return sum(d["status"] in (PENDING, LEASED) for d in self.docs)
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        seq = query["seq"]
+        return _Cursor([
+            dict(d) for d in self.docs
+            if d["status"] in query["status"]["$in"] and d["seq"] >= seq["$gte"] and d["seq"] not in seq["$nin"]
+        ])
+
+
+@pytest.mark.asyncio
+async def test_wait_for_run_delivers_each_task_once_behind_a_watermark():
+    class DB:
+        generation_tasks = _Tasks(6, [1, 0, 3, 5, 2, 4])
+    delivered = []
+
+    async def on_task(task):
+        delivered.append(task["seq"])
+
+    assert await wait_for_run(DB(), "r", on_task, poll_seconds=0, timeout=5)
+    assert delivered == [0, 1, 3, 5, 2, 4]
+    # Delivered tasks below the watermark leave the query instead of piling into $nin
+    assert [q["seq"] for q in DB.generation_tasks.queries] == [
+        {"$gte": 0, "$nin": []},
+        {"$gte": 2, "$nin": []},
+        {"$gte": 2, "$nin": [3, 5]},
+    ]
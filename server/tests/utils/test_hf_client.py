@@ -0,0 +1,250 @@
+import asyncio
+import gzip
+import json
+import time
+
+import httpx
+import pytest
+
+import utils.hf_client as hf_client
+from utils.hf_client import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    HFCircuitOpenError,
+    PromptCoalescer,
+    _encode_payload,
+    _failure_status,
+    _is_loading_payload,
+    close_hf_client,
+    hf_breaker_allows,
+    hf_generate_batch_async,
+    hf_metrics,
+    start_hf_client,
+)
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_beyond_limit():
+    lim = AdaptiveConcurrencyLimiter(initial=2, min_limit=1, max_limit=8)
+    await lim.acquire()
+    await lim.acquire()
+    waiter = asyncio.create_task(lim.acquire())
+    await asyncio.sleep(0)
+    assert lim.in_flight == 2
+    assert lim.queue_depth == 1
+    lim.release()
+    await waiter
+    assert lim.in_flight == 2
+    assert lim.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_additive_increase_and_multiplicative_decrease():
+    lim = AdaptiveConcurrencyLimiter(initial=4, min_limit=1, max_limit=16, latency_target=1.0, cooldown=0)
+    for _ in range(4):
+        await lim.acquire()
+    # Saturated and fast: grows by ~1 per window of `limit` successes
+    for _ in range(5):
+        lim.record_success(0.1)
+    assert lim.limit == 5
+    lim.record_overload()
+    assert lim.limit == 2
+    # Slow responses also back off
+    lim.record_success(5.0)
+    assert lim.limit == 1
+    assert lim.snapshot()["decreases"] == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_cooldown_limits_back_to_back_decreases():
+    lim = AdaptiveConcurrencyLimiter(initial=8, min_limit=1, max_limit=16, cooldown=60)
+    lim.record_overload()
+    lim.record_overload()
+    lim.record_overload()
+    assert lim.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancelled_waiter_leaves_queue():
+    lim = AdaptiveConcurrencyLimiter(initial=1)
+    await lim.acquire()
+    waiter = asyncio.create_task(lim.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert lim.queue_depth == 0
+    lim.release()
+    assert lim.in_flight == 0
+
+
+def test_loading_detection_uses_structured_fields():
+    assert _is_loading_payload({"error": "Model is currently loading", "estimated_time": 20.0})
+    assert _is_loading_payload({"estimated_time": 5})
+    # Generated text that merely mentions loading is a normal result
+    assert not _is_loading_payload([{"generated_text": "Loading config and warm caches."}])
+    assert not _is_loading_payload({"generated_text": "loading"})
+
+
+def test_failure_status_reports_booting_only_while_loading():
+    assert _failure_status(503, None) == "booting"
+    assert _failure_status(200, {"error": "Model is currently loading", "estimated_time": 20.0}) == "booting"
+    assert _failure_status(400, {"error": "Endpoint is paused"}) == "paused"
+    assert _failure_status(500, {"error": "CUDA out of memory"}) == "failing"
+    assert _failure_status(502, None) == "failing"
+    assert _failure_status(None, None) == "failing"
+    assert _failure_status(200, [{"generated_text": "ok"}]) is None
+
+
+def test_encode_payload_gzips_large_bodies(monkeypatch):
+    payload = {"inputs": ["x" * 100] * 50}
+    monkeypatch.setenv("HF_GZIP_REQUESTS", "0")
+    body, extra = _encode_payload(payload)
+    assert extra == {}
+    assert json.loads(body) == payload
+    monkeypatch.setenv("HF_GZIP_REQUESTS", "1")
+    monkeypatch.setenv("HF_GZIP_MIN_BYTES", "1024")
+    body, extra = _encode_payload(payload)
+    assert extra == {"Content-Encoding": "gzip"}
+    assert json.loads(gzip.decompress(body)) == payload
+
+
+@pytest.mark.asyncio
+async def test_managed_client_is_reused(monkeypatch):
+    monkeypatch.setenv("HF_ENDPOINT", "http://hf.test/generate")
+    monkeypatch.setenv("HF_TOKEN", "t")
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json=[{"generated_text": f"doc {i}"} for i, _ in enumerate(seen[-1]["inputs"])])
+
+    await start_hf_client(transport=httpx.MockTransport(handler))
+    try:
+        out1 = await hf_generate_batch_async(["a", "b"])
+        out2 = await hf_generate_batch_async(["c"])
+        assert out1 == ["doc 0", "doc 1"]
+        assert out2 == ["doc 0"]
+        assert hf_metrics()["client"]["managed"] is True
+    finally:
+        await close_hf_client()
+    assert len(seen) == 2
+
+
+def test_circuit_breaker_transitions():
+    br = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert br.allow_request()
+    br.record_failure("booting")
+    assert br.state == CircuitBreaker.CLOSED
+    br.record_failure("booting")
+    assert br.state == CircuitBreaker.OPEN
+    assert not br.allow_request()
+    time.sleep(0.06)
+    assert br.state == CircuitBreaker.HALF_OPEN
+    # Only the probe is let through, and only one at a time
+    assert not br.allow_request()
+    assert br.allow_request(probe=True)
+    assert not br.allow_request(probe=True)
+    br.record_failure("paused")
+    assert br.state == CircuitBreaker.OPEN
+    assert br.model_status == "paused"
+    time.sleep(0.06)
+    assert br.allow_request(probe=True)
+    br.record_success()
+    assert br.state == CircuitBreaker.CLOSED
+    assert [t["to"] for t in br.snapshot()["transitions"]] == ["open", "half_open", "open", "half_open", "closed"]
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_without_request(monkeypatch):
+    monkeypatch.setenv("HF_ENDPOINT", "http://hf.test/generate")
+    monkeypatch.setenv("HF_TOKEN", "t")
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return httpx.Response(503, json={"error": "Model is currently loading", "estimated_time": 30})
+
+    br = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(hf_client, "hf_breaker", br)
+    await start_hf_client(transport=httpx.MockTransport(handler))
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await hf_generate_batch_async(["a"])
+        assert br.state == CircuitBreaker.OPEN
+        with pytest.raises(HFCircuitOpenError) as exc:
+            await hf_generate_batch_async(["b"])
+        assert exc.value.model_status == "booting"
+    finally:
+        await close_hf_client()
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_refused_generation_starts_probe_and_closes_breaker(monkeypatch):
+    monkeypatch.setenv("HF_ENDPOINT", "http://hf.test/generate")
+    monkeypatch.setenv("HF_TOKEN", "t")
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return httpx.Response(200, json=[{"generated_text": "ok"}])
+
+    br = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    monkeypatch.setattr(hf_client, "hf_breaker", br)
+    await start_hf_client(transport=httpx.MockTransport(handler))
+    try:
+        br.record_failure("booting")
+        assert br.state == CircuitBreaker.OPEN
+        assert not hf_breaker_allows()
+        assert hf_client._probe_task is None or hf_client._probe_task.done()
+        await asyncio.sleep(0.06)
+        assert br.state == CircuitBreaker.HALF_OPEN
+        # The generation pre-check is refused, but it starts the probe that closes the breaker
+        assert not hf_breaker_allows()
+        await hf_client._probe_task
+        assert br.state == CircuitBreaker.CLOSED
+        assert hf_breaker_allows()
+    finally:
+        await close_hf_client()
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_coalescer_dedupes_and_shares_in_flight_prompts():
+    coalescer = PromptCoalescer()
+    sent = []
+    release = asyncio.Event()
+
+    async def fake_generate(inputs, parameters=None):
+        sent.append(list(inputs))
+        await release.wait()
+        return [f"doc:{p}" for p in inputs]
+
+    first = asyncio.create_task(coalescer.generate(["a", "b", "a"], generate=fake_generate))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(coalescer.generate(["b", "c"], generate=fake_generate))
+    await asyncio.sleep(0)
+    release.set()
+    assert await first == ["doc:a", "doc:b", "doc:a"]
+    assert await second == ["doc:b", "doc:c"]
+    # "a" sent once despite the duplicate; "b" shared with the in-flight first call
+    assert sent == [["a", "b"], ["c"]]
+    snap = coalescer.snapshot()
+    assert snap["deduped"] == 1 and snap["coalesced"] == 1 and snap["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_coalescer_short_batch_and_errors():
+    coalescer = PromptCoalescer()
+
+    async def short(inputs, parameters=None):
+        return ["only-one"]
+
+    assert await coalescer.generate(["x", "y"], generate=short) == ["only-one", None]
+
+    async def boom(inputs, parameters=None):
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        await coalescer.generate(["z"], generate=boom)
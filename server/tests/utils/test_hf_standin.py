@@ -0,0 +1,49 @@
+import httpx
+import pytest
+
+from benchmarks.generation_bench import percentile
+from benchmarks.hf_standin import StandinConfig, create_app
+from utils.hf_client import close_hf_client, hf_generate_batch_async, start_hf_client
+
+
+@pytest.fixture
+async def standin(monkeypatch):
+    monkeypatch.setenv("HF_ENDPOINT", "http://hf-standin/generate")
+    monkeypatch.setenv("HF_TOKEN", "t")
+
+    async def _start(**cfg):
+        app = create_app(StandinConfig(token_latency_ms=0, base_latency_ms=0, **cfg))
+        await start_hf_client(transport=httpx.ASGITransport(app=app))
+        return app
+
+    yield _start
+    await close_hf_client()
+
+
+@pytest.mark.asyncio
+async def test_standin_speaks_hf_batch_schema(standin):
+    app = await standin()
+    prompts = ["FUNCTION: add\n```python\ndef add(a, b):\n    return a + b\n```", "METHOD: run (class Job)\n```python\ndef run(self): ...\n```"]
+    out = await hf_generate_batch_async(prompts, parameters={"max_length": 16})
+    assert len(out) == 2
+    assert out[0].startswith("add function")
+    assert out[1].startswith("run method")
+    assert app.state.stats.prompts == 2
+
+
+@pytest.mark.asyncio
+async def test_standin_warmup_and_rate_limit(standin):
+    await standin(warmup_requests=1, burst_every=2, burst_length=1)
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        await hf_generate_batch_async(["FUNCTION: f"])
+    assert exc.value.response.status_code == 503
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        await hf_generate_batch_async(["FUNCTION: f"])
+    assert exc.value.response.status_code == 429
+    assert await hf_generate_batch_async(["FUNCTION: f"])
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) is None
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([5.0], 99) == 5.0
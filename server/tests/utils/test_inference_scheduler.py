@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from utils.hf_client import AdaptiveConcurrencyLimiter
+from utils.inference_scheduler import BATCH, INTERACTIVE, FairShareScheduler, InferenceJob, current_job, inference_job
+
+
+async def _hold(scheduler, job, order, release: asyncio.Event):
+    async with scheduler.slot(job):
+        order.append(job.tenant)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_uses_reserved_slot_under_batch_load():
+    sched = FairShareScheduler(AdaptiveConcurrencyLimiter(initial=3), reserved_interactive=1)
+    release = asyncio.Event()
+    order = []
+    batch = [asyncio.create_task(_hold(sched, InferenceJob("bulk", BATCH), order, release)) for _ in range(10)]
+    await asyncio.sleep(0)
+    # Batch work is held to limit - reserved; the rest queues
+    assert sched.snapshot()["lanes"][BATCH]["running"] == 2
+    demo = InferenceJob("demo", INTERACTIVE)
+    small = asyncio.create_task(_hold(sched, demo, order, release))
+    await asyncio.sleep(0)
+    assert "demo" in order
+    assert demo.max_queue_wait_seconds < 0.05
+    release.set()
+    await asyncio.gather(small, *batch)
+    assert sched.in_flight == 0 and sched.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_slots_fairly_and_respect_cap():
+    sched = FairShareScheduler(AdaptiveConcurrencyLimiter(initial=1), reserved_interactive=0, tenant_cap=1)
+    order = []
+    gate = asyncio.Event()
+    heavy = [asyncio.create_task(_hold(sched, InferenceJob("heavy", BATCH), order, gate)) for _ in range(6)]
+    await asyncio.sleep(0)
+    light = [asyncio.create_task(_hold(sched, InferenceJob("light", BATCH), order, gate)) for _ in range(2)]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(*heavy, *light)
+    # The light tenant doesn't wait for all of the heavy tenant's queue
+    assert order.index("light") <= 2
+    assert [i for i, t in enumerate(order) if t == "light"][-1] <= 4
+
+    capped = FairShareScheduler(AdaptiveConcurrencyLimiter(initial=4), reserved_interactive=0, tenant_cap=2)
+    hold = asyncio.Event()
+    tasks = [asyncio.create_task(_hold(capped, InferenceJob("heavy", BATCH), [], hold)) for _ in range(5)]
+    await asyncio.sleep(0)
+    snap = capped.snapshot()
+    assert snap["tenants_running"] == 1 and snap["tenant_running_max"] == 2
+    hold.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue_and_context_tags_job():
+    sched = FairShareScheduler(AdaptiveConcurrencyLimiter(initial=1), reserved_interactive=0)
+    release = asyncio.Event()
+    order = []
+    first = asyncio.create_task(_hold(sched, InferenceJob("a", BATCH), order, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(sched, InferenceJob("b", BATCH), order, release))
+    await asyncio.sleep(0)
+    assert sched.queue_depth == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert sched.queue_depth == 0
+    release.set()
+    await first
+    assert sched.in_flight == 0
+
+    with inference_job("user-1", INTERACTIVE) as job:
+        assert current_job() is job
+    assert current_job().tenant == "anonymous"
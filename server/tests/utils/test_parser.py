@@ -33,3 +33,13 @@ def test_extract_py_files_from_zip(tmp_path):
     out = extract_py_files_from_zip(buf.getvalue())
     names = {f["filename"] for f in out}
     assert "pkg/a.py" in names
+
+
+def test_entries_carry_line_spans():
+    code = "import os\n\n@cache\ndef f():\n    return 1\n\nclass A:\n    def m(self):\n        pass\n"
+    res = extract_functions_classes_from_content(code)
+    f = res["functions"][0]
+    assert (f["lineno"], f["end_lineno"]) == (3, 5)  # decorator included
+    cls = res["classes"][0]
+    assert (cls["lineno"], cls["end_lineno"]) == (7, 9)
+    assert (cls["methods"][0]["lineno"], cls["methods"][0]["end_lineno"]) == (8, 9)
@@ -0,0 +1,63 @@
+import textwrap
+
+from utils.prompt_compactor import compact_code, compaction_stats, estimate_tokens
+
+
+LONG_FUNC = textwrap.dedent('''
+    @cached
+    def load(path: str, strict: bool = False) -> dict:
+        """Load a config file."""
+        data = {}
+        with open(path) as fh:
+            for line in fh:
+                key, _, value = line.partition("=")
+                data[key.strip()] = value.strip()
+                if strict and not key:
+                    raise ValueError("empty key")
+        for k in list(data):
+            data[k] = data[k].lower()
+            data[k] = data[k].replace(" ", "_")
+        return data
+''').strip()
+
+
+def test_function_keeps_signature_docstring_and_exit_paths():
+    out = compact_code(LONG_FUNC, token_budget=200)
+    assert out.splitlines()[0] == "@cached"
+    assert "def load(path: str, strict: bool=False) -> dict:" in out
+    assert '"""Load a config file."""' in out
+    assert "raise ValueError('empty key')" in out
+    assert "return data" in out
+    assert "partition" not in out and "..." in out
+    assert estimate_tokens(out) < estimate_tokens(LONG_FUNC)
+
+
+def test_class_keeps_attributes_and_method_signatures():
+    code = textwrap.dedent('''
+        class Cache(Base):
+            ttl = 60
+
+            def __init__(self, size):
+                self.size = size
+                self._store = {}
+
+            def get(self, key, default=None):
+                if key in self._store:
+                    return self._store[key]
+                return default
+    ''').strip()
+    out = compact_code(code, token_budget=200)
+    assert out.startswith("class Cache(Base):")
+    assert "ttl = 60" in out and "self.size = size" in out
+    assert "def get(self, key, default=None): ..." in out
+    assert "return default" not in out
+
+
+def test_budget_and_fallbacks():
+    assert estimate_tokens(compact_code(LONG_FUNC, token_budget=32)) <= 32
+    # Small bodies are kept verbatim; unparseable code is token-truncated
+    assert compact_code("def add(a, b):\n    return a + b") == "def add(a, b):\n    return a + b"
+    broken = "def broken(:\n" + "    x = 1\n" * 100
+    assert compact_code(broken, token_budget=40).endswith("...")
+    stats = compaction_stats(200, 50, 3)
+    assert stats["tokens_saved"] == 150 and stats["reduction_pct"] == 75.0
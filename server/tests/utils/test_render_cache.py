@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from utils.render_cache import RenderCache, etag_matches, make_etag
+
+
+def test_etag_matching():
+    etag = make_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+
+@pytest.mark.asyncio
+async def test_render_once_then_memory_and_disk_hits(tmp_path):
+    cache = RenderCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=10_000)
+    calls = 0
+
+    async def render():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "<html>doc</html>"
+
+    key = RenderCache.key("rev1", "HTML", 0)
+    (a, etag_a), (b, etag_b) = await asyncio.gather(cache.get_or_render(key, render), cache.get_or_render(key, render))
+    assert calls == 1 and a == b == b"<html>doc</html>" and etag_a == etag_b == make_etag(a)
+
+    # A fresh process on the same node finds the artifact on disk
+    other = RenderCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=10_000)
+    assert await other.lookup(key) == (a, etag_a)
+    assert other.snapshot()["disk_hits"] == 1
+
+    # Metadata edits change the key; invalidation clears both tiers
+    assert RenderCache.key("rev1", "HTML", 1) != key
+    cache.invalidate("rev1")
+    assert await cache.lookup(key) is None and not list(tmp_path.glob("rev1-*"))
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = RenderCache(max_bytes=10, disk_dir=None, disk_max_bytes=0)
+    cache._remember("a", b"12345", "ea")
+    cache._remember("b", b"12345", "eb")
+    cache._mem.move_to_end("a")
+    cache._remember("c", b"12345", "ec")
+    assert list(cache._mem) == ["a", "c"] and cache.snapshot()["memory_bytes"] == 10
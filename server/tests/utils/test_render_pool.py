@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.render_pool import RenderPool
+
+ROWS = [{"name": "f", "type": "function", "file": "a.py", "parent_class": None, "original_code": "def f(): pass", "generated_docstring": "Doc."}]
+
+
+@pytest.mark.asyncio
+async def test_pdf_renders_in_worker_process():
+    pool = RenderPool(workers=1, max_pending=1, timeout=60, inline_max_items=200)
+    try:
+        pdf = await pool.render("PDF", "p", ROWS, revision_id="r")
+        assert pdf.startswith(b"%PDF")
+        # Small HTML stays on the caller's thread
+        html = await pool.render("HTML", "p", ROWS)
+        assert "<html" in html.lower()
+        assert pool.snapshot()["rendered"] == 1 and pool.snapshot()["inline"] == 1 and pool.snapshot()["busy"] == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_and_timeouts_return_503():
+    pool = RenderPool(workers=1, max_pending=1, timeout=0.001, inline_max_items=0)
+    try:
+        pool._busy = 1
+        with pytest.raises(HTTPException) as exc:
+            await pool.render("PDF", "p", ROWS)
+        assert exc.value.status_code == 503 and exc.value.headers["Retry-After"]
+        pool._busy = 0
+        # Worker start-up alone outlasts this timeout
+        with pytest.raises(HTTPException) as exc:
+            await pool.render("PDF", "p", ROWS)
+        assert exc.value.status_code == 503
+        assert pool.snapshot()["timeouts"] == 1 and pool.snapshot()["rejected"] == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,103 @@
+import pytest
+
+import utils.result_store as result_store
+from utils.doc_ir import DOCSTRINGS_VERSION, HTML, MARKDOWN, PDF
+from utils.result_store import item_hash, load_results, store_results
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Items:
+    def __init__(self):
+        self.docs = {}
+        self.writes = 0
+
+    async def update_many(self, query, update):
+        for i in query["_id"]["$in"]:
+            if i in self.docs:
+                self.docs[i].update(update["$set"])
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.writes += 1
+            self.docs.setdefault(op._filter["_id"], {"_id": op._filter["_id"], **op._doc["$setOnInsert"]})
+            self.docs[op._filter["_id"]].update(op._doc.get("$set", {}))
+
+    def find(self, query, projection=None):
+        ids = query["_id"]["$in"]
+        keep = lambda d: {k: v for k, v in d.items() if k == "_id" or not projection or k in projection}
+        return _Cursor([keep(self.docs[i]) for i in ids if i in self.docs])
+
+
+class _DB:
+    def __init__(self):
+        self.documentation_items = _Items()
+
+
+def _row(name, doc="Doc."):
+    return {"name": name, "type": "function", "file": "a.py", "parent_class": None, "original_code": f"def {name}(): pass", "generated_docstring": doc}
+
+
+def test_item_hash_covers_code_and_docstring():
+    assert item_hash(_row("f")) == item_hash(dict(_row("f")))
+    assert item_hash(_row("f")) != item_hash(_row("f", "Other."))
+    assert item_hash(_row("f")) != item_hash({**_row("f"), "original_code": "def f(): return 1"})
+    # Raw model output only counts when present, so rows stored before it keep their refs
+    assert item_hash({**_row("f"), "raw_docstring": None}) == item_hash(_row("f"))
+    assert item_hash({**_row("f"), "raw_docstring": "**Doc.**"}) != item_hash(_row("f"))
+
+
+@pytest.mark.asyncio
+async def test_store_dedupes_and_load_preserves_order():
+    db = _DB()
+    rows = [_row("b"), _row("a"), _row("b")]
+    refs = await store_results(db, rows)
+    assert refs[0] == refs[2] and len(db.documentation_items.docs) == 2
+    # A second revision with one changed docstring adds only that item
+    refs2 = await store_results(db, [_row("b"), _row("a", "Changed.")])
+    assert refs2[0] == refs[0] and len(db.documentation_items.docs) == 3
+    loaded = await load_results(db, refs)
+    assert [r["name"] for r in loaded] == ["b", "a", "b"]
+    assert loaded[1]["original_code"] == "def a(): pass"
+
+
+@pytest.mark.asyncio
+async def test_store_precleans_docstrings_once_for_rendering():
+    db = _DB()
+    refs = await store_results(db, [{**_row("f", "Uses *x*."), "raw_docstring": "Uses `*x*`."}])
+    stored = db.documentation_items.docs[refs[0]]
+    assert stored["raw_docstring"] == "Uses `*x*`." and stored["docstrings_version"] == DOCSTRINGS_VERSION
+    # Variants come from the raw output: Markdown keeps the code span the HTML cleaner dropped
+    assert stored["docstrings"][HTML] == "Uses x." and stored["docstrings"][MARKDOWN] == "Uses `*x*`."
+    assert stored["docstrings"][PDF] == "Uses x."
+    # API reads leave the variants out; renderers ask for them
+    assert "docstrings" not in (await load_results(db, refs))[0]
+    assert (await load_results(db, refs, variants=True))[0]["docstrings"][HTML] == "Uses x."
+
+
+@pytest.mark.asyncio
+async def test_store_touches_existing_items_without_recleaning(monkeypatch):
+    db = _DB()
+    cleaned = []
+    real = result_store.docstring_variants
+    monkeypatch.setattr(result_store, "docstring_variants", lambda doc: cleaned.append(doc) or real(doc))
+    refs = await store_results(db, [_row("a"), _row("b")])
+    first_seen = db.documentation_items.docs[refs[0]]["last_referenced_at"]
+    assert len(cleaned) == 2 and db.documentation_items.writes == 2
+    refs2 = await store_results(db, [_row("a"), _row("b", "Changed.")])
+    # Only the new item is cleaned and written; the reused one is just marked referenced again
+    assert cleaned[2:] == ["Changed."] and db.documentation_items.writes == 3
+    item = db.documentation_items.docs[refs2[0]]
+    assert item["last_referenced_at"] >= first_seen and item["created_at"] <= item["last_referenced_at"]
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from utils.revision_archive import acquire_lease, archive_revision, find_revision, pack, select_for_archive, split_revision, unpack
+
+
+def _revision(**extra):
+    return {
+        "_id": ObjectId(),
+        "project_id": "p1",
+        "format": "HTML",
+        "created_at": 100.0,
+        "title": "v1",
+        "item_count": 2,
+        "result_refs": ["a" * 64, "b" * 64],
+        "preferences_snapshot": {"format": "HTML", "exclude": ["tests"] * 50},
+        "included_files": ["pkg/a.py", "pkg/b.py"],
+        "prompt_stats": {"tokens": 1234},
+        **extra,
+    }
+
+
+def test_split_keeps_listing_fields_on_the_stub():
+    hot, cold = split_revision({**_revision(), "rehydrated_at": 5.0})
+    assert set(hot) == {"_id", "project_id", "format", "created_at", "title", "item_count"}
+    assert set(cold) == {"result_refs", "preferences_snapshot", "included_files", "prompt_stats"}
+    # Embedded rows of older revisions are counted for the stub
+    hot, cold = split_revision({"_id": 1, "results": [{}, {}, {}]})
+    assert hot["item_count"] == 3 and cold == {"results": [{}, {}, {}]}
+
+
+def test_pack_round_trips_and_compresses():
+    _, cold = split_revision(_revision())
+    blob = pack(cold)
+    assert unpack(blob) == cold
+    assert len(blob) < len(str(cold))
+
+
+def test_select_keeps_newest_pinned_and_recently_rehydrated():
+    revs = [{"_id": i} for i in range(6)]
+    revs[3]["pinned"] = True
+    revs[4]["archived"] = True
+    revs[5]["rehydrated_at"] = 990.0
+    assert select_for_archive(revs, keep=2, now=1000.0, hold=60) == [2]
+    assert select_for_archive(revs, keep=2, now=1100.0, hold=60) == [2, 5]
+    assert select_for_archive(revs, keep=10, now=1000.0, hold=60) == []
+
+
+def _matches(doc, query):
+    for k, v in query.items():
+        if isinstance(v, dict) and "$ne" in v:
+            if doc.get(k) == v["$ne"]:
+                return False
+        elif doc.get(k) != v:
+            return False
+    return True
+
+
+class _Coll:
+    def __init__(self, docs=()):
+        self.docs = {d["_id"]: dict(d) for d in docs}
+
+    async def find_one(self, query, projection=None):
+        for d in self.docs.values():
+            if _matches(d, query):
+                if projection and any(projection.values()):
+                    return {k: v for k, v in d.items() if k == "_id" or k in projection}
+                return dict(d)
+        return None
+
+    async def update_one(self, query, update):
+        class R:
+            modified_count = 0
+        for d in self.docs.values():
+            if _matches(d, query):
+                d.update(update.get("$set", {}))
+                for k in update.get("$unset", {}):
+                    d.pop(k, None)
+                R.modified_count = 1
+                break
+        return R()
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+class _DB:
+    def __init__(self, revisions):
+        self.documentations = _Coll(revisions)
+        self.documentation_archive = _Coll()
+
+
+@pytest.mark.asyncio
+async def test_archive_then_find_rehydrates_transparently():
+    rev = _revision()
+    db = _DB([rev])
+    assert await archive_revision(db, rev["_id"])
+    stub = db.documentations.docs[rev["_id"]]
+    assert stub["archived"] and "result_refs" not in stub and stub["title"] == "v1"
+    entry = db.documentation_archive.docs[rev["_id"]]
+    assert entry["result_refs"] == rev["result_refs"] and entry["project_id"] == "p1"
+    # Already archived: nothing to do
+    assert not await archive_revision(db, rev["_id"])
+
+    # An inclusion projection still sees the flag and gets the restored fields
+    doc = await find_revision(db, {"_id": rev["_id"], "project_id": "p1"}, {"result_refs": 1})
+    assert doc["result_refs"] == rev["result_refs"]
+    full = db.documentations.docs[rev["_id"]]
+    assert "archived" not in full and full["rehydrated_at"] > 0
+    assert {k: v for k, v in full.items() if k != "rehydrated_at"} == rev
+    assert rev["_id"] not in db.documentation_archive.docs
+
+
+class _Leases:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            self.docs[query["_id"]] = dict(update["$set"])
+        elif doc["owner"] == query["$or"][0]["owner"] or doc["expires_at"] < query["$or"][1]["expires_at"]["$lt"]:
+            doc.update(update["$set"])
+        else:
+            raise DuplicateKeyError("E11000 duplicate key")
+
+
+@pytest.mark.asyncio
+async def test_compactor_lease_has_one_holder_until_it_expires():
+    class DB:
+        maintenance_leases = _Leases()
+    db = DB()
+    assert await acquire_lease(db, "compactor", "a", 60)
+    assert not await acquire_lease(db, "compactor", "b", 60)
+    # The holder renews its own lease
+    assert await acquire_lease(db, "compactor", "a", 60)
+    db.maintenance_leases.docs["compactor"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert await acquire_lease(db, "compactor", "b", 60)
+    assert db.maintenance_leases.docs["compactor"]["owner"] == "b"
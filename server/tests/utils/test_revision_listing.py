@@ -0,0 +1,19 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.revision_listing import MAX_LIMIT, clamp_limit, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    cursor = encode_cursor({"_id": oid, "created_at": 1712345678.123456})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (1712345678.123456, oid)
+
+
+def test_bad_cursor_and_limits():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+    assert clamp_limit(0) == 50 and clamp_limit(10_000) == MAX_LIMIT and clamp_limit(-3) == 1
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.doc_ir import build_document
+from utils.revision_viewer import MAX_PAGE_SIZE, clamp_page_size, item_page, page_of_anchor, table_of_contents
+
+RESULTS = [
+    {"name": "beta", "type": "function", "file": "a.py", "original_code": "def beta(): ...", "generated_docstring": "B `x`."},
+    {"name": "alpha", "type": "function", "file": "a.py", "original_code": "def alpha(): ...", "generated_docstring": "A."},
+    {"name": "Store", "type": "class", "file": "s.py", "original_code": "class Store: ...", "generated_docstring": "Stores."},
+    {"name": "get", "type": "method", "file": "s.py", "parent_class": "Store", "original_code": "def get(self): ...", "generated_docstring": "Gets."},
+    {"name": "close", "type": "method", "file": "c.py", "parent_class": "Conn", "original_code": "def close(self): ...", "generated_docstring": "Closes."},
+]
+
+
+def test_toc_lists_entries_in_reading_order_without_bodies():
+    toc = table_of_contents(build_document(RESULTS))
+    assert toc["item_count"] == 5 and toc["entries"] == 6
+    assert [(e["index"], e["name"]) for e in toc["functions"]] == [(0, "alpha"), (1, "beta")]
+    conn, store = toc["classes"]
+    # A class known only from its methods still gets an entry, filed under the methods' file
+    assert (conn["name"], conn["kind"], conn["file"], conn["index"]) == ("Conn", "class", "c.py", 2)
+    assert [(m["index"], m["anchor"], m["parent_class"]) for m in store["methods"]] == [(5, "cls-1-m-0", "Store")]
+    assert "code" not in store and "docstring" not in store["methods"][0]
+
+
+def test_item_pages_and_anchor_lookup():
+    doc = build_document(RESULTS)
+    page = item_page(doc, 1, 4, "HTML")
+    assert (page["page"], page["pages"], page["total"]) == (1, 2, 6)
+    assert [it["anchor"] for it in page["items"]] == ["cls-1", "cls-1-m-0"]
+    assert page["items"][1]["docstring"] == "Gets."
+    assert item_page(doc, 0, 1, "HTML")["items"][0]["code"] == "def alpha(): ..."
+    assert item_page(doc, 1, 1, "MARKDOWN")["items"][0]["docstring"] == "B `x`."
+    assert item_page(doc, 1, 1, "HTML")["items"][0]["docstring"] == "B x."
+    assert page_of_anchor(doc, "cls-1-m-0", 4) == 1 and page_of_anchor(doc, "fn-0", 4) == 0
+    with pytest.raises(HTTPException):
+        page_of_anchor(doc, "missing", 4)
+    with pytest.raises(HTTPException):
+        item_page(doc, 2, 4, "HTML")
+    assert clamp_page_size(None) == 50 and clamp_page_size(10_000) == MAX_PAGE_SIZE and clamp_page_size(-3) == 1
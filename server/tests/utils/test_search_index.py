@@ -0,0 +1,140 @@
+import pytest
+from fastapi import HTTPException
+from pymongo import DeleteOne, UpdateOne
+
+from utils.doc_ir import HTML
+from utils.search_index import entry_fields, index_ops, index_updates, search_filter, snippet, unindex_revisions
+
+
+def _item(name="getUserName", parent=None, doc="Return the user's *name*."):
+    return {"name": name, "type": "method" if parent else "function", "file": "api/user_service.py", "parent_class": parent, "generated_docstring": doc}
+
+
+def test_entry_fields_split_identifiers_and_clean_docstring():
+    e = entry_fields("p1", "ref1", _item(parent="UserStore"))
+    assert e["kind"] == "method" and e["parent_class"] == "UserStore"
+    assert e["keywords"].split() == ["get", "user", "name", "store", "api", "service", "py"]
+    assert e["docstring"] == "Return the user's name."
+    # Pre-cleaned HTML variant is used when the item has one
+    assert entry_fields("p1", "ref1", {**_item(), "docstrings": {HTML: "Stored."}})["docstring"] == "Stored."
+    assert entry_fields("p1", "ref1", _item())["parent_class"] is None
+
+
+def _value(expr, doc):
+    """Evaluates the aggregation expressions index_updates uses."""
+    if isinstance(expr, str):
+        return doc.get(expr[1:]) if expr.startswith("$") else expr
+    if isinstance(expr, list):
+        return [_value(e, doc) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    if op == "$literal":
+        return args
+    args = _value(args, doc)
+    if op == "$ifNull":
+        return args[0] if args[0] is not None else args[1]
+    if op == "$setUnion":
+        return list(dict.fromkeys(args[0] + args[1]))
+    if op == "$cond":
+        return args[1] if args[0] else args[2]
+    if op == "$gte":
+        return args[0] >= args[1]
+    if op == "$max":
+        return max(args)
+    raise AssertionError(op)
+
+
+def _apply(entries, updates):
+    for query, pipeline in updates:
+        doc = entries.setdefault(query["_id"], dict(query))
+        for stage in pipeline:
+            doc.update({k: _value(v, doc) for k, v in stage["$set"].items()})
+
+
+def test_index_updates_upsert_per_item_and_keep_values_literal():
+    entries = {}
+    items = {"r1": _item(doc="$cost in dollars"), "r2": _item("other")}
+    _apply(entries, index_updates("p1", "rev2", 200.0, items))
+    # An older revision indexed afterwards (backfill) joins without taking over
+    _apply(entries, index_updates("p1", "rev1", 100.0, {"r1": items["r1"]}))
+    assert sorted(entries) == ["p1:r1", "p1:r2"]
+    e = entries["p1:r1"]
+    assert sorted(e["revision_ids"]) == ["rev1", "rev2"] and e["latest_revision_id"] == "rev2" and e["last_seen"] == 200.0
+    assert e["docstring"] == "$cost in dollars"
+    assert entries["p1:r2"]["revision_ids"] == ["rev2"]
+    assert index_ops("p1", "rev2", 200.0, items) == [UpdateOne(f, u, upsert=True) for f, u in index_updates("p1", "rev2", 200.0, items)]
+
+
+def test_search_filter():
+    q = search_filter("p1", "  getUser   token ")
+    assert q["project_id"] == "p1"
+    assert q["$text"]["$search"] == "getUser token get user"
+    assert "revision_ids" not in q
+    assert search_filter("p1", "x", revision_id="rev1")["revision_ids"] == "rev1"
+    with pytest.raises(HTTPException) as e:
+        search_filter("p1", "   ")
+    assert e.value.status_code == 400
+
+
+def test_snippet_centers_on_first_hit():
+    text = "Intro. " * 60 + "Validates the token signature. " + "Tail. " * 60
+    s = snippet(text, "token", width=80)
+    assert "token" in s and s.startswith("…") and s.endswith("…") and len(s) == 82
+    assert snippet("Short  doc\n text.", "x") == "Short doc text."
+    assert snippet(text, "absent", width=20) == text[:20] + "…"
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Search:
+    def __init__(self, docs):
+        self.docs = {d["_id"]: d for d in docs}
+        self.ops = []
+
+    def find(self, query, projection=None):
+        ids = set(query["revision_ids"]["$in"])
+        return _Cursor([dict(d) for d in self.docs.values() if ids & set(d["revision_ids"])])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops.extend(ops)
+
+
+class _Revisions:
+    async def find_one(self, query, projection=None, sort=None):
+        return {"_id": query["_id"]["$in"][0]}
+
+
+class _DB:
+    def __init__(self, entries):
+        self.documentation_search = _Search(entries)
+        self.documentations = _Revisions()
+
+
+@pytest.mark.asyncio
+async def test_unindex_revisions_pulls_and_drops_empty_entries():
+    a, b = "64b000000000000000000001", "64b000000000000000000002"
+    db = _DB([
+        {"_id": "p1:only-a", "revision_ids": [a], "latest_revision_id": a},
+        {"_id": "p1:both", "revision_ids": [a, b], "latest_revision_id": b},
+        {"_id": "p1:both-newest-a", "revision_ids": [b, a], "latest_revision_id": a},
+    ])
+    await unindex_revisions(db, [a])
+    ops = db.documentation_search.ops
+    assert len(ops) == 3
+    assert DeleteOne({"_id": "p1:only-a"}) in ops
+    assert UpdateOne({"_id": "p1:both"}, {"$set": {"revision_ids": [b]}}) in ops
+    # The newest remaining revision takes over
+    assert UpdateOne({"_id": "p1:both-newest-a"}, {"$set": {"revision_ids": [b], "latest_revision_id": b}}) in ops
@@ -0,0 +1,58 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+from utils.doc_ir import build_document
+from utils.index_common import tokenize
+from utils.site_export import build_search_index, iter_site_files, stream_site_zip, write_site_zip
+
+RESULTS = [
+    {"name": "loadConfig", "type": "function", "file": "pkg/config.py", "original_code": "def loadConfig(path): ...", "generated_docstring": "Read the settings file."},
+    {"name": "HttpWorker", "type": "class", "file": "pkg/worker.py", "original_code": "class HttpWorker: ...", "generated_docstring": "Serves <requests>."},
+    {"name": "run_forever", "type": "method", "file": "pkg/worker.py", "parent_class": "HttpWorker", "original_code": "def run_forever(self): ...", "generated_docstring": "Loops."},
+]
+
+
+def _files():
+    return iter_site_files("p", build_document(RESULTS), project_name="Demo", revision_id="r1")
+
+
+def test_tokenize_splits_names_and_drops_noise():
+    assert tokenize("loadConfig reads the HTTPServer_config v2 in 10 ms") == ["load", "config", "reads", "httpserver", "config", "v2", "ms"]
+
+
+def test_search_index_is_compact_and_points_at_pages():
+    index = build_search_index(build_document(RESULTS))
+    titles = [d[0] for d in index["docs"]]
+    assert titles == ["loadConfig", "HttpWorker", "HttpWorker::run_forever"]
+    assert index["terms"]["settings"] == [0] and index["terms"]["worker"] == [1, 2]
+    assert index["docs"][2][2].startswith("files/pkg-worker-py-") and index["docs"][2][2].endswith("#cls-0-m-0")
+
+
+def test_site_has_one_page_per_file_and_escapes_docstrings():
+    buf = io.BytesIO()
+    write_site_zip(buf, _files())
+    z = zipfile.ZipFile(io.BytesIO(buf.getvalue()))
+    names = z.namelist()
+    assert names[:5] == ["assets/style.css", "assets/search.js", "search.json", "search-index.js", "index.html"]
+    pages = [n for n in names if n.startswith("files/")]
+    assert len(pages) == 2
+    worker = z.read([n for n in pages if "worker" in n][0]).decode()
+    assert 'id="cls-0-m-0"' in worker and "Serves &lt;requests&gt;." in worker
+    assert z.read("search-index.js").decode() == "window.SEARCH_INDEX=" + z.read("search.json").decode() + ";"
+    assert json.loads(z.read("search.json"))["v"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_zip_is_complete_and_stops_when_closed():
+    chunks = [c async for c in stream_site_zip(_files(), max_pending=1)]
+    assert zipfile.ZipFile(io.BytesIO(b"".join(chunks))).testzip() is None
+
+    many = iter_site_files("p", build_document([{**RESULTS[0], "name": f"f{i}", "file": f"m{i}.py"} for i in range(300)]))
+    stream = stream_site_zip(many, max_pending=1)
+    assert await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.05)  # the worker notices on its next write and exits
@@ -0,0 +1,76 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.symbol_index import code_hash, file_symbols, index_files, prefix_query
+
+
+def _file(_id="f1", project_id="p1"):
+    return {
+        "_id": _id,
+        "project_id": project_id,
+        "filename": "pkg/users.py",
+        "functions": [{"name": "load_users", "code": "def load_users(): pass", "lineno": 1, "end_lineno": 1}],
+        "classes": [{
+            "name": "UserStore",
+            "code": "class UserStore: ...",
+            "lineno": 3,
+            "end_lineno": 9,
+            "methods": [{"name": "getUser", "code": "def getUser(self): pass", "lineno": 4, "end_lineno": 5}],
+        }],
+    }
+
+
+def test_file_symbols_flatten_functions_classes_and_methods():
+    rows = file_symbols(_file())
+    assert [(r["kind"], r["qualified_name"]) for r in rows] == [
+        ("function", "load_users"), ("class", "UserStore"), ("method", "UserStore.getUser"),
+    ]
+    method = rows[2]
+    assert method["parent_class"] == "UserStore" and method["file_id"] == "f1" and method["file"] == "pkg/users.py"
+    assert method["name_lower"] == "getuser" and method["qualified_lower"] == "userstore.getuser"
+    assert method["code_hash"] == code_hash("def getUser(self): pass")
+    assert (method["lineno"], method["end_lineno"]) == (4, 5)
+    # Files stored before line spans were parsed
+    legacy = _file()
+    del legacy["functions"][0]["lineno"], legacy["functions"][0]["end_lineno"]
+    assert file_symbols(legacy)[0]["lineno"] is None
+
+
+def test_prefix_query_uses_lowercased_anchored_prefix():
+    assert prefix_query("GetU", project_id="p1") == {"name_lower": {"$regex": "^getu"}, "project_id": "p1"}
+    # A dot searches qualified names; regex characters are escaped
+    assert prefix_query("UserStore.get", kind="method") == {"qualified_lower": {"$regex": "^userstore\\.get"}, "kind": "method"}
+    assert prefix_query("a(", file="x.py") == {"name_lower": {"$regex": "^a\\("}, "file": "x.py"}
+    for bad in ({"prefix": " "}, {"prefix": "a", "kind": "module"}):
+        with pytest.raises(HTTPException) as e:
+            prefix_query(**bad)
+        assert e.value.status_code == 400
+
+
+class _Symbols:
+    def __init__(self):
+        self.docs = []
+
+    async def delete_many(self, query):
+        ids = set(query["file_id"]["$in"])
+        self.docs = [d for d in self.docs if d["file_id"] not in ids]
+
+    async def insert_many(self, rows, ordered=True):
+        self.docs.extend(rows)
+
+
+class _DB:
+    def __init__(self):
+        self.symbols = _Symbols()
+
+
+@pytest.mark.asyncio
+async def test_index_files_replaces_a_files_symbols():
+    db = _DB()
+    assert await index_files(db, [_file("f1"), _file("f2")]) == 6
+    changed = _file("f1")
+    changed["classes"] = []
+    assert await index_files(db, [changed]) == 1
+    assert sorted((d["file_id"], d["name"]) for d in db.symbols.docs) == [
+        ("f1", "load_users"), ("f2", "UserStore"), ("f2", "getUser"), ("f2", "load_users"),
+    ]
@@ -1,6 +1,6 @@
 # filepath: server/utils/doc_cleaner.py
 import re
-from typing import List, Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 _md_heading_re = re.compile(r"^\s{0,3}#{1,6}\s*", re.MULTILINE)
 _bullet_re = re.compile(r"^\s*[-*+]\s+", re.MULTILINE)
@@ -14,33 +14,64 @@ _SECTION_HEADERS = (
 )
 
 _examples_header_re = re.compile(r"^\s*Examples?:\s*$", re.IGNORECASE | re.MULTILINE)
+_section_header_re = re.compile(r"^\s*([A-Za-z][A-Za-z ]{0,20}):\s*$", re.MULTILINE)
+# Same headers matched against a single line (section scan works line by line)
+_header_line_re = re.compile(r"\s*([A-Za-z][A-Za-z ]{0,20}):\s*")
+_examples_line_re = re.compile(r"\s*Examples?:\s*", re.IGNORECASE)
+
+_many_newlines_re = re.compile(r"\n{3,}")
+_trailing_ws_re = re.compile(r"[ \t]+\n")
+_param_bullet_re = re.compile(r"(?m)^(\s*)\*\s*([A-Za-z_][\w ]*?):")
+_param_wrapped_re = re.compile(r"(?m)(^|\s)\*([A-Za-z_][\w ]*?)\*\s*:")
+_param_leading_re = re.compile(r"(?m)(^|\s)\*([A-Za-z_][\w ]*?):")
+_orphan_fence_re = re.compile(r"(?m)^\s*```.*$")
+_star_bullet_re = re.compile(r"(?m)^(\s*)\*\s+")
+_arg_line_re = re.compile(r"([A-Za-z_][\w]*)\s*(?:\(([^)]*)\))?\s*:\s*(.*)")
+
+# The format transforms below stay separate, ordered passes: each one sees the output
+# of the one before (roles go before fences pair up, headings only show once their
+# backticks are gone), so one merged alternation would clean differently. A pass whose
+# trigger character is absent from the text is skipped instead.
 
 # ---------- generic helpers ----------
 
+def _ends_section(name: str) -> bool:
+    header = name.strip() + ":"
+    return header in _SECTION_HEADERS or header.lower().startswith("example")
+
+
 def _find_section_bounds(text: str, start_idx: int) -> Tuple[int, int]:
     end = len(text)
-    for m in re.finditer(r"^\s*([A-Za-z][A-Za-z ]{0,20}):\s*$", text, re.MULTILINE):
+    for m in _section_header_re.finditer(text):
         if m.start() <= start_idx:
             continue
-        header = m.group(1).strip() + ":"
-        if header in _SECTION_HEADERS or header.lower().startswith("example"):
+        if _ends_section(m.group(1)):
             end = m.start()
             break
     return start_idx, end
 
 
+def _normalize_blank_lines(s: str) -> str:
+    """At most one blank line between paragraphs, no trailing spaces (in that order)."""
+    if "\n\n\n" in s:
+        s = _many_newlines_re.sub("\n\n", s)
+    return _trailing_ws_re.sub("\n", s)
+
+
 def _strip_param_asterisks(text: str) -> str:
     """Remove stray asterisks around parameter names like '* name:' or '*name*:'
     without touching italics such as '*optional*' (no trailing colon) or any parentheses.
     Applied across all output formats.
     """
+    if "*" not in text:
+        return text
     s = text
     # 1) Convert bullets like '* name:' into '- name:' (Markdown-friendly), only when a param name is followed by ':'
-    s = re.sub(r"(?m)^(\s*)\*\s*([A-Za-z_][\w ]*?):", r"\1- \2:", s)
+    s = _param_bullet_re.sub(r"\1- \2:", s)
     # 2) Unwrap asterisks around parameter names before a colon: '*name*:' -> 'name:'
-    s = re.sub(r"(?m)(^|\s)\*([A-Za-z_][\w ]*?)\*\s*:", r"\1\2:", s)
+    s = _param_wrapped_re.sub(r"\1\2:", s)
     # 3) Remove a single leading asterisk before a param name (not already handled by step 1): '*NAME:' -> 'NAME:'
-    s = re.sub(r"(?m)(^|\s)\*([A-Za-z_][\w ]*?):", r"\1\2:", s)
+    s = _param_leading_re.sub(r"\1\2:", s)
     return s
 
 
@@ -49,33 +80,77 @@ def _strip_backticks_and_asterisks_plain(text: str) -> str:
     and decorative asterisks, but keep parentheses and convert leading '*' bullets to '-'.
     """
     s = text
-    # Drop any orphan code fence lines like ``` or ```python
-    s = re.sub(r"(?m)^\s*```.*$", "", s)
-    # Remove inline backticks whether paired or lone by just removing the character
-    s = s.replace("`", "")
-    # Convert star bullets at line start to dash bullets for readability
-    s = re.sub(r"(?m)^(\s*)\*\s+", r"\1- ", s)
-    # Remove remaining decorative asterisks (italics markers), keep parentheses intact
-    s = s.replace("*", "")
+    if "`" in s:
+        # Drop any orphan code fence lines like ``` or ```python
+        s = _orphan_fence_re.sub("", s)
+        # Remove inline backticks whether paired or lone by just removing the character
+        s = s.replace("`", "")
+    if "*" in s:
+        # Convert star bullets at line start to dash bullets for readability
+        s = _star_bullet_re.sub(r"\1- ", s)
+        # Remove remaining decorative asterisks (italics markers), keep parentheses intact
+        s = s.replace("*", "")
     return s
 
 
+def _header_start(lines: List[str], j: int, run_start: int, prev: Optional[str]) -> int:
+    """Line where the header scan's match for header line `j` begins.
+
+    The header pattern's leading whitespace swallows the blank lines before a header, so a
+    match starts at the first of them - unless the line before those blanks is itself a
+    header, whose trailing whitespace already consumed them up to the last newline.
+    """
+    if prev is not None and _header_line_re.fullmatch(prev):
+        return j - 1 if j - 1 >= run_start and lines[j - 1] == "" else j
+    return run_start
+
+
 def strip_examples_sections(text: str) -> str:
+    """Drop every Examples section up to the next known section header.
+
+    One forward pass over the lines: each Examples section is located and cut where the
+    header scan would cut it, without rescanning the text from the start per section.
+    """
     if not text:
         return ""
     s = str(text)
+    if not _examples_header_re.search(s):
+        return s
+    lines = s.split("\n")
+    n = len(lines)
+    blank = [not ln.strip() for ln in lines]
+    out: List[str] = []
+    k = 0
     while True:
-        m = _examples_header_re.search(s)
-        if not m:
+        x = next((i for i in range(k, n) if _examples_line_re.fullmatch(lines[i])), None)
+        if x is None:
+            out.extend(lines[k:])
             break
-        sec_start_line = s.rfind("\n", 0, m.start()) + 1
-        start, end = _find_section_bounds(s, m.start())
-        tail = s[end:]
-        code_m = re.match(r"^(?:\s*```[\s\S]*?```\s*\n?)", tail)
-        if code_m:
-            end = end + code_m.end()
-        s = s[:sec_start_line] + s[end:]
-    return s
+        # The section starts at the blank lines leading up to its header
+        b = x
+        while b > k and blank[b - 1]:
+            b -= 1
+        out.extend(lines[k:b])
+        end = None
+        if _header_line_re.fullmatch(lines[x]):
+            start = _header_start(lines, x, b, out[-1] if out else None)
+            if start > b:
+                end = start
+        j = x + 1
+        while end is None and j < n:
+            m = _header_line_re.fullmatch(lines[j])
+            if m and _ends_section(m.group(1)):
+                run = j
+                while blank[run - 1]:
+                    run -= 1
+                end = _header_start(lines, j, run, lines[run - 1])
+            j += 1
+        if end is None:
+            # No closing header: the section runs to the end of the text
+            out.append("")
+            break
+        k = end
+    return "\n".join(out)
 
 # ---------- markdown-specific ----------
 
@@ -100,9 +175,8 @@ def reformat_args_for_markdown(text: str) -> str:
     # Always format each param line with a dash
     parts = []
     # Match param lines with or without type
-    pattern = re.compile(r"([A-Za-z_][\w]*)\s*(?:\(([^)]*)\))?\s*:\s*(.*)")
     for line in body.splitlines():
-        m = pattern.match(line.strip())
+        m = _arg_line_re.match(line.strip())
         if m:
             name = m.group(1)
             typ = m.group(2)
@@ -122,11 +196,11 @@ def reformat_args_for_markdown(text: str) -> str:
 
 def clean_for_markdown(text: str) -> str:
     s = strip_examples_sections(text or "")
-    # Keep backticks/bullets for MD readability; unwrap code fences but keep inner
-    s = _code_fence_re.sub(lambda m: m.group(1), s)
-    s = _rst_role_re.sub(r"\1", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    s = re.sub(r"[ \t]+\n", "\n", s)
+    if "`" in s:
+        # Keep backticks/bullets for MD readability; unwrap code fences but keep inner
+        s = _code_fence_re.sub(lambda m: m.group(1), s)
+        s = _rst_role_re.sub(r"\1", s)
+    s = _normalize_blank_lines(s)
     s = reformat_args_for_markdown(s)
     # Remove stray asterisks around parameter names
     s = _strip_param_asterisks(s)
@@ -136,16 +210,17 @@ def clean_for_markdown(text: str) -> str:
 
 def clean_for_html(text: str) -> str:
     s = strip_examples_sections(text or "")
-    s = _rst_role_re.sub(r"\1", s)
-    # Remove fenced code markers entirely; keep inner content
-    s = _code_fence_re.sub(lambda m: m.group(1), s)
-    # Remove inline backticks (single or double) but keep content
-    s = _inline_backticks_re.sub(lambda m: (m.group(1) or m.group(2) or ""), s)
-    # Drop markdown headings
-    s = _md_heading_re.sub("", s)
+    if "`" in s:
+        s = _rst_role_re.sub(r"\1", s)
+        # Remove fenced code markers entirely; keep inner content
+        s = _code_fence_re.sub(lambda m: m.group(1), s)
+        # Remove inline backticks (single or double) but keep content
+        s = _inline_backticks_re.sub(lambda m: (m.group(1) or m.group(2) or ""), s)
+    if "#" in s:
+        # Drop markdown headings
+        s = _md_heading_re.sub("", s)
     # Keep bullets for readability in <pre>
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    s = re.sub(r"[ \t]+\n", "\n", s)  # added missing string argument
+    s = _normalize_blank_lines(s)
     # Remove stray asterisks around parameter names
     s = _strip_param_asterisks(s)
     # Additionally remove any remaining backticks and decorative asterisks
@@ -156,16 +231,17 @@ def clean_for_html(text: str) -> str:
 
 def clean_for_pdf(text: str) -> str:
     s = strip_examples_sections(text or "")
-    s = _rst_role_re.sub(r"\1", s)
-    # Remove code fences and inline backticks completely
-    s = _code_fence_re.sub(lambda m: m.group(1), s)
-    s = _inline_backticks_re.sub(lambda m: (m.group(1) or m.group(2) or ""), s)
-    # Remove markdown headings
-    s = _md_heading_re.sub("", s)
+    if "`" in s:
+        s = _rst_role_re.sub(r"\1", s)
+        # Remove code fences and inline backticks completely
+        s = _code_fence_re.sub(lambda m: m.group(1), s)
+        s = _inline_backticks_re.sub(lambda m: (m.group(1) or m.group(2) or ""), s)
+    if "#" in s:
+        # Remove markdown headings
+        s = _md_heading_re.sub("", s)
     # Normalize spacing to avoid lines sticking to code blocks
     s = s.replace("\r\n", "\n").replace("\r", "\n")
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    s = re.sub(r"[ \t]+\n", "\n", s)  # added missing string argument
+    s = _normalize_blank_lines(s)
     # Remove stray asterisks around parameter names
     s = _strip_param_asterisks(s)
     # Additionally remove any remaining backticks and decorative asterisks
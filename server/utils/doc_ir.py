@@ -0,0 +1,240 @@
+"""
+Normalized document model shared by the Markdown, HTML and PDF renderers.
+
+A revision's results are grouped (functions; classes with their methods, keyed by
+file::class), ordered alphabetically and given stable anchors once. Each item cleans
+its code and docstring for a format the first time that format asks and keeps the
+text, so rendering a revision in several formats (or again) does no regrouping,
+resorting or repeated regex passes. Items saved with per-format docstrings (cleaned
+once at generation, see docstring_variants) skip the docstring cleaners entirely.
+DocumentCache keeps recent revisions' documents.
+"""
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.doc_cleaner import clean_for_html, clean_for_pdf, process_docstring_for_markdown
+
+MARKDOWN = "markdown"
+HTML = "html"
+PDF = "pdf"
+FORMATS = (MARKDOWN, HTML, PDF)
+
+# Bump when the cleaners' output changes; stored variants of an older version are re-cleaned
+DOCSTRINGS_VERSION = 2
+
+_fence_open_re = re.compile(r"^\s*```\w*\s*\n")
+_fence_close_re = re.compile(r"\n\s*```\s*$")
+_section_marker_re = re.compile(r"\s*(Args:|Arguments:|Parameters:|Returns:|Examples?:)")
+_leaked_returns_re = re.compile(r"(\breturn\b[^\n]*?)\s+Returns?:.*$")
+_backticks_re = re.compile(r"``([^`]+)``|`([^`]+)`")
+
+
+def sanitize_code_for_pdf(text: str) -> str:
+    if not text:
+        return ""
+    s = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    # Remove leading/trailing fenced code markers if any leaked in
+    s = _fence_open_re.sub("", s)
+    s = _fence_close_re.sub("", s)
+    cleaned = []
+    for ln in s.splitlines():
+        # Remove standalone section markers that don't belong in code
+        if _section_marker_re.match(ln):
+            continue
+        # If a doc sentence leaked onto the same line after a return, keep code before it
+        ln = _leaked_returns_re.sub(r"\1", ln)
+        # Strip stray inline double/single backticks in code
+        ln = _backticks_re.sub(lambda m: m.group(1) or m.group(2) or "", ln)
+        cleaned.append(ln)
+    return "\n".join(cleaned).strip()
+
+
+def _escape_html(text: str) -> str:
+    return text.replace("<", "&lt;").replace(">", "&gt;")
+
+
+def clean_docstring_for(fmt: str, docstring: str) -> str:
+    if fmt == HTML:
+        return clean_for_html(docstring)
+    if fmt == PDF:
+        return clean_for_pdf(docstring.strip())
+    return process_docstring_for_markdown(docstring.strip())
+
+
+def docstring_variants(docstring: str) -> Dict[str, str]:
+    """Docstring as each renderer shows it; stored with the item so views don't clean."""
+    return {fmt: clean_docstring_for(fmt, docstring or "") for fmt in FORMATS}
+
+
+def _sort_key(name: Optional[str]) -> str:
+    return (str(name or "")).lower()
+
+
+@dataclass
+class DocItem:
+    anchor: str
+    kind: str
+    name: str
+    title: str
+    file: str
+    parent_class: Optional[str]
+    code: str
+    docstring: str
+    docstrings: Optional[Dict[str, str]] = field(default=None, repr=False)  # pre-cleaned per format
+    _text: Dict[str, Tuple[str, str]] = field(default_factory=dict, repr=False)
+
+    def text(self, fmt: str) -> Tuple[str, str]:
+        """(code, docstring) prepared for `fmt`, computed once per format."""
+        cached = self._text.get(fmt)
+        if cached is None:
+            doc = (self.docstrings or {}).get(fmt)
+            if doc is None:
+                doc = clean_docstring_for(fmt, self.docstring)
+            if fmt == HTML:
+                cached = (_escape_html(self.code), doc)
+            elif fmt == PDF:
+                code = self.code.strip()
+                cached = (sanitize_code_for_pdf(code) if code else "", doc)
+            else:
+                cached = (self.code.strip(), doc)
+            self._text[fmt] = cached
+        return cached
+
+    def has_code(self) -> bool:
+        return bool(self.code.strip())
+
+
+@dataclass
+class DocClass:
+    anchor: str
+    name: str
+    item: Optional[DocItem]  # None when only methods of the class were documented
+    methods: List[DocItem]
+
+
+@dataclass
+class DocumentIR:
+    functions: List[DocItem]
+    classes: List[DocClass]
+    item_count: int
+
+    def items(self) -> Iterator[DocItem]:
+        """Every item in reading order: functions, then each class followed by its methods."""
+        yield from self.functions
+        for cls in self.classes:
+            if cls.item is not None:
+                yield cls.item
+            yield from cls.methods
+
+    def cards(self) -> Iterator[Tuple[str, str, Optional[DocItem]]]:
+        """(anchor, title, item) per rendered card; a class known only from its methods has no item."""
+        for it in self.functions:
+            yield it.anchor, it.title, it
+        for cls in self.classes:
+            yield cls.anchor, cls.name, cls.item
+            for m in cls.methods:
+                yield m.anchor, m.title, m
+
+    def prepare(self, fmt: str) -> "DocumentIR":
+        for it in self.items():
+            it.text(fmt)
+        return self
+
+
+def _item(r: dict, anchor: str, title: Optional[str] = None) -> DocItem:
+    name = r.get("name", "") or ""
+    return DocItem(
+        anchor=anchor,
+        kind=r.get("type") or "function",
+        name=name,
+        title=title if title is not None else name,
+        file=r.get("file", "") or "",
+        parent_class=r.get("parent_class"),
+        code=r.get("original_code") or "",
+        docstring=r.get("generated_docstring") or "",
+        docstrings=r.get("docstrings") if r.get("docstrings_version") == DOCSTRINGS_VERSION else None,
+    )
+
+
+def build_document(results: List[dict]) -> DocumentIR:
+    results = results or []
+    functions = sorted((r for r in results if r.get("type") == "function"), key=lambda r: _sort_key(r.get("name")))
+
+    # One group per file::class; a class defined twice in one file is one card (the
+    # later definition, in the first one's place) holding the methods of both
+    by_key: Dict[str, dict] = {}
+    for r in results:
+        if r.get("type") == "class":
+            by_key[f"{r.get('file','')}::{r.get('name','')}"] = {"cls": r, "methods": []}
+    for r in results:
+        if r.get("type") == "method" and r.get("parent_class"):
+            key = f"{r.get('file','')}::{r.get('parent_class')}"
+            by_key.setdefault(key, {"cls": None, "methods": []})["methods"].append(r)
+    groups = list(by_key.values())
+
+    def group_name(g: dict) -> str:
+        return (g["cls"] or {}).get("name") or (g["methods"][0].get("parent_class") if g["methods"] else "")
+
+    groups.sort(key=lambda g: _sort_key(group_name(g)))
+
+    classes: List[DocClass] = []
+    for idx, g in enumerate(groups):
+        name = group_name(g) or f"Class {idx}"
+        anchor = f"cls-{idx}"
+        methods = sorted(g["methods"], key=lambda m: _sort_key(m.get("name")))
+        classes.append(DocClass(
+            anchor=anchor,
+            name=name,
+            item=_item(g["cls"], anchor, name) if g["cls"] is not None else None,
+            methods=[_item(m, f"{anchor}-m-{j}", f"{name}::{m.get('name','')}") for j, m in enumerate(methods)],
+        ))
+    return DocumentIR(
+        functions=[_item(r, f"fn-{i}") for i, r in enumerate(functions)],
+        classes=classes,
+        item_count=len(results),
+    )
+
+
+def as_document(results: Union[DocumentIR, List[dict], None]) -> DocumentIR:
+    return results if isinstance(results, DocumentIR) else build_document(results or [])
+
+
+class DocumentCache:
+    """Small LRU of built documents by revision id (results are immutable per revision)."""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._docs: "OrderedDict[str, DocumentIR]" = OrderedDict()
+
+    def get(self, revision_id: str) -> Optional[DocumentIR]:
+        doc = self._docs.get(revision_id)
+        if doc is not None:
+            self._docs.move_to_end(revision_id)
+        return doc
+
+    def put(self, revision_id: str, doc: DocumentIR) -> DocumentIR:
+        if self.max_entries > 0:
+            self._docs[revision_id] = doc
+            self._docs.move_to_end(revision_id)
+            while len(self._docs) > self.max_entries:
+                self._docs.popitem(last=False)
+        return doc
+
+    def get_or_build(self, revision_id: str, results: List[dict]) -> DocumentIR:
+        return self.get(revision_id) or self.put(revision_id, build_document(results))
+
+    def invalidate(self, revision_id: str) -> None:
+        self._docs.pop(revision_id, None)
+
+
+def _cache_size() -> int:
+    try:
+        return int(os.getenv("DOC_IR_CACHE_SIZE", "8"))
+    except Exception:
+        return 8
+
+
+document_cache = DocumentCache(_cache_size())
@@ -1,18 +1,17 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from io import BytesIO
-import re
 
-# types are loose to avoid circular imports
-from utils.doc_cleaner import process_docstring_for_markdown, clean_for_html, clean_for_pdf
+from utils.doc_ir import HTML, MARKDOWN, PDF, DocItem, DocumentIR, as_document
 
 
-def render_markdown(project_id: str, results: List[dict], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> str:
+def iter_markdown(project_id: str, results: Union[DocumentIR, List[dict]], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> Iterator[str]:
+    """Markdown document in chunks (header, then one chunk per item); "".join() gives render_markdown()."""
     ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
     title = project_name or f"Project {project_id}"
-    lines = [
+    yield "\n".join([
         f"# {title}",
         "",
         f"> {project_description or 'No description provided.'}",
@@ -21,144 +20,53 @@ def render_markdown(project_id: str, results: List[dict], *, project_name: Optio
         "",
         "---",
         "",
-    ]
-
-    # Group results; alphabetize within type buckets
-    results = results or []
-    functions = sorted(
-        [r for r in results if (r.get("type") == "function")],
-        key=lambda r: (str(r.get("name","")) or "").lower()
-    )
-    classes_map = {}
-    # initialize class entries
-    for r in results:
-        if r.get("type") == "class":
-            key = f"{r.get('file','')}::{r.get('name','')}"
-            classes_map[key] = {"cls": r, "methods": []}
-    # attach methods, track classes even if class missing
-    for r in results:
-        if r.get("type") == "method" and r.get("parent_class"):
-            key = f"{r.get('file','')}::{r.get('parent_class')}"
-            classes_map.setdefault(key, {"cls": None, "methods": []})["methods"].append(r)
-
-    # Sort classes by class name
-    classes_items = sorted(classes_map.items(), key=lambda kv: (str((kv[1]["cls"] or {}).get("name") or (kv[1]["methods"][0].get("parent_class") if kv[1]["methods"] else "")).lower()))
-
-    if functions:
-        lines.extend(["## Functions", ""])
-        for r in functions:
-            lines.extend([f"### {r.get('name','')}", ""])
-            code = (r.get("original_code") or "").strip()
+    ])
+    document = as_document(results)
+
+    # Every chunk continues the line list, so it starts with the separating newline
+    def chunk(heading: str, item: Optional[DocItem] = None) -> str:
+        lines = [heading, ""]
+        if item is not None:
+            code, doc = item.text(MARKDOWN)
             if code:
-                lines.extend(["```python", code, "```", ""]) 
-            doc = process_docstring_for_markdown((r.get("generated_docstring") or "").strip())
+                lines.extend(["```python", code, "```", ""])
             if doc:
-                lines.extend([doc, ""]) 
-        lines.append("")
-
-    if classes_items:
-        lines.extend(["## Classes", ""])
-        for _, entry in classes_items:
-            cls = entry.get("cls")
-            methods = entry.get("methods") or []
-            # Sort methods by name
-            methods = sorted(methods, key=lambda m: (str(m.get("name","")) or "").lower())
-            cls_name = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else "")
-            lines.extend([f"### {cls_name}", ""])
-            cls_code = ((cls or {}).get("original_code") or "").strip()
-            if cls_code:
-                lines.extend(["```python", cls_code, "```", ""]) 
-            cls_doc = process_docstring_for_markdown(((cls or {}).get("generated_docstring") or "").strip())
-            if cls_doc:
-                lines.extend([cls_doc, ""]) 
-
-            for m in methods:
-                lines.extend([f"#### {m.get('name','')}", ""])
-                m_code = (m.get("original_code") or "").strip()
-                if m_code:
-                    lines.extend(["```python", m_code, "```", ""]) 
-                m_doc = process_docstring_for_markdown((m.get("generated_docstring") or "").strip())
-                if m_doc:
-                    lines.extend([m_doc, ""]) 
-
-    return "\n".join(lines)
-
-
-def render_html(project_id: str, results: List[dict], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> str:
+                lines.extend([doc, ""])
+        return "\n" + "\n".join(lines)
+
+    if document.functions:
+        yield chunk("## Functions")
+        for it in document.functions:
+            yield chunk(f"### {it.name}", it)
+        yield "\n"
+
+    if document.classes:
+        yield chunk("## Classes")
+        for cls in document.classes:
+            yield chunk(f"### {cls.name}", cls.item)
+            for m in cls.methods:
+                yield chunk(f"#### {m.name}", m)
+
+
+def render_markdown(project_id: str, results: Union[DocumentIR, List[dict]], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> str:
+    return "".join(iter_markdown(project_id, results, project_name=project_name, project_description=project_description, revision_id=revision_id))
+
+
+def iter_html(project_id: str, results: Union[DocumentIR, List[dict]], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> Iterator[str]:
+    """HTML document in chunks: head and sidebar, one chunk per item card, then the closing tags.
+    Cards (and their docstring cleanup) are built as they are consumed."""
     ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
     title = project_name or f"Project {project_id}"
     desc = project_description or "No description provided."
-
-    # Group results; alphabetize within type buckets
-    results = results or []
-    functions = sorted(
-        [r for r in results if (r.get("type") == "function")],
-        key=lambda r: (str(r.get("name","")) or "").lower()
-    )
-    class_map = []  # list of dicts to preserve order
-    cls_index = {}
-    for r in results:
-        if r.get("type") == "class":
-            key = f"{r.get('file','')}::{r.get('name','')}"
-            cls_index[key] = len(class_map)
-            class_map.append({"cls": r, "methods": []})
-    for r in results:
-        if r.get("type") == "method" and r.get("parent_class"):
-            key = f"{r.get('file','')}::{r.get('parent_class')}"
-            if key not in cls_index:
-                cls_index[key] = len(class_map)
-                class_map.append({"cls": None, "methods": []})
-            class_map[cls_index[key]]["methods"].append(r)
-
-    # Sort classes and methods alphabetically
-    # Build sortable tuples of (name_lower, entry)
-    sortable_classes = []
-    for entry in class_map:
-        cls = entry.get("cls")
-        methods = entry.get("methods") or []
-        name = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else "")
-        sortable_classes.append(((name or "").lower(), entry))
-    sortable_classes.sort(key=lambda t: t[0])
-
-    # Build item cards and anchors
-    items = []
-    # Functions first (alphabetical)
-    for i, r in enumerate(functions):
-        items.append({
-            "id": f"fn-{i}",
-            "title": r.get("name", ""),
-            "code": (r.get("original_code") or "").replace("<", "&lt;").replace(">", "&gt;"),
-            "doc": clean_for_html((r.get("generated_docstring") or "")),
-        })
-    # Then classes and methods (alphabetical)
-    for idx, (_, entry) in enumerate(sortable_classes):
-        cls = entry.get("cls")
-        methods = sorted(entry.get("methods") or [], key=lambda m: (str(m.get("name","")) or "").lower())
-        title_txt = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else f"Class {idx}")
-        items.append({
-            "id": f"cls-{idx}",
-            "title": title_txt,
-            "code": ((cls or {}).get("original_code") or "").replace("<", "&lt;").replace(">", "&gt;"),
-            "doc": clean_for_html(((cls or {}).get("generated_docstring") or "")),
-        })
-        for j, m in enumerate(methods):
-            items.append({
-                "id": f"cls-{idx}-m-{j}",
-                "title": f"{title_txt}::{m.get('name','')}",
-                "code": (m.get("original_code") or "").replace("<", "&lt;").replace(">", "&gt;"),
-                "doc": clean_for_html((m.get("generated_docstring") or "")),
-            })
+    document = as_document(results)
 
     # Sidebar links (dropdowns) — alphabetized
-    fn_nav = [f"<a href=\"#fn-{i}\" class=\"nav-link\">{r.get('name','')}</a>" for i, r in enumerate(functions)]
+    fn_nav = [f"<a href=\"#{it.anchor}\" class=\"nav-link\">{it.name}</a>" for it in document.functions]
     cls_nav = []
-    for idx, (_, entry) in enumerate(sortable_classes):
-        cls = entry.get("cls")
-        methods = sorted(entry.get("methods") or [], key=lambda m: (str(m.get("name","")) or "").lower())
-        title_txt = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else f"Class {idx}")
-        inner = [f"<a href=\"#cls-{idx}\" class=\"nav-link\">{title_txt}</a>"]
-        for j, m in enumerate(methods):
-            inner.append(f"<a href=\"#cls-{idx}-m-{j}\" class=\"nav-sublink\">{m.get('name','')}</a>")
+    for cls in document.classes:
+        inner = [f"<a href=\"#{cls.anchor}\" class=\"nav-link\">{cls.name}</a>"]
+        for m in cls.methods:
+            inner.append(f"<a href=\"#{m.anchor}\" class=\"nav-sublink\">{m.name}</a>")
         cls_nav.append("".join(inner))
 
     styles = """
@@ -199,18 +107,7 @@ def render_html(project_id: str, results: List[dict], *, project_name: Optional[
       </details>
     """
 
-    viewer_html = "".join(
-        f"""
-        <section class=\"item-card\" id=\"{it['id']}\" tabindex=\"0\">
-          <div class=\"item-title\">{it['title']}</div>
-          {f'<pre class=\"code\">{it['code']}</pre>' if it['code'] else ''}
-          {f'<pre class=\"doc\">{it['doc']}</pre>' if it['doc'] else ''}
-        </section>
-        """
-        for it in items
-    )
-
-    return f"""
+    yield f"""
     <!doctype html>
     <html>
       <head>
@@ -230,7 +127,19 @@ def render_html(project_id: str, results: List[dict], *, project_name: Optional[
           </nav>
           <main>
             <div class=\"viewer\">
-              {viewer_html}
+              """
+
+    for anchor, title_txt, item in document.cards():
+        code, doc = item.text(HTML) if item is not None else ("", "")
+        yield f"""
+        <section class=\"item-card\" id=\"{anchor}\" tabindex=\"0\">
+          <div class=\"item-title\">{title_txt}</div>
+          {f'<pre class=\"code\">{code}</pre>' if code else ''}
+          {f'<pre class=\"doc\">{doc}</pre>' if doc else ''}
+        </section>
+        """
+
+    yield """
             </div>
           </main>
         </div>
@@ -239,7 +148,11 @@ def render_html(project_id: str, results: List[dict], *, project_name: Optional[
     """
 
 
-def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> bytes:
+def render_html(project_id: str, results: Union[DocumentIR, List[dict]], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> str:
+    return "".join(iter_html(project_id, results, project_name=project_name, project_description=project_description, revision_id=revision_id))
+
+
+def render_pdf(project_id: str, results: Union[DocumentIR, List[dict]], *, project_name: Optional[str] = None, project_description: Optional[str] = None, revision_id: Optional[str] = None) -> bytes:
     buffer = BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
 
@@ -247,26 +160,6 @@ def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[s
     x_margin = 50
     y = height - 50
 
-    def sanitize_code_block(text: str) -> str:
-        if not text:
-            return ""
-        s = (text or "").replace("\r\n", "\n").replace("\r", "\n")
-        # Remove leading/trailing fenced code markers if any leaked in
-        s = re.sub(r"^\s*```\w*\s*\n", "", s)
-        s = re.sub(r"\n\s*```\s*$", "", s)
-        # Remove standalone section markers that don't belong in code
-        lines = s.splitlines()
-        cleaned = []
-        for ln in lines:
-            if re.match(r"\s*(Args:|Arguments:|Parameters:|Returns:|Examples?:)", ln):
-                continue
-            # If a doc sentence leaked onto the same line after a return, keep code before it
-            ln = re.sub(r"(\breturn\b[^\n]*?)\s+Returns?:.*$", r"\1", ln)
-            # Strip stray inline double/single backticks in code
-            ln = re.sub(r"``([^`]+)``|`([^`]+)`", lambda m: m.group(1) or m.group(2) or "", ln)
-            cleaned.append(ln)
-        return "\n".join(cleaned).strip()
-
     def new_page_header():
         nonlocal y
         c.setFont("Helvetica-Bold", 16)
@@ -291,18 +184,13 @@ def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[s
             c.drawString(local_x, y, line[:110])
             y -= leading
 
+    # Code passed to these helpers is already sanitized by the document model
     def compute_code_block_height(text: str) -> int:
-        if not text:
-            return 0
-        text = sanitize_code_block(text)
         lines = (text or "").splitlines() or [""]
         return max(18, 12 * len(lines) + 12) + 12  # block rect + separation
 
     def draw_code_block(text: str, x_offset: int = 0):
         nonlocal y
-        if not text:
-            return
-        text = sanitize_code_block(text)
         lines = (text or "").splitlines() or [""]
         block_height = max(18, 12 * len(lines) + 12)
         if y - block_height < 60:
@@ -353,17 +241,9 @@ def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[s
         c.line(x_margin, y, width - x_margin, y)
         y -= 16  # extra space after section separator before first item title
 
-    # Build groups
-    functions = [r for r in (results or []) if (r.get("type") == "function")]
-    classes = {}
-    for r in (results or []):
-        if r.get("type") == "class":
-            key = f"{r.get('file','')}::{r.get('name','')}"
-            classes[key] = {"cls": r, "methods": []}
-    for r in (results or []):
-        if r.get("type") == "method" and r.get("parent_class"):
-            key = f"{r.get('file','')}::{r.get('parent_class')}"
-            classes.setdefault(key, {"cls": None, "methods": []})["methods"].append(r)
+    document = as_document(results)
+    functions = document.functions
+    classes = document.classes
 
     # ---------- Table of Contents (bulleted, no links) ----------
     def new_toc_page_header():
@@ -394,20 +274,17 @@ def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[s
         c.setFont("Helvetica-Bold", 11)
         c.drawString(x_margin, y, "Functions")
         y -= 14
-        for r in functions:
-            draw_toc_entry(r.get("name", ""), indent=12)
+        for it in functions:
+            draw_toc_entry(it.name, indent=12)
         y -= 6
     if classes:
         c.setFont("Helvetica-Bold", 11)
         c.drawString(x_margin, y, "Classes")
         y -= 14
-        for entry in classes.values():
-            cls = entry.get("cls")
-            methods = entry.get("methods") or []
-            title_txt = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else "")
-            draw_toc_entry(title_txt, indent=12)
-            for m in methods:
-                draw_toc_entry(m.get("name", ""), indent=28)
+        for cls in classes:
+            draw_toc_entry(cls.name, indent=12)
+            for m in cls.methods:
+                draw_toc_entry(m.name, indent=28)
         y -= 6
 
     # Start main content on a fresh page
@@ -432,56 +309,39 @@ def render_pdf(project_id: str, results: List[dict], *, project_name: Optional[s
             new_page_header()
 
     # ---------- Main content ----------
+    def draw_item(title_text: str, item: Optional[DocItem], x_offset: int = 0, title_size: int = 14):
+        nonlocal y
+        code, doc = item.text(PDF) if item is not None else ("", "")
+        has_code = item is not None and item.has_code()
+        ensure_item_fits(title_text, code if has_code else "", doc, x_offset=x_offset)
+        draw_line(title_text, title_size, bold=True, x_offset=x_offset)
+        if not x_offset:
+            y -= 4
+        if has_code:
+            draw_code_block(code, x_offset=x_offset)
+        if doc:
+            y -= 4
+            draw_line(doc, 12, bold=False, x_offset=x_offset)
+
     if functions:
         draw_line("Functions", 16, bold=True)
         separator()
-        for idx, r in enumerate(functions):
+        for idx, it in enumerate(functions):
             if idx > 0:
                 item_divider()
-            title_text = r.get("name", "")
-            code = (r.get("original_code") or "").strip()
-            doc = clean_for_pdf((r.get("generated_docstring") or "").strip())
-            ensure_item_fits(title_text, code, doc)
-            draw_line(title_text, 14, bold=True)
-            y -= 4
-            if code:
-                draw_code_block(code)
-            if doc:
-                y -= 4
-                draw_line(doc, 12, bold=False)
+            draw_item(it.name, it)
             y -= 10
 
     if classes:
         draw_line("Classes", 16, bold=True)
         separator()
-        for cidx, entry in enumerate(classes.values()):
+        for cidx, cls in enumerate(classes):
             if cidx > 0:
                 item_divider()
-            cls = entry.get("cls")
-            methods = entry.get("methods") or []
-            title_txt = (cls or {}).get("name") or (methods[0].get("parent_class") if methods else "")
-            cls_code = ((cls or {}).get("original_code") or "").strip()
-            cls_doc = clean_for_pdf(((cls or {}).get("generated_docstring") or "").strip())
-            ensure_item_fits(title_txt, cls_code, cls_doc)
-            draw_line(title_txt, 14, bold=True)
-            y -= 4
-            if cls_code:
-                draw_code_block(cls_code)
-            if cls_doc:
-                y -= 4
-                draw_line(cls_doc, 12, bold=False)
-            for m in methods:
+            draw_item(cls.name, cls.item)
+            for m in cls.methods:
                 y -= 6
-                m_title = m.get("name", "")
-                m_code = (m.get("original_code") or "").strip()
-                m_doc = clean_for_pdf((m.get("generated_docstring") or "").strip())
-                ensure_item_fits(m_title, m_code, m_doc, x_offset=12)
-                draw_line(m_title, 12, bold=True, x_offset=12)
-                if m_code:
-                    draw_code_block(m_code, x_offset=12)
-                if m_doc:
-                    y -= 4
-                    draw_line(m_doc, 12, bold=False, x_offset=12)
+                draw_item(m.name, m, x_offset=12, title_size=12)
                 y -= 6
             y -= 10
 
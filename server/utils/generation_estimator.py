@@ -0,0 +1,141 @@
+"""
+Duration/token/cost estimates for documentation generation runs.
+
+Every revision records a `throughput` sample (endpoint, batch size, batches actually
+sent, prompt tokens, seconds spent generating). Estimates use the median rate of recent
+samples for the same endpoint, preferring the same batch size; with no history they
+fall back to live limiter metrics, then to a configured default.
+"""
+import math
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def endpoint_key() -> str:
+    raw = os.getenv("HF_ENDPOINT") or ""
+    parsed = urlparse(raw)
+    return (parsed.netloc + parsed.path).rstrip("/") or "default"
+
+
+def throughput_sample(batch_size: int, items: int, generated: int, prompt_tokens: int, seconds: float) -> Dict[str, Any]:
+    """What a finished run stores on its revision for later estimates."""
+    return {
+        "endpoint": endpoint_key(),
+        "batch_size": batch_size,
+        "items": items,
+        "generated": generated,
+        "batches": math.ceil(generated / batch_size) if batch_size else 0,
+        "prompt_tokens": prompt_tokens,
+        "seconds": round(seconds, 3),
+    }
+
+
+class ThroughputModel:
+    """Rolling per-endpoint throughput from recent revisions, cached for `ttl` seconds."""
+
+    def __init__(self, window: int = 50, ttl: float = 60.0):
+        self.window = window
+        self.ttl = ttl
+        self._cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    async def samples(self, db, endpoint: str) -> List[Dict[str, Any]]:
+        cached = self._cache.get(endpoint)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        cursor = db.documentations.find(
+            {"throughput.endpoint": endpoint, "throughput.batches": {"$gt": 0}},
+            {"throughput": 1},
+        ).sort("created_at", -1).limit(self.window)
+        samples = [d["throughput"] async for d in cursor if (d.get("throughput") or {}).get("seconds")]
+        self._cache[endpoint] = (time.monotonic(), samples)
+        return samples
+
+    def observe(self, sample: Dict[str, Any]) -> None:
+        """Fold a just-finished run into the cached window without another query."""
+        if not sample.get("batches") or not sample.get("seconds"):
+            return
+        cached = self._cache.get(sample["endpoint"])
+        if cached:
+            self._cache[sample["endpoint"]] = (cached[0], ([sample] + cached[1])[: self.window])
+
+    @staticmethod
+    def _rate(samples: List[Dict[str, Any]], batch_size: int) -> Tuple[Optional[float], Optional[float], int]:
+        """(seconds per batch, seconds per prompt token) medians; same batch size first."""
+        same = [s for s in samples if s.get("batch_size") == batch_size]
+        pool = same or samples
+        per_batch = [s["seconds"] / s["batches"] for s in same if s.get("batches")]
+        per_token = [s["seconds"] / s["prompt_tokens"] for s in pool if s.get("prompt_tokens")]
+        return (
+            statistics.median(per_batch) if per_batch else None,
+            statistics.median(per_token) if per_token else None,
+            len(pool),
+        )
+
+    async def estimate(
+        self,
+        db,
+        batch_size: int,
+        unique_prompts: int,
+        prompt_tokens: int,
+        max_new_tokens: int = 128,
+        live: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        batch_size = max(1, batch_size)
+        batches = math.ceil(unique_prompts / batch_size) if unique_prompts else 0
+        endpoint = endpoint_key()
+        try:
+            samples = await self.samples(db, endpoint)
+        except Exception:
+            samples = []
+        per_batch, per_token, n = self._rate(samples, batch_size)
+        live = live or {}
+        concurrency = max(1, int(live.get("limit") or 1))
+        latency = live.get("latency_ewma_seconds")
+
+        if per_batch is not None:
+            seconds, basis = per_batch * batches, "history"
+        elif per_token is not None:
+            seconds, basis = per_token * prompt_tokens, "history_tokens"
+        elif latency:
+            # Requests run `limit` at a time, each taking about the current mean latency
+            seconds, basis = math.ceil(batches / concurrency) * float(latency), "live"
+        else:
+            default = _env_float("HF_DEFAULT_SECONDS_PER_BATCH", 6.0)
+            seconds, basis = math.ceil(batches / concurrency) * default, "default"
+
+        # Work already queued ahead of this run on this node
+        queued = int(live.get("queue_depth") or 0)
+        queue_seconds = (queued / concurrency) * float(latency) if latency and queued else 0.0
+
+        estimate: Dict[str, Any] = {
+            "endpoint": endpoint,
+            "batch_size": batch_size,
+            "batches": batches,
+            "unique_prompts": unique_prompts,
+            "prompt_tokens": prompt_tokens,
+            "max_output_tokens": unique_prompts * max_new_tokens,
+            "estimated_seconds": round(seconds + queue_seconds, 1),
+            "estimated_queue_seconds": round(queue_seconds, 1),
+            "basis": basis,
+            "samples": n,
+        }
+        cost_per_hour = _env_float("HF_ENDPOINT_COST_PER_HOUR", 0.0)
+        if cost_per_hour > 0:
+            estimate["estimated_cost"] = round(seconds / 3600.0 * cost_per_hour, 4)
+        warn_after = _env_float("GENERATION_WARN_SECONDS", 900.0)
+        if warn_after and estimate["estimated_seconds"] > warn_after:
+            estimate["warning"] = f"Large run: expected to take about {math.ceil(estimate['estimated_seconds'] / 60)} minutes"
+        return estimate
+
+
+throughput_model = ThroughputModel()
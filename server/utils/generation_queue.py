@@ -0,0 +1,194 @@
+"""
+Mongo-backed work queue for generation batches (db.generation_tasks).
+
+API nodes enqueue one task per batch of prompts and wait for the run to finish;
+workers (python -m worker.generation) claim tasks with a findOneAndUpdate lease,
+keep it alive with heartbeats and write outputs back. A lease that expires (the
+worker died) makes the task claimable again; writes from a worker that lost its
+lease are ignored, so a retried batch is never applied twice.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def distributed_enabled() -> bool:
+    return os.getenv("GENERATION_WORKERS", "inline").strip().lower() == "mongo"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def lease_seconds() -> float:
+    return max(5.0, _env_float("GENERATION_LEASE_SECONDS", 60.0))
+
+
+def max_attempts() -> int:
+    return max(1, int(_env_float("GENERATION_MAX_ATTEMPTS", 3)))
+
+
+async def enqueue_run(
+    db,
+    run_id: str,
+    project_id: str,
+    prompts: List[str],
+    batches: List[List[int]],
+    params: dict,
+    tenant: str,
+    lane: str,
+) -> int:
+    """One task per batch; `indices` maps outputs back to positions in the caller's prompt list."""
+    now = datetime.utcnow()
+    docs = [{
+        "run_id": run_id,
+        "project_id": project_id,
+        "seq": n,
+        "indices": batch,
+        "prompts": [prompts[i] for i in batch],
+        "params": params,
+        "tenant": tenant,
+        "lane": lane,
+        "status": PENDING,
+        "attempts": 0,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "outputs": None,
+        "failure": None,
+        "created_at": now,
+        "updated_at": now,
+    } for n, batch in enumerate(batches)]
+    if docs:
+        await db.generation_tasks.insert_many(docs)
+    return len(docs)
+
+
+async def claim_task(db, worker_id: str, lease: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Lease the oldest claimable task: pending, or leased by a worker whose lease ran out."""
+    now = datetime.utcnow()
+    return await db.generation_tasks.find_one_and_update(
+        {
+            "$or": [
+                {"status": PENDING},
+                {"status": LEASED, "lease_expires_at": {"$lt": now}},
+            ],
+            "attempts": {"$lt": max_attempts()},
+        },
+        {
+            "$set": {
+                "status": LEASED,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease or lease_seconds()),
+                "claimed_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        # "interactive" > "batch": small runs are picked up first, then oldest work
+        sort=[("lane", -1), ("created_at", 1), ("seq", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def heartbeat(db, task_id, worker_id: str, lease: Optional[float] = None) -> bool:
+    """Extend our lease; False means it was lost and the result must not be written."""
+    now = datetime.utcnow()
+    res = await db.generation_tasks.update_one(
+        {"_id": task_id, "status": LEASED, "lease_owner": worker_id},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=lease or lease_seconds()), "updated_at": now}},
+    )
+    return res.modified_count == 1
+
+
+async def complete_task(
+    db,
+    task_id,
+    worker_id: str,
+    outputs: List[Optional[str]],
+    failure: Optional[dict] = None,
+    queue_wait_seconds: float = 0.0,
+) -> bool:
+    res = await db.generation_tasks.update_one(
+        {"_id": task_id, "status": LEASED, "lease_owner": worker_id},
+        {"$set": {
+            "status": DONE,
+            "outputs": outputs,
+            "failure": failure,
+            "queue_wait_seconds": queue_wait_seconds,
+            "lease_expires_at": None,
+            "updated_at": datetime.utcnow(),
+        }},
+    )
+    return res.modified_count == 1
+
+
+async def release_task(db, task_id, worker_id: str, error: str) -> None:
+    """Hand a task back after a worker-side error; it fails for good once attempts run out."""
+    await db.generation_tasks.update_one(
+        {"_id": task_id, "status": LEASED, "lease_owner": worker_id},
+        [{"$set": {
+            "status": {"$cond": [{"$gte": ["$attempts", max_attempts()]}, FAILED, PENDING]},
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "failure": {"error": error},
+            "updated_at": datetime.utcnow(),
+        }}],
+    )
+
+
+async def wait_for_run(
+    db,
+    run_id: str,
+    on_task: Callable[[Dict[str, Any]], Awaitable[None]],
+    poll_seconds: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> bool:
+    """
+    Poll until every task of the run is done or failed, handing each finished task to
+    on_task once. Returns False on timeout.
+    """
+    poll = poll_seconds if poll_seconds is not None else _env_float("GENERATION_POLL_SECONDS", 1.0)
+    deadline = time.monotonic() + (timeout if timeout is not None else _env_float("GENERATION_RUN_TIMEOUT_SECONDS", 3600.0))
+    # Watermark over task seq: every task below `low` was delivered; `above` holds the
+    # delivered ones past it, which stays small because workers finish roughly in order
+    low = 0
+    above: Set[int] = set()
+    while True:
+        # Tasks whose last lease expired with no attempts left will never be claimed again
+        await db.generation_tasks.update_many(
+            {"run_id": run_id, "status": LEASED, "lease_expires_at": {"$lt": datetime.utcnow()}, "attempts": {"$gte": max_attempts()}},
+            {"$set": {"status": FAILED, "failure": {"error": "lease expired"}, "updated_at": datetime.utcnow()}},
+        )
+        # Count before reading results so a task finishing in between is still delivered
+        remaining = await db.generation_tasks.count_documents({"run_id": run_id, "status": {"$in": [PENDING, LEASED]}})
+        finished = db.generation_tasks.find(
+            {"run_id": run_id, "status": {"$in": [DONE, FAILED]}, "seq": {"$gte": low, "$nin": sorted(above)}},
+            {"prompts": 0, "params": 0},
+        )
+        async for task in finished:
+            above.add(task["seq"])
+            await on_task(task)
+        while low in above:
+            above.remove(low)
+            low += 1
+        if remaining == 0:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll)
+
+
+async def delete_run(db, run_id: str) -> None:
+    await db.generation_tasks.delete_many({"run_id": run_id})
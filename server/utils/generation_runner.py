@@ -0,0 +1,120 @@
+"""
+Runs generation prompts against the inference endpoint: batches first, then a
+per-prompt fallback for whatever a batch failed or left out.
+
+Used by the API nodes for inline generation (controller.DocumentationController) and by
+the generation workers (python -m worker.generation) for the batches they lease.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from utils.hf_client import HFCircuitOpenError, hf_generate_batch_async, hf_generate_coalesced_async
+
+OutputsCallback = Callable[[Dict[int, str]], Awaitable[None]]
+BatchGenerator = Callable[..., Awaitable[List[str]]]
+
+
+class GenerationStatus:
+    """Upstream error signals collected while generating, used to pick error headers."""
+
+    def __init__(self):
+        self.saw_5xx = False
+        self.saw_4xx = False
+        self.circuit_open: Optional[HFCircuitOpenError] = None
+
+    def record(self, exc: BaseException) -> None:
+        if isinstance(exc, HFCircuitOpenError):
+            self.circuit_open = exc
+        elif isinstance(exc, httpx.HTTPStatusError):
+            resp = getattr(exc, "response", None)
+            code = resp.status_code if resp is not None else 0
+            if code >= 500:
+                self.saw_5xx = True
+            elif code >= 400:
+                self.saw_4xx = True
+
+
+async def run_as_completed(coros: List[Awaitable], on_done: Callable[[int, object], Awaitable[None]]) -> None:
+    """Run coroutines concurrently, handing each (index, result-or-exception) to on_done as it finishes.
+    Outstanding work is cancelled if the caller is cancelled.
+    """
+    async def indexed(i, c):
+        try:
+            return i, await c
+        except Exception as e:
+            return i, e
+
+    tasks = [asyncio.ensure_future(indexed(i, c)) for i, c in enumerate(coros)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            i, res = await fut
+            await on_done(i, res)
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+async def generate_outputs(
+    prompts: List[str],
+    merged_outputs: List[Optional[str]],
+    params: dict,
+    batch_size: int,
+    on_outputs: Optional[OutputsCallback] = None,
+    generate: Optional[BatchGenerator] = None,
+) -> GenerationStatus:
+    """Fill the None slots of merged_outputs in place.
+    Missing prompts are sent in batches; prompts whose batch failed (or came back short)
+    are retried individually in parallel. Concurrency for both stages is bounded by the
+    shared adaptive limiter in utils.hf_client. on_outputs receives {index: text} as
+    results arrive. `generate` sends one batch (default: hf_generate_batch_async).
+    """
+    generate = generate or hf_generate_batch_async
+    status = GenerationStatus()
+
+    async def deliver(outs: Dict[int, str]):
+        for idx, out in outs.items():
+            merged_outputs[idx] = out
+        if on_outputs and outs:
+            await on_outputs(outs)
+
+    # Stage 1: batches over prompts that are not already done
+    pending = [i for i, o in enumerate(merged_outputs) if o is None]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    async def on_batch(b: int, result):
+        if isinstance(result, Exception):
+            # Leave as None -> per-prompt fallback below
+            status.record(result)
+            return
+        # If model returned fewer outputs than prompts in batch, remaining stay None -> fallback
+        await deliver({idx: str(out) for idx, out in zip(batches[b], result) if out is not None})
+
+    # Identical prompts already in flight for another generation are awaited, not re-sent
+    await run_as_completed(
+        [hf_generate_coalesced_async([prompts[i] for i in batch], parameters=params, generate=generate) for batch in batches],
+        on_batch,
+    )
+
+    # Stage 2: bounded-parallel fallback per missing prompt.
+    # Retrying prompt by prompt against an endpoint that tripped the breaker only adds load.
+    missing = [i for i, o in enumerate(merged_outputs) if o is None]
+    if not missing or status.circuit_open is not None:
+        return status
+
+    async def single(idx: int):
+        if status.circuit_open is not None:
+            return ""
+        out = await hf_generate_coalesced_async([prompts[idx]], parameters=params, generate=generate)
+        return str(out[0]).strip() if isinstance(out, list) and out and out[0] is not None else ""
+
+    async def on_single(k: int, result):
+        if isinstance(result, Exception):
+            status.record(result)
+            result = ""
+        await deliver({missing[k]: result})
+
+    await run_as_completed([single(idx) for idx in missing], on_single)
+    return status
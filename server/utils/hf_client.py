@@ -1,12 +1,278 @@
 import os
 import asyncio
 import httpx
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from collections import deque
+from contextlib import asynccontextmanager
 import random
+import time
+import json
+import gzip
+import hashlib
+from utils.inference_scheduler import FairShareScheduler
 
 class HFConfigError(RuntimeError):
     pass
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Process-wide AIMD limiter for requests to the inference endpoint.
+    The limit grows by about one slot per window of on-target successes and is
+    cut multiplicatively on overload (429/502/503, timeouts, slow responses).
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 20.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 5.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._latency_ewma: Optional[float] = None
+        self._error_rate = 0.0
+        self._counters = {"acquired": 0, "successes": 0, "overloads": 0, "increases": 0, "decreases": 0}
+        # Callers queued in front of the limiter (the fair-share scheduler) count as demand
+        self.demand: Optional[Callable[[], int]] = None
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    async def acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            self._counters["acquired"] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over right before cancellation; give it back
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+        self._counters["acquired"] += 1
+
+    def release(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            try:
+                fut.set_result(None)
+            except RuntimeError:
+                # Waiter belongs to a closed loop
+                continue
+            self._in_flight += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def record_success(self, latency: float) -> None:
+        self._counters["successes"] += 1
+        self._error_rate *= 0.9
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency
+        if latency > self.latency_target:
+            self._decrease()
+            return
+        # Only grow while the limit is actually the bottleneck and errors are rare
+        saturated = self._in_flight >= self.limit or bool(self._waiters) or bool(self.demand and self.demand())
+        if saturated and self._error_rate < 0.1 and self._limit < self.max_limit:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._counters["increases"] += 1
+            self._wake()
+
+    def record_overload(self) -> None:
+        self._counters["overloads"] += 1
+        self._error_rate = 0.9 * self._error_rate + 0.1
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        # One burst of failures should only back off once
+        if self._last_decrease and now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        self._counters["decreases"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "latency_ewma_seconds": round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+            "latency_target_seconds": self.latency_target,
+            "error_rate": round(self._error_rate, 4),
+            **self._counters,
+        }
+
+# Shared by project generation, the demo endpoint and warmup
+hf_limiter = AdaptiveConcurrencyLimiter(
+    initial=_env_int("HF_MAX_CONCURRENCY", 6),
+    min_limit=_env_int("HF_MIN_CONCURRENCY", 1),
+    max_limit=_env_int("HF_CONCURRENCY_CEILING", 32),
+    latency_target=_env_float("HF_LATENCY_TARGET_SECONDS", 20.0),
+    cooldown=_env_float("HF_AIMD_COOLDOWN_SECONDS", 5.0),
+)
+
+# Orders callers waiting for a limiter slot: interactive lane first, weighted fair across tenants
+hf_scheduler = FairShareScheduler(
+    hf_limiter,
+    tenant_cap=_env_int("HF_TENANT_MAX_CONCURRENCY", 0),
+    reserved_interactive=_env_int("HF_INTERACTIVE_RESERVED_SLOTS", 1),
+)
+
+
+class HFCircuitOpenError(RuntimeError):
+    """Raised without contacting the endpoint while the circuit is open."""
+
+    def __init__(self, model_status: str, retry_after: float):
+        super().__init__(f"HF endpoint unavailable (model {model_status}); retry in {int(retry_after)}s")
+        self.model_status = model_status
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Shared health state for the inference endpoint.
+    closed -> open after `failure_threshold` consecutive endpoint failures;
+    open -> half_open once `reset_timeout` elapses; half_open lets a single
+    probe (the warmup request) through and closes on success or re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, history: int = 20):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._model_status = "booting"
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=history)
+
+    def _transition(self, new_state: str, reason: str) -> None:
+        if new_state == self._state:
+            return
+        self._transitions.append({"from": self._state, "to": new_state, "reason": reason, "at": time.time()})
+        self._state = new_state
+        if new_state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if new_state != self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN, "reset timeout elapsed")
+        return self._state
+
+    @property
+    def model_status(self) -> str:
+        return self._model_status
+
+    def retry_after(self) -> float:
+        if self._state != self.OPEN:
+            return 0.0 if self._state == self.CLOSED else 5.0
+        return max(1.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self, probe: bool = False) -> bool:
+        st = self.state
+        if st == self.CLOSED:
+            return True
+        if st == self.HALF_OPEN and probe and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state != self.CLOSED:
+            self._transition(self.CLOSED, "probe succeeded" if self._state == self.HALF_OPEN else "request succeeded")
+
+    def record_failure(self, model_status: str = "booting") -> None:
+        self._failures += 1
+        self._model_status = model_status
+        if self._state == self.HALF_OPEN:
+            self._transition(self.OPEN, f"probe failed ({model_status})")
+        elif self._state == self.CLOSED and self._failures >= self.failure_threshold:
+            self._transition(self.OPEN, f"{self._failures} consecutive failures ({model_status})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        st = self.state
+        return {
+            "state": st,
+            "model_status": None if st == self.CLOSED else self._model_status,
+            "consecutive_failures": self._failures,
+            "retry_after_seconds": round(self.retry_after(), 1) if st != self.CLOSED else 0,
+            "transitions": list(self._transitions),
+        }
+
+hf_breaker = CircuitBreaker(
+    failure_threshold=_env_int("HF_CIRCUIT_FAILURE_THRESHOLD", 5),
+    reset_timeout=_env_float("HF_CIRCUIT_RESET_SECONDS", 30.0),
+)
+
+def hf_health() -> Dict[str, Any]:
+    return hf_breaker.snapshot()
+
 def _get_hf_config() -> tuple[str, str]:
     endpoint = os.getenv("HF_ENDPOINT")
     token = os.getenv("HF_TOKEN")
@@ -14,22 +280,155 @@ def _get_hf_config() -> tuple[str, str]:
         raise HFConfigError("HF_ENDPOINT or HF_TOKEN not set in environment.")
     return endpoint, token
 
-async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_retries: int = 8) -> Any:
+# ---------- Managed HTTP client ----------
+# Created once in the FastAPI lifespan so batches and fallback prompts reuse
+# pooled keep-alive (HTTP/2 when available) connections instead of paying a
+# TCP/TLS handshake per call.
+_hf_client: Optional[httpx.AsyncClient] = None
+_client_stats: Dict[str, int] = {"requests": 0, "gzip_requests": 0, "bytes_sent": 0, "ephemeral_clients": 0}
+
+def _http2_enabled() -> bool:
+    if os.getenv("HF_HTTP2", "1").strip() in ("0", "false", "False"):
+        return False
+    try:
+        import h2  # noqa: F401  (optional; httpx needs it for HTTP/2)
+    except ImportError:
+        return False
+    return True
+
+def _build_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=_env_int("HF_POOL_MAX_CONNECTIONS", 32),
+        max_keepalive_connections=_env_int("HF_POOL_MAX_KEEPALIVE", 16),
+        keepalive_expiry=_env_float("HF_POOL_KEEPALIVE_SECONDS", 120.0),
+    )
+    timeout = httpx.Timeout(_env_float("HF_TIMEOUT_SECONDS", 600.0), connect=_env_float("HF_CONNECT_TIMEOUT_SECONDS", 10.0))
+    kwargs: Dict[str, Any] = {"limits": limits, "timeout": timeout, "http2": _http2_enabled()}
+    if transport is not None:
+        kwargs["transport"] = transport
+    return httpx.AsyncClient(**kwargs)
+
+async def start_hf_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    global _hf_client
+    if _hf_client is None or _hf_client.is_closed:
+        _hf_client = _build_client(transport)
+    return _hf_client
+
+async def close_hf_client() -> None:
+    global _hf_client
+    client, _hf_client = _hf_client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+@asynccontextmanager
+async def _client_scope():
+    if _hf_client is not None and not _hf_client.is_closed:
+        yield _hf_client
+        return
+    # Outside the app lifespan (scripts, tests): short-lived client
+    _client_stats["ephemeral_clients"] += 1
+    async with _build_client() as client:
+        yield client
+
+def _encode_payload(payload: Dict[str, Any]) -> tuple[bytes, Dict[str, str]]:
+    """Serialize once per call; gzip large bodies when HF_GZIP_REQUESTS is on."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    extra: Dict[str, str] = {}
+    gzip_on = os.getenv("HF_GZIP_REQUESTS", "0").strip() not in ("0", "false", "False")
+    if gzip_on and len(body) >= _env_int("HF_GZIP_MIN_BYTES", 16384):
+        body = gzip.compress(body, compresslevel=5)
+        extra["Content-Encoding"] = "gzip"
+    return body, extra
+
+def _is_loading_payload(data: Any) -> bool:
+    """Detect HF warm-up responses from their structured fields only.
+    Generation results are lists (or dicts with generated_text) and are never
+    inspected as text, so a docstring that mentions "loading" is not a warm-up.
+    """
+    if not isinstance(data, dict):
+        return False
+    if "estimated_time" in data:
+        return True
+    err = data.get("error")
+    if isinstance(err, str):
+        e = err.lower()
+        return ("loading" in e) or ("warm" in e)
+    return False
+
+def _failure_status(status_code: Optional[int], data: Any) -> Optional[str]:
+    """Map an endpoint response to a breaker failure ("booting"/"paused"/"failing"), or None if healthy.
+    No status code means the request never got a response (timeout, connection error).
+    """
+    if status_code == 503 or _is_loading_payload(data):
+        return "booting"
+    if isinstance(data, dict) and "paused" in str(data.get("error") or "").lower():
+        return "paused"
+    if status_code is None or status_code >= 500:
+        return "failing"
+    return None
+
+async def _limited_post(client: httpx.AsyncClient, endpoint: str, headers: Dict[str, str], body: bytes, timeout: float) -> httpx.Response:
+    """POST through the fair-share scheduler and shared limiter, feeding the outcome back."""
+    async with hf_scheduler.slot():
+        started = time.monotonic()
+        _client_stats["requests"] += 1
+        _client_stats["bytes_sent"] += len(body)
+        if headers.get("Content-Encoding") == "gzip":
+            _client_stats["gzip_requests"] += 1
+        try:
+            resp = await client.post(
+                endpoint,
+                headers=headers,
+                content=body,
+                timeout=httpx.Timeout(timeout, connect=_env_float("HF_CONNECT_TIMEOUT_SECONDS", 10.0)),
+            )
+        except (httpx.TimeoutException, httpx.RequestError):
+            hf_limiter.record_overload()
+            raise
+        if resp.status_code in (429, 502, 503):
+            hf_limiter.record_overload()
+        elif resp.is_success:
+            hf_limiter.record_success(time.monotonic() - started)
+        return resp
+
+def hf_breaker_allows(probe: bool = False) -> bool:
+    """hf_breaker.allow_request, scheduling the recovery probe when a half-open breaker refuses."""
+    if hf_breaker.allow_request(probe=probe):
+        return True
+    if hf_breaker.state == CircuitBreaker.HALF_OPEN:
+        _schedule_probe()
+    return False
+
+async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_retries: int = 8, probe: bool = False) -> Any:
     endpoint, token = _get_hf_config()
+    if not hf_breaker_allows(probe=probe):
+        raise HFCircuitOpenError(hf_breaker.model_status, hf_breaker.retry_after())
+    try:
+        return await _query_with_retries(endpoint, token, payload, timeout, max_retries)
+    finally:
+        if probe:
+            hf_breaker.release_probe()
+
+async def _query_with_retries(endpoint: str, token: str, payload: Dict[str, Any], timeout: int, max_retries: int) -> Any:
+    body, extra_headers = _encode_payload(payload)
     headers = {
         "Accept": "application/json",
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
+        **extra_headers,
     }
 
     # Allow immediate pass-through of upstream errors for better client UX
     passthrough = (os.getenv("HF_PASSTHROUGH_ERRORS", "1").strip() not in ("0", "false", "False"))
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
+    async with _client_scope() as client:
         last_error: Optional[Exception] = None
         for attempt in range(max_retries):
+            if attempt > 0 and hf_breaker.state == CircuitBreaker.OPEN:
+                # Another request tripped the breaker while we were backing off
+                raise HFCircuitOpenError(hf_breaker.model_status, hf_breaker.retry_after())
             try:
-                resp = await client.post(endpoint, headers=headers, json=payload)
+                resp = await _limited_post(client, endpoint, headers, body, timeout)
 
                 # Best-effort JSON parse
                 try:
@@ -37,11 +436,14 @@ async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_r
                 except Exception:
                     data = None
 
+                failure = _failure_status(resp.status_code, data)
+                if failure:
+                    hf_breaker.record_failure(failure)
+                elif resp.is_success:
+                    hf_breaker.record_success()
+
                 # Handle warm-up / loading and transient errors
-                loading_signal = False
-                if data is not None and isinstance(data, (dict, list)):
-                    s = str(data).lower()
-                    loading_signal = ("loading" in s) or ("estimated_time" in s) or ("warm" in s)
+                loading_signal = _is_loading_payload(data)
 
                 if resp.status_code in (429, 502, 503) or loading_signal:
                     if passthrough:
@@ -70,6 +472,7 @@ async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_r
                 break
 
             except (httpx.TimeoutException, httpx.RequestError) as e:
+                hf_breaker.record_failure(_failure_status(None, None))
                 last_error = e
                 if attempt < max_retries - 1:
                     base = 5 * (2 ** attempt)
@@ -84,7 +487,7 @@ async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_r
                 for i in range(6):  # 6 polls ~20s apart
                     await asyncio.sleep(20)
                     try:
-                        resp = await client.post(endpoint, headers=headers, json=payload)
+                        resp = await _limited_post(client, endpoint, headers, body, timeout)
                         if resp.is_success:
                             try:
                                 return resp.json()
@@ -100,6 +503,19 @@ async def hf_query_json_async(payload: Dict[str, Any], timeout: int = 600, max_r
             raise last_error
         raise httpx.HTTPStatusError(f"Failed after {max_retries} attempts", request=None, response=None)
 
+def hf_metrics() -> Dict[str, Any]:
+    return {
+        "concurrency": hf_limiter.snapshot(),
+        "scheduler": hf_scheduler.snapshot(),
+        "circuit": hf_breaker.snapshot(),
+        "coalescing": hf_coalescer.snapshot(),
+        "client": {
+            "managed": _hf_client is not None and not _hf_client.is_closed,
+            "http2": _http2_enabled(),
+            **_client_stats,
+        },
+    }
+
 async def hf_generate_batch_async(inputs: List[str], parameters: Optional[Dict[str, Any]] = None) -> List[str]:
     payload: Dict[str, Any] = {"inputs": inputs}
     if parameters:
@@ -122,3 +538,134 @@ async def hf_generate_batch_async(inputs: List[str], parameters: Optional[Dict[s
         outputs.append(str(data))
 
     return outputs
+
+# ---------- Single-flight prompt coalescing ----------
+
+class HFCoalescedRequestCancelled(RuntimeError):
+    """The request that owned a coalesced prompt was cancelled before it finished."""
+
+class PromptCoalescer:
+    """
+    Single-flight layer in front of hf_generate_batch_async.
+    Identical prompts (with identical parameters) are sent once per call, and
+    prompts already in flight for another coroutine are awaited instead of
+    re-sent; results are fanned back out in input order.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counters = {"prompts": 0, "sent": 0, "deduped": 0, "coalesced": 0}
+
+    @staticmethod
+    def _key(prompt: str, params_key: str) -> str:
+        return hashlib.sha1(f"{params_key}\0{prompt}".encode("utf-8")).hexdigest()
+
+    async def generate(
+        self,
+        inputs: List[str],
+        parameters: Optional[Dict[str, Any]] = None,
+        generate: Optional[Callable[..., Awaitable[List[str]]]] = None,
+    ) -> List[Optional[str]]:
+        """Return one output per input; None where the model returned no output for it.
+        Raises only if every prompt failed.
+        """
+        generate = generate or hf_generate_batch_async
+        loop = asyncio.get_running_loop()
+        params_key = json.dumps(parameters or {}, sort_keys=True, default=str)
+        keys = [self._key(p, params_key) for p in inputs]
+        futures: Dict[str, asyncio.Future] = {}
+        owned: List[int] = []
+        self._counters["prompts"] += len(inputs)
+        for i, k in enumerate(keys):
+            if k in futures:
+                self._counters["deduped"] += 1
+                continue
+            fut = self._inflight.get(k)
+            if fut is not None and not fut.done() and fut.get_loop() is loop:
+                self._counters["coalesced"] += 1
+                futures[k] = fut
+                continue
+            fut = loop.create_future()
+            self._inflight[k] = fut
+            futures[k] = fut
+            owned.append(i)
+
+        if owned:
+            owned_keys = [keys[i] for i in owned]
+            self._counters["sent"] += len(owned)
+            try:
+                outs = await generate([inputs[i] for i in owned], parameters=parameters)
+            except BaseException as e:
+                err = e if isinstance(e, Exception) else HFCoalescedRequestCancelled("coalesced request cancelled")
+                for k in owned_keys:
+                    if not futures[k].done():
+                        futures[k].set_exception(err)
+                        futures[k].exception()  # mark retrieved; followers still see it
+                if not isinstance(e, Exception):
+                    raise
+            else:
+                outs = list(outs or [])
+                for n, k in enumerate(owned_keys):
+                    if not futures[k].done():
+                        # A short batch leaves the remainder as None -> caller falls back
+                        futures[k].set_result(outs[n] if n < len(outs) else None)
+            finally:
+                for k in owned_keys:
+                    if self._inflight.get(k) is futures[k]:
+                        del self._inflight[k]
+
+        results: List[Optional[str]] = []
+        first_error: Optional[BaseException] = None
+        failed = 0
+        for k in keys:
+            try:
+                # Shield so a cancelled follower doesn't cancel the shared future
+                results.append(await asyncio.shield(futures[k]))
+            except Exception as e:
+                first_error = first_error or e
+                failed += 1
+                results.append(None)
+        if inputs and failed == len(inputs) and first_error is not None:
+            raise first_error
+        return results
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._inflight), **self._counters}
+
+hf_coalescer = PromptCoalescer()
+
+async def hf_generate_coalesced_async(
+    inputs: List[str],
+    parameters: Optional[Dict[str, Any]] = None,
+    generate: Optional[Callable[..., Awaitable[List[str]]]] = None,
+) -> List[Optional[str]]:
+    return await hf_coalescer.generate(inputs, parameters=parameters, generate=generate)
+
+async def hf_warmup_async() -> bool:
+    """Send a tiny request to pre-boot the model; doubles as the half-open probe."""
+    prompts = [
+        "Warmup ping: generate a short placeholder docstring.",
+    ]
+    params = {
+        "max_length": 32,
+        "do_sample": False,
+        "temperature": 0.1,
+        "clean_up_tokenization_spaces": True,
+    }
+    try:
+        payload: Dict[str, Any] = {"inputs": prompts, "parameters": params}
+        await hf_query_json_async(payload, max_retries=1, probe=True)
+        return True
+    except Exception:
+        return False
+
+_probe_task: Optional[asyncio.Task] = None
+
+def _schedule_probe() -> None:
+    global _probe_task
+    if _probe_task is not None and not _probe_task.done():
+        return
+    try:
+        _probe_task = asyncio.get_running_loop().create_task(hf_warmup_async())
+    except RuntimeError:
+        _probe_task = None
@@ -0,0 +1,27 @@
+"""
+Helpers shared by the stores that index documentation content: search-term
+tokenizing (site export search and the per-project search index) and chunking large
+id lists into bounded Mongo queries and bulk writes.
+"""
+import re
+from typing import Any, Iterable, List
+
+FETCH_CHUNK = 1000
+
+_token_re = re.compile(r"[a-z0-9]+")
+_camel_re = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from if in into is it of on or the this to with "
+    "that its be will can when which not none true false".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word terms; camelCase and snake_case names split into their parts too."""
+    words = _camel_re.sub(" ", text or "").lower()
+    return [t for t in _token_re.findall(words) if len(t) > 1 and not t.isdigit() and t not in _STOPWORDS]
+
+
+def chunks(seq: List[Any], size: int) -> Iterable[List[Any]]:
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+
+class InferenceJob:
+    """Who an inference call is made for; also collects the queue wait it saw."""
+
+    def __init__(self, tenant: str, lane: str = BATCH, weight: float = 1.0):
+        self.tenant = tenant or "anonymous"
+        self.lane = lane if lane in LANES else BATCH
+        self.weight = max(0.01, float(weight))
+        self.requests = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+
+    def record_wait(self, waited: float) -> None:
+        self.requests += 1
+        self.queue_wait_seconds += waited
+        self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, waited)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tenant": self.tenant,
+            "lane": self.lane,
+            "requests": self.requests,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "max_queue_wait_seconds": round(self.max_queue_wait_seconds, 3),
+        }
+
+
+_current_job: ContextVar[Optional[InferenceJob]] = ContextVar("inference_job", default=None)
+_default_job = InferenceJob("anonymous", BATCH)
+
+
+def current_job() -> InferenceJob:
+    return _current_job.get() or _default_job
+
+
+@contextmanager
+def inference_job(tenant: str, lane: str = BATCH, weight: float = 1.0):
+    """
+    Tag every HF call made in this context (and tasks spawned from it) with a tenant
+    and lane for the fair-share scheduler.
+    """
+    job = InferenceJob(tenant, lane, weight)
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def _pct(ordered, pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100.0)))], 4)
+
+
+class FairShareScheduler:
+    """
+    Decides which waiting caller gets the next slot of the shared concurrency limiter.
+
+    - interactive lane (demo, small runs) is always served before the batch lane,
+      and `reserved_interactive` slots are kept free of batch work so small jobs
+      never wait behind a full set of long batch requests;
+    - within a lane, tenants are served by weighted fair queuing (stride scheduling):
+      a tenant with many queued requests can't starve one with a few;
+    - no tenant holds more than `tenant_cap` slots at once (0 = no cap).
+    """
+
+    def __init__(self, limiter, tenant_cap: int = 0, reserved_interactive: int = 1, history: int = 512):
+        self.limiter = limiter
+        self.tenant_cap = max(0, tenant_cap)
+        self.reserved_interactive = max(0, reserved_interactive)
+        self._queues: Dict[str, Dict[str, Deque[Tuple[asyncio.Future, InferenceJob]]]] = {lane: {} for lane in LANES}
+        self._pass: Dict[Tuple[str, str], float] = {}
+        self._vtime: Dict[str, float] = {lane: 0.0 for lane in LANES}
+        self._running: Dict[str, int] = {}
+        self._running_lane: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._waits: Dict[str, Deque[float]] = {lane: deque(maxlen=history) for lane in LANES}
+        self._counters = {"admitted": 0, "queued": 0, "cancelled": 0}
+        # Let the limiter see demand queued here, so it can still grow the limit
+        limiter.demand = lambda: self.queue_depth
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._running_lane.values())
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for lane in LANES for q in self._queues[lane].values())
+
+    def _batch_capacity(self) -> int:
+        limit = self.limiter.limit
+        return max(1, limit - self.reserved_interactive) if limit > 1 else limit
+
+    def _eligible(self, job: InferenceJob) -> bool:
+        if self.in_flight >= self.limiter.limit:
+            return False
+        if self.tenant_cap and self._running.get(job.tenant, 0) >= self.tenant_cap:
+            return False
+        if job.lane == BATCH and self._running_lane[BATCH] >= self._batch_capacity():
+            return False
+        return True
+
+    def _admit(self, job: InferenceJob) -> None:
+        self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+        self._running_lane[job.lane] += 1
+        key = (job.lane, job.tenant)
+        # Stride: each admission costs 1/weight of virtual time; idle tenants rejoin at "now"
+        start = max(self._pass.get(key, 0.0), self._vtime[job.lane])
+        self._vtime[job.lane] = start
+        self._pass[key] = start + 1.0 / job.weight
+        self._counters["admitted"] += 1
+
+    def _pick(self, lane: str) -> Optional[str]:
+        best, best_pass = None, None
+        for tenant, q in self._queues[lane].items():
+            while q and q[0][0].done():
+                q.popleft()
+            if not q or not self._eligible(q[0][1]):
+                continue
+            p = max(self._pass.get((lane, tenant), 0.0), self._vtime[lane])
+            if best_pass is None or p < best_pass:
+                best, best_pass = tenant, p
+        return best
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.limiter.limit:
+            for lane in LANES:
+                tenant = self._pick(lane)
+                if tenant is not None:
+                    break
+            else:
+                break
+            fut, job = self._queues[lane][tenant].popleft()
+            if not self._queues[lane][tenant]:
+                del self._queues[lane][tenant]
+            try:
+                fut.set_result(None)
+            except RuntimeError:
+                # Waiter belongs to a closed loop
+                continue
+            self._admit(job)
+
+    async def acquire(self, job: InferenceJob) -> float:
+        started = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self._queues[job.lane].setdefault(job.tenant, deque()).append((fut, job))
+        self._dispatch()
+        if not fut.done():
+            self._counters["queued"] += 1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            self._counters["cancelled"] += 1
+            if fut.done() and not fut.cancelled():
+                # Admitted right before cancellation; give the slot back
+                self.release(job)
+            else:
+                self._forget(job, fut)
+            raise
+        waited = time.monotonic() - started
+        job.record_wait(waited)
+        self._waits[job.lane].append(waited)
+        return waited
+
+    def _forget(self, job: InferenceJob, fut: asyncio.Future) -> None:
+        q = self._queues[job.lane].get(job.tenant)
+        if not q:
+            return
+        try:
+            q.remove((fut, job))
+        except ValueError:
+            pass
+        if not q:
+            del self._queues[job.lane][job.tenant]
+
+    def release(self, job: InferenceJob) -> None:
+        running = self._running.get(job.tenant, 0) - 1
+        if running > 0:
+            self._running[job.tenant] = running
+        else:
+            self._running.pop(job.tenant, None)
+        self._running_lane[job.lane] = max(0, self._running_lane[job.lane] - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, job: Optional[InferenceJob] = None):
+        """Fair-share admission followed by a limiter slot."""
+        job = job or current_job()
+        await self.acquire(job)
+        try:
+            async with self.limiter.slot():
+                yield job
+        finally:
+            self.release(job)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in LANES:
+            waits = sorted(self._waits[lane])
+            lanes[lane] = {
+                "queued": sum(len(q) for q in self._queues[lane].values()),
+                "running": self._running_lane[lane],
+                "wait_p50_seconds": _pct(waits, 50),
+                "wait_p95_seconds": _pct(waits, 95),
+                "wait_p99_seconds": _pct(waits, 99),
+            }
+        return {
+            "tenant_cap": self.tenant_cap,
+            "reserved_interactive": self.reserved_interactive,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            # Counts only: tenant ids are user ids
+            "tenants_running": len(self._running),
+            "tenant_running_max": max(self._running.values(), default=0),
+            "lanes": lanes,
+            **self._counters,
+        }
@@ -1,9 +1,14 @@
 import ast
 
+def _line_span(node) -> dict:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return {"lineno": start, "end_lineno": getattr(node, "end_lineno", None) or node.lineno}
+
 def extract_functions_classes_from_content(file_content: str):
     """
     Extracts functions (including async), classes, and their methods from Python source code.
-    Returns a dict with lists of functions and classes (with methods).
+    Returns a dict with lists of functions and classes (with methods). Each entry also
+    carries its 1-based line span (lineno, end_lineno, decorators included).
     """
     tree = ast.parse(file_content)
     functions = []
@@ -14,7 +19,8 @@ def extract_functions_classes_from_content(file_content: str):
             func_code = ast.get_source_segment(file_content, node) or ""
             functions.append({
                 "name": node.name,
-                "code": func_code
+                "code": func_code,
+                **_line_span(node),
             })
         elif isinstance(node, ast.ClassDef):
             class_code = ast.get_source_segment(file_content, node) or ""
@@ -24,12 +30,14 @@ def extract_functions_classes_from_content(file_content: str):
                     method_code = ast.get_source_segment(file_content, item) or ""
                     methods.append({
                         "name": item.name,
-                        "code": method_code
+                        "code": method_code,
+                        **_line_span(item),
                     })
             classes.append({
                 "name": node.name,
                 "code": class_code,
-                "methods": methods
+                "methods": methods,
+                **_line_span(node),
             })
 
     return {
@@ -0,0 +1,192 @@
+import ast
+import os
+import re
+from typing import Any, Dict, List, Optional, Union
+
+# ~1 token per identifier/number run or punctuation mark; close enough to BPE counts for code
+_token_re = re.compile(r"\w+|[^\w\s]")
+
+FuncNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_token_re.findall(text or ""))
+
+
+def default_token_budget() -> int:
+    try:
+        return max(32, int(os.getenv("HF_PROMPT_TOKEN_BUDGET", "200")))
+    except Exception:
+        return 200
+
+
+def verbatim_token_limit() -> int:
+    # Bodies this small say more than a skeleton would and cost next to nothing
+    try:
+        return max(0, int(os.getenv("HF_PROMPT_VERBATIM_TOKENS", "48")))
+    except Exception:
+        return 48
+
+
+def _first_definition(code: str) -> Optional[ast.AST]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return node
+    return None
+
+
+def _docstring_lines(node: ast.AST, indent: str, first_line_only: bool) -> List[str]:
+    doc = ast.get_docstring(node, clean=True)
+    if not doc:
+        return []
+    if first_line_only:
+        doc = doc.strip().splitlines()[0]
+    body = doc.replace('"""', '\\"\\"\\"').splitlines() or [""]
+    if len(body) == 1:
+        return [f'{indent}"""{body[0]}"""']
+    return [f'{indent}"""{body[0]}'] + [f"{indent}{ln}" if ln else "" for ln in body[1:]] + [f'{indent}"""']
+
+
+def _signature(node: Union[FuncNode, ast.ClassDef]) -> List[str]:
+    """Decorators plus the def/class line, re-rendered without the body."""
+    stub = ast.Pass()
+    if isinstance(node, ast.ClassDef):
+        header = ast.ClassDef(name=node.name, bases=node.bases, keywords=node.keywords, body=[stub],
+                              decorator_list=node.decorator_list, type_params=getattr(node, "type_params", []))
+    else:
+        header = type(node)(name=node.name, args=node.args, body=[stub], decorator_list=node.decorator_list,
+                            returns=node.returns, type_comment=None, type_params=getattr(node, "type_params", []))
+    ast.fix_missing_locations(header)
+    lines = ast.unparse(header).splitlines()
+    return lines[:-1]  # drop the placeholder 'pass'
+
+
+def _outcome_statements(body: List[ast.stmt]) -> List[ast.stmt]:
+    """return/raise/yield statements in source order, not descending into nested defs."""
+    found: List[ast.stmt] = []
+
+    def visit(stmts):
+        for st in stmts:
+            if isinstance(st, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if isinstance(st, (ast.Return, ast.Raise)):
+                found.append(st)
+            elif isinstance(st, ast.Expr) and isinstance(st.value, (ast.Yield, ast.YieldFrom)):
+                found.append(st)
+            for field in ("body", "orelse", "finalbody"):
+                inner = getattr(st, field, None)
+                if isinstance(inner, list):
+                    visit(inner)
+            for handler in getattr(st, "handlers", []) or []:
+                visit(handler.body)
+            for case in getattr(st, "cases", []) or []:
+                visit(case.body)
+
+    visit(body)
+    return found
+
+
+def _one_line(stmt: ast.stmt, limit: int = 160) -> str:
+    text = " ".join(ast.unparse(stmt).split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _compact_function(node: FuncNode, first_line_doc: bool, max_outcomes: Optional[int]) -> List[str]:
+    indent = "    "
+    lines = _signature(node)
+    lines += _docstring_lines(node, indent, first_line_doc)
+    outcomes = _outcome_statements(node.body)
+    if max_outcomes is not None and len(outcomes) > max_outcomes:
+        # Keep the last ones: final return paths say the most about the result
+        outcomes = outcomes[-max_outcomes:]
+    body_stmts = [s for s in node.body if not (isinstance(s, ast.Expr) and isinstance(getattr(s, "value", None), ast.Constant) and isinstance(s.value.value, str))]
+    if len(outcomes) < len(body_stmts) or not outcomes:
+        lines.append(f"{indent}...")
+    for st in outcomes:
+        lines.append(f"{indent}{_one_line(st)}")
+    return lines
+
+
+def _class_attributes(node: ast.ClassDef) -> List[str]:
+    attrs: List[str] = []
+    for st in node.body:
+        if isinstance(st, (ast.Assign, ast.AnnAssign)):
+            attrs.append(_one_line(st))
+    for st in node.body:
+        if isinstance(st, (ast.FunctionDef, ast.AsyncFunctionDef)) and st.name == "__init__":
+            for sub in ast.walk(st):
+                if isinstance(sub, (ast.Assign, ast.AnnAssign)):
+                    targets = sub.targets if isinstance(sub, ast.Assign) else [sub.target]
+                    if any(isinstance(t, ast.Attribute) and isinstance(t.value, ast.Name) and t.value.id == "self" for t in targets):
+                        attrs.append(_one_line(sub))
+    return attrs
+
+
+def _compact_class(node: ast.ClassDef, first_line_doc: bool, max_methods: Optional[int]) -> List[str]:
+    indent = "    "
+    lines = _signature(node)
+    lines += _docstring_lines(node, indent, first_line_doc)
+    lines += [f"{indent}{a}" for a in _class_attributes(node)]
+    methods = [st for st in node.body if isinstance(st, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    if max_methods is not None:
+        methods = methods[:max_methods]
+    for m in methods:
+        sig = _signature(m)
+        lines += [f"{indent}{ln}" for ln in sig[:-1]]
+        lines.append(f"{indent}{sig[-1]} ...")
+    if len(lines) == len(_signature(node)):
+        lines.append(f"{indent}...")
+    return lines
+
+
+def _truncate_tokens(text: str, budget: int) -> str:
+    keep = max(1, budget - 3)  # room for the " ..." marker
+    if estimate_tokens(text) <= budget:
+        return text
+    count = 0
+    for m in _token_re.finditer(text):
+        count += 1
+        if count > keep:
+            return text[: m.start()].rstrip() + " ..."
+    return text
+
+
+def compact_code(code: str, token_budget: Optional[int] = None) -> str:
+    """
+    Shrink a function/method/class to what matters for its docstring: decorators,
+    signature, existing docstring and return/raise/yield statements (for classes the
+    attribute assignments and method signatures), eliding the rest with '...'.
+    Falls back to plain token truncation when the code doesn't parse.
+    """
+    budget = token_budget or default_token_budget()
+    if estimate_tokens(code) <= min(budget, verbatim_token_limit()):
+        return code
+    node = _first_definition(code or "")
+    if node is None:
+        return _truncate_tokens(code or "", budget)
+
+    # Progressively drop detail until the item fits the budget
+    for first_line_doc, cap in ((False, None), (True, None), (True, 8), (True, 4), (True, 1)):
+        if isinstance(node, ast.ClassDef):
+            lines = _compact_class(node, first_line_doc, cap)
+        else:
+            lines = _compact_function(node, first_line_doc, cap)
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= budget:
+            return text
+    return _truncate_tokens(text, budget)
+
+
+def compaction_stats(original_tokens: int, prompt_tokens: int, items: int) -> Dict[str, Any]:
+    saved = max(0, original_tokens - prompt_tokens)
+    return {
+        "items": items,
+        "original_code_tokens": original_tokens,
+        "compacted_code_tokens": prompt_tokens,
+        "tokens_saved": saved,
+        "reduction_pct": round(100.0 * saved / original_tokens, 1) if original_tokens else 0.0,
+    }
@@ -0,0 +1,206 @@
+"""
+Cache of rendered revision artifacts (HTML, Markdown, PDF).
+
+Revisions are immutable apart from title/description/filename, which bump the
+revision's `meta_version`; artifacts are keyed by (revision id, format, meta_version,
+renderer version) so an edit simply stops matching the old entry. Two tiers: an
+in-process LRU bounded by bytes, and a directory on disk shared by the workers on a
+node. Each artifact carries a strong ETag (sha256 of its bytes) for conditional GETs.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger("render_cache")
+
+# Bump when renderer output changes so stale artifacts stop matching
+RENDERER_VERSION = "4"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def make_etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, `*` matches anything."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class RenderCache:
+    def __init__(self, max_bytes: int, disk_dir: Optional[str], disk_max_bytes: int):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._mem: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._renders: Dict[str, asyncio.Future] = {}
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        if disk_dir:
+            try:
+                os.makedirs(disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning("Render cache disk tier disabled (%s): %s", disk_dir, e)
+                self.disk_dir = None
+
+    @staticmethod
+    def key(revision_id: str, fmt: str, meta_version: int = 0) -> str:
+        return f"{revision_id}-{fmt.lower()}-m{int(meta_version or 0)}-r{RENDERER_VERSION}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".bin")
+
+    def _remember(self, key: str, data: bytes, etag: str) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old[0])
+        self._mem[key] = (data, etag)
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.max_bytes and self._mem:
+            _, (evicted, _) = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        # Write-then-rename so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning("Render cache write failed for %s: %s", key, e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        try:
+            entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".bin")]
+            sizes = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        except OSError:
+            return
+        total = sum(s for _, s, _ in sizes)
+        for _, size, path in sorted(sizes):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    async def lookup(self, key: str) -> Optional[Tuple[bytes, str]]:
+        hit = self._mem.get(key)
+        if hit is not None:
+            self._mem.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return hit
+        if self.disk_dir:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                etag = make_etag(data)
+                self._remember(key, data, etag)
+                self._counters["disk_hits"] += 1
+                return data, etag
+        self._counters["misses"] += 1
+        return None
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[Union[bytes, str]]]) -> Tuple[bytes, str]:
+        """Cached artifact for `key`, rendering it once (concurrent callers share the render)."""
+        hit = await self.lookup(key)
+        if hit is not None:
+            return hit
+        pending = self._renders.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request doing the render went away; render it ourselves
+                return await self.get_or_render(key, render)
+        fut = asyncio.get_running_loop().create_future()
+        self._renders[key] = fut
+        try:
+            out = await render()
+            data = out.encode("utf-8") if isinstance(out, str) else (out or b"")
+            etag = await self.put(key, data)
+            fut.set_result((data, etag))
+            return data, etag
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Mark retrieved so an unawaited failure isn't logged as never retrieved
+            fut.exception()
+            raise
+        finally:
+            self._renders.pop(key, None)
+
+    async def put(self, key: str, data: bytes) -> str:
+        """Store an artifact rendered elsewhere (e.g. collected while streaming); returns its ETag."""
+        etag = make_etag(data)
+        self._remember(key, data, etag)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, data)
+        return etag
+
+    def invalidate(self, revision_id: str) -> None:
+        """Drop every artifact of a revision from both tiers."""
+        prefix = f"{revision_id}-"
+        for key in [k for k in self._mem if k.startswith(prefix)]:
+            data, _ = self._mem.pop(key)
+            self._mem_bytes -= len(data)
+        if self.disk_dir:
+            try:
+                for e in os.scandir(self.disk_dir):
+                    if e.name.startswith(prefix):
+                        os.unlink(e.path)
+            except OSError:
+                pass
+
+    def snapshot(self) -> dict:
+        return {**self._counters, "entries": len(self._mem), "memory_bytes": self._mem_bytes, "disk": bool(self.disk_dir)}
+
+
+def _disk_dir() -> Optional[str]:
+    raw = os.getenv("RENDER_CACHE_DIR")
+    if raw is None:
+        return os.path.join(tempfile.gettempdir(), "exceptionals-render-cache")
+    return raw.strip() or None  # empty string disables the disk tier
+
+
+render_cache = RenderCache(
+    max_bytes=_env_int("RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    disk_dir=_disk_dir(),
+    disk_max_bytes=_env_int("RENDER_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024),
+)
@@ -0,0 +1,127 @@
+"""
+Process pool for rendering revisions off the event loop.
+
+ReportLab (and HTML/Markdown for large revisions) is CPU-bound; run inline it stalls
+every request on the worker. Renders go to a small ProcessPoolExecutor behind an
+admission counter: when every worker is busy and the backlog is full, callers get a
+503 with Retry-After instead of queueing without bound. A render that runs past its
+timeout fails the request but keeps its slot until the process actually finishes, so
+a stuck render can't oversubscribe the pool.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+
+from fastapi import HTTPException
+
+from utils.doc_ir import DocumentIR
+from utils.doc_templates import render_html, render_markdown, render_pdf
+
+logger = logging.getLogger("render_pool")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _render(fmt: str, project_id: str, results: Union[DocumentIR, List[dict]], project_name: Optional[str], project_description: Optional[str], revision_id: Optional[str]) -> Union[str, bytes]:
+    # Runs in a pool process; module-level so it pickles
+    renderer = {"PDF": render_pdf, "MARKDOWN": render_markdown}.get(fmt, render_html)
+    return renderer(project_id, results, project_name=project_name, project_description=project_description, revision_id=revision_id)
+
+
+class RenderPool:
+    def __init__(self, workers: int, max_pending: int, timeout: float, inline_max_items: int, start_method: str = "spawn"):
+        self.workers = max(0, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.timeout = timeout
+        self.inline_max_items = inline_max_items
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._busy = 0
+        self._counters = {"rendered": 0, "inline": 0, "rejected": 0, "timeouts": 0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # fork would copy the event loop, DB client and HF client into every worker
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+        return self._executor
+
+    def retry_after(self) -> int:
+        return max(1, int(self.timeout / 4))
+
+    async def render(
+        self,
+        fmt: str,
+        project_id: str,
+        results: Union[DocumentIR, List[dict]],
+        project_name: Optional[str] = None,
+        project_description: Optional[str] = None,
+        revision_id: Optional[str] = None,
+    ) -> Union[str, bytes]:
+        args = (fmt, project_id, results, project_name, project_description, revision_id)
+        items = results.item_count if isinstance(results, DocumentIR) else len(results)
+        # Small HTML/Markdown renders cost less than shipping the rows to another process
+        if self.workers == 0 or (fmt != "PDF" and items <= self.inline_max_items):
+            self._counters["inline"] += 1
+            return _render(*args)
+        if self._busy >= self.max_pending:
+            self._counters["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Renderer is busy, please retry shortly",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        self._busy += 1
+        fut = asyncio.get_running_loop().run_in_executor(self._pool(), _render, *args)
+
+        def _release(f):
+            self._busy -= 1
+            if not f.cancelled():
+                f.exception()  # retrieved, even if the caller already gave up
+        fut.add_done_callback(_release)
+        try:
+            out = await asyncio.wait_for(asyncio.shield(fut), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            logger.warning("Render of revision %s (%s, %d items) timed out after %.0fs", revision_id, fmt, items, self.timeout)
+            raise HTTPException(
+                status_code=503,
+                detail="Rendering took too long, please retry later",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        self._counters["rendered"] += 1
+        return out
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        return {**self._counters, "workers": self.workers, "busy": self._busy, "max_pending": self.max_pending}
+
+
+render_pool = RenderPool(
+    workers=_env_int("RENDER_POOL_WORKERS", min(2, os.cpu_count() or 1)),
+    max_pending=_env_int("RENDER_POOL_MAX_PENDING", 2 * min(2, os.cpu_count() or 1)),
+    timeout=_env_float("RENDER_TIMEOUT_SECONDS", 120.0),
+    inline_max_items=_env_int("RENDER_INLINE_MAX_ITEMS", 200),
+    start_method=os.getenv("RENDER_POOL_START_METHOD", "spawn"),
+)
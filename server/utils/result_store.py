@@ -0,0 +1,176 @@
+"""
+Content-addressed storage for documentation results (db.documentation_items).
+
+Each result row (name, type, file, parent_class, original_code, generated_docstring) is
+stored once under the sha256 of its content; revisions keep an ordered `result_refs`
+list instead of embedding every row. Unchanged items are shared by all revisions that
+contain them, so storage grows with unique content rather than revision count.
+
+Items also keep the raw model output and the docstring pre-cleaned from it for every
+output format, computed once here on the write path; renderers ask for them with
+`variants=True` and do no cleaning at view time.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from utils.doc_ir import DOCSTRINGS_VERSION, docstring_variants
+from utils.index_common import FETCH_CHUNK, chunks
+
+ITEM_FIELDS = ("name", "type", "file", "parent_class", "original_code", "generated_docstring")
+VARIANT_FIELDS = ("docstrings", "docstrings_version")
+
+
+def item_hash(row: Dict[str, Any]) -> str:
+    values = [row.get(f) for f in ITEM_FIELDS]
+    if row.get("raw_docstring") is not None:
+        # Only rows that carry raw output hash it, so older items keep their refs
+        values.append(row["raw_docstring"])
+    canonical = json.dumps(values, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _variants(row: Dict[str, Any]) -> Dict[str, str]:
+    """Per-format docstrings, cleaned from the raw model output when the row has it.
+
+    generated_docstring already went through the HTML cleaner; cleaning that again
+    for Markdown would lose the markup Markdown keeps.
+    """
+    raw = row.get("raw_docstring")
+    return docstring_variants((raw if raw is not None else row.get("generated_docstring") or "").strip())
+
+
+async def store_results(db, results: List[Dict[str, Any]]) -> List[str]:
+    """Upsert result rows by content hash; returns their refs in order.
+
+    Every stored ref gets a fresh `last_referenced_at`, which is what collecting
+    unreferenced items measures its grace period from. Docstring variants are only
+    computed for items not stored yet.
+    """
+    refs = [item_hash(r) for r in results]
+    unique = {}
+    for ref, row in zip(refs, results):
+        unique.setdefault(ref, row)
+    now = datetime.utcnow()
+    existing = set()
+    for chunk in chunks(list(unique), FETCH_CHUNK):
+        # Touch first: once refreshed, the collector no longer deletes an item we count as stored
+        await db.documentation_items.update_many({"_id": {"$in": chunk}}, {"$set": {"last_referenced_at": now}})
+        async for item in db.documentation_items.find({"_id": {"$in": chunk}}, {"_id": 1}):
+            existing.add(item["_id"])
+    ops = [
+        UpdateOne(
+            {"_id": ref},
+            {
+                "$setOnInsert": {
+                    **{f: row.get(f) for f in ITEM_FIELDS},
+                    "raw_docstring": row.get("raw_docstring"),
+                    "docstrings": _variants(row),
+                    "docstrings_version": DOCSTRINGS_VERSION,
+                    "created_at": now,
+                },
+                "$set": {"last_referenced_at": now},
+            },
+            upsert=True,
+        )
+        for ref, row in unique.items()
+        if ref not in existing
+    ]
+    for chunk in chunks(ops, FETCH_CHUNK):
+        await db.documentation_items.bulk_write(chunk, ordered=False)
+    return refs
+
+
+async def load_results(db, refs: List[str], variants: bool = False) -> List[Dict[str, Any]]:
+    """Resolve refs with batched $in fetches, preserving order (and duplicates).
+    `variants` adds the pre-cleaned per-format docstrings for rendering."""
+    found: Dict[str, Dict[str, Any]] = {}
+    wanted = list(dict.fromkeys(refs))
+    projection = {f: 1 for f in ITEM_FIELDS + (VARIANT_FIELDS if variants else ())}
+    for chunk in chunks(wanted, FETCH_CHUNK):
+        async for item in db.documentation_items.find({"_id": {"$in": chunk}}, projection):
+            found[item.pop("_id")] = item
+    return [dict(found[r]) for r in refs if r in found]
+
+
+async def resolve_revision_results(db, doc: Dict[str, Any], variants: bool = False) -> List[Dict[str, Any]]:
+    """Results of a revision document, whether stored by reference or (older revisions) embedded."""
+    refs = doc.get("result_refs")
+    if refs is not None:
+        return await load_results(db, refs, variants)
+    return doc.get("results") or []
+
+
+def without_variants(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows as API responses show them (rendering-only fields dropped)."""
+    return [{k: v for k, v in r.items() if k not in VARIANT_FIELDS} for r in rows]
+
+
+async def migrate_embedded_results(db, batch: int = 50) -> int:
+    """Move embedded `results` of older revisions into the item store. Returns revisions migrated."""
+    migrated = 0
+    cursor = db.documentations.find({"results": {"$exists": True}, "result_refs": {"$exists": False}}, {"results": 1}).batch_size(batch)
+    async for doc in cursor:
+        refs = await store_results(db, doc.get("results") or [])
+        await db.documentations.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"result_refs": refs, "item_count": len(refs)}, "$unset": {"results": ""}},
+        )
+        migrated += 1
+    return migrated
+
+
+async def backfill_docstring_variants(db, batch: int = 500) -> int:
+    """Add (or refresh stale) per-format docstrings on items stored without them. Returns items updated."""
+    updated = 0
+    query = {"docstrings_version": {"$ne": DOCSTRINGS_VERSION}}
+    cursor = db.documentation_items.find(query, {"generated_docstring": 1, "raw_docstring": 1}).batch_size(batch)
+    ops: List[UpdateOne] = []
+    async for item in cursor:
+        ops.append(UpdateOne(
+            {"_id": item["_id"]},
+            {"$set": {"docstrings": _variants(item), "docstrings_version": DOCSTRINGS_VERSION}},
+        ))
+        if len(ops) >= batch:
+            await db.documentation_items.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await db.documentation_items.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+def _stale_filter(cutoff: datetime) -> Dict[str, Any]:
+    """Items not stored or re-referenced since `cutoff` (older items only have created_at)."""
+    return {"$or": [
+        {"last_referenced_at": {"$lt": cutoff}},
+        {"last_referenced_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+    ]}
+
+
+async def collect_unreferenced_items(db, grace: timedelta = timedelta(hours=1)) -> int:
+    """
+    Delete items no revision points to. Items stored or re-referenced within `grace`
+    are kept: a generation stores its items just before inserting the revision that
+    references them, and an old item it reuses must not go in between.
+    """
+    referenced = set()
+    # Archived revisions keep their refs in the archive
+    for revisions in (db.documentations, db.documentation_archive):
+        async for doc in revisions.find({"result_refs": {"$exists": True}}, {"result_refs": 1}):
+            referenced.update(doc.get("result_refs") or [])
+    stale: List[str] = []
+    stale_filter = _stale_filter(datetime.utcnow() - grace)
+    async for item in db.documentation_items.find(stale_filter, {"_id": 1}):
+        if item["_id"] not in referenced:
+            stale.append(item["_id"])
+    deleted = 0
+    for chunk in chunks(stale, FETCH_CHUNK):
+        # Re-check staleness: an item reused since the scan has been touched and stays
+        res = await db.documentation_items.delete_many({"_id": {"$in": chunk}, **stale_filter})
+        deleted += res.deleted_count or 0
+    return deleted
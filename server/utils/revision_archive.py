@@ -0,0 +1,204 @@
+"""
+Revision retention: older revisions move to a compressed archive and come back on access.
+
+Each project keeps its REVISION_RETENTION_KEEP newest revisions, plus every pinned one,
+fully in db.documentations. The background compactor moves the remaining revisions'
+bulky fields into db.documentation_archive. These fields are result refs, preference
+snapshots, file lists and generation stats, stored as one zlib-compressed BSON blob.
+What stays behind is a small stub (`archived: true`) holding the fields that revision
+listings show, so listings, pagination and the search index need no changes.
+
+Reads that need a whole revision go through find_revision, which re-hydrates an archived
+one: its fields are restored, the archive entry is dropped and `rehydrated_at` keeps the
+compactor off it for REVISION_REHYDRATED_HOLD_SECONDS. The archive keeps result refs
+uncompressed too, so collecting unreferenced items still sees what archived revisions use.
+
+Every API worker starts the compactor, but a pass only runs under a lease in
+db.maintenance_leases, so one worker compacts per interval.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger("revision_archive")
+
+ARCHIVE_CODEC = "zlib+bson"
+COMPACTOR_LEASE = "revision_compactor"
+COMPRESSION_LEVEL = 6
+
+# Stay on the stub: what listings, the picker and the throughput estimator read
+HOT_FIELDS = frozenset((
+    "_id", "project_id", "format", "created_at", "created_at_iso", "item_count", "generation_time_seconds",
+    "title", "filename", "description", "project_name", "user_id", "meta_version", "pinned", "throughput",
+))
+_STATE_FIELDS = ("archived", "archived_at", "rehydrated_at")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def retention_keep() -> int:
+    """Newest revisions kept hot per project; 0 disables archiving."""
+    return max(0, _env_int("REVISION_RETENTION_KEEP", 20))
+
+
+def compact_interval() -> int:
+    """Seconds between background compaction passes; 0 leaves compaction to the admin endpoint."""
+    return max(0, _env_int("REVISION_COMPACT_INTERVAL_SECONDS", 3600))
+
+
+def split_revision(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(hot fields, cold fields) of a full revision document."""
+    hot = {k: v for k, v in doc.items() if k in HOT_FIELDS}
+    cold = {k: v for k, v in doc.items() if k not in HOT_FIELDS and k not in _STATE_FIELDS}
+    if hot.get("item_count") is None:
+        # Revisions from before the item store only embed their rows
+        hot["item_count"] = len(doc.get("result_refs") or doc.get("results") or [])
+    return hot, cold
+
+
+def pack(cold: Dict[str, Any]) -> bytes:
+    return zlib.compress(bson.encode(cold), COMPRESSION_LEVEL)
+
+
+def unpack(blob: bytes) -> Dict[str, Any]:
+    return bson.decode(zlib.decompress(blob))
+
+
+def select_for_archive(revisions: List[Dict[str, Any]], keep: int, now: float, hold: float) -> List[Any]:
+    """Ids to archive from one project's revisions, newest first.
+
+    The `keep` newest always stay, pinned ones stay, and so do revisions re-hydrated
+    less than `hold` seconds ago (they were just read; archiving them would thrash).
+    """
+    return [
+        r["_id"] for r in revisions[keep:]
+        if not r.get("archived") and not r.get("pinned") and now - (r.get("rehydrated_at") or 0) >= hold
+    ]
+
+
+async def archive_revision(db, revision_id) -> bool:
+    """Move one revision's cold fields into the archive. False if it is gone or already archived."""
+    doc = await db.documentations.find_one({"_id": revision_id, "archived": {"$ne": True}})
+    if not doc:
+        return False
+    hot, cold = split_revision(doc)
+    blob = pack(cold)
+    # Archive first: a crash in between leaves a full revision and a stale (overwritten later) archive
+    await db.documentation_archive.replace_one(
+        {"_id": revision_id},
+        {
+            "_id": revision_id,
+            "project_id": hot.get("project_id"),
+            "created_at": hot.get("created_at"),
+            "archived_at": time.time(),
+            "codec": ARCHIVE_CODEC,
+            "result_refs": cold.get("result_refs") or [],
+            "raw_bytes": len(bson.encode(cold)),
+            "blob": Binary(blob),
+        },
+        upsert=True,
+    )
+    res = await db.documentations.update_one(
+        {"_id": revision_id, "archived": {"$ne": True}},
+        {
+            "$set": {"archived": True, "archived_at": time.time(), "item_count": hot["item_count"]},
+            "$unset": {**{k: "" for k in cold}, "rehydrated_at": ""},
+        },
+    )
+    return res.modified_count > 0
+
+
+async def rehydrate_revision(db, revision_id) -> None:
+    """Restore an archived revision's fields into db.documentations."""
+    entry = await db.documentation_archive.find_one({"_id": revision_id})
+    if entry is None:
+        # Re-hydrated concurrently, or never archived
+        return
+    cold = unpack(entry["blob"])
+    await db.documentations.update_one(
+        {"_id": revision_id, "archived": True},
+        {"$set": {**cold, "rehydrated_at": time.time()}, "$unset": {"archived": "", "archived_at": ""}},
+    )
+    await db.documentation_archive.delete_one({"_id": revision_id})
+
+
+async def find_revision(db, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """find_one on db.documentations that re-hydrates an archived revision first."""
+    if projection and any(v for v in projection.values()):
+        # Inclusion projection: the archived flag has to come along
+        projection = {**projection, "archived": 1}
+    doc = await db.documentations.find_one(query, projection)
+    if doc is None or not doc.get("archived"):
+        return doc
+    await rehydrate_revision(db, doc["_id"])
+    return await db.documentations.find_one(query, projection)
+
+
+async def compact_revisions(db, keep: Optional[int] = None, hold: Optional[float] = None) -> Dict[str, int]:
+    """One compaction pass over every project. Returns counts of projects seen and revisions archived."""
+    keep = retention_keep() if keep is None else keep
+    hold = float(_env_int("REVISION_REHYDRATED_HOLD_SECONDS", 86400)) if hold is None else hold
+    stats = {"projects": 0, "archived": 0}
+    if keep <= 0:
+        return stats
+    for project_id in await db.documentations.distinct("project_id"):
+        stats["projects"] += 1
+        cursor = db.documentations.find(
+            {"project_id": project_id}, {"_id": 1, "archived": 1, "pinned": 1, "rehydrated_at": 1}
+        ).sort([("created_at", -1), ("_id", -1)])
+        revisions = await cursor.to_list(length=None)
+        for revision_id in select_for_archive(revisions, keep, time.time(), hold):
+            if await archive_revision(db, revision_id):
+                stats["archived"] += 1
+    return stats
+
+
+async def acquire_lease(db, name: str, owner: str, seconds: float) -> bool:
+    """Take or renew a named lease; False while another owner holds an unexpired one."""
+    now = datetime.utcnow()
+    try:
+        await db.maintenance_leases.update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds), "renewed_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Held by someone else: the filter missed the existing document and the upsert collided
+        return False
+    return True
+
+
+async def run_compactor(db, interval: Optional[float] = None, owner: Optional[str] = None) -> None:
+    """Background loop for the server lifespan; cancel it to stop.
+
+    The lease outlives one interval, so its holder keeps it by renewing each pass and
+    another worker takes over only after the holder missed a pass.
+    """
+    interval = compact_interval() if interval is None else interval
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    while True:
+        try:
+            if await acquire_lease(db, COMPACTOR_LEASE, owner, interval * 2):
+                stats = await compact_revisions(db)
+                if stats["archived"]:
+                    logger.info("Archived %d revisions across %d projects", stats["archived"], stats["projects"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Revision compaction failed: %s", e)
+        await asyncio.sleep(interval)
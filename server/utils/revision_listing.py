@@ -0,0 +1,80 @@
+"""
+Summary listing of documentation revisions with keyset (cursor) pagination.
+
+List endpoints project only the fields a revision picker shows; results, rendered
+content, binaries and preference snapshots stay in Mongo. Pages are ordered by
+(created_at, _id) descending and continue from an opaque cursor, so deep pages cost
+the same as the first one.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+SUMMARY_PROJECTION = {
+    "_id": 1,
+    "project_id": 1,
+    "format": 1,
+    "created_at": 1,
+    "created_at_iso": 1,
+    "generation_time_seconds": 1,
+    "title": 1,
+    "filename": 1,
+    "project_name": 1,
+    "user_id": 1,
+    "pinned": 1,
+    "archived": 1,
+    # Revisions written before the item store embed their rows instead of counting them
+    "item_count": {"$ifNull": ["$item_count", {"$size": {"$ifNull": ["$results", []]}}]},
+}
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    raw = json.dumps([doc.get("created_at"), str(doc["_id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, oid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return created_at, ObjectId(oid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(MAX_LIMIT, int(limit or DEFAULT_LIMIT)))
+
+
+async def list_revision_summaries(
+    db,
+    query: Dict[str, Any],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of revision summaries (newest first) and the cursor for the next page."""
+    limit = clamp_limit(limit)
+    filt = dict(query)
+    if cursor:
+        created_at, oid = decode_cursor(cursor)
+        filt["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": oid}},
+        ]
+    docs = await (
+        db.documentations.find(filt, SUMMARY_PROJECTION)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    page = docs[:limit]
+    for d in page:
+        d["id"] = str(d.pop("_id"))
+    return page, next_cursor
@@ -0,0 +1,82 @@
+"""
+Outline and item pages of a revision for the lazily loaded documentation viewer.
+
+The viewer gets the table of contents (names, kinds, files, anchors) up front and
+fetches item bodies a page at a time, or the page that holds an anchor, instead of the
+whole results array plus a rendered copy of it. Entries follow the rendered document's
+reading order (functions, then each class followed by its methods), and each carries
+its `index` in that order so a client can tell which page to ask for.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils.doc_ir import HTML, MARKDOWN, DocItem, DocumentIR
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+_Card = Tuple[str, str, Optional[DocItem], str, str]  # anchor, title, item, name, file
+
+
+def clamp_page_size(page_size: Optional[int]) -> int:
+    return max(1, min(MAX_PAGE_SIZE, int(page_size or DEFAULT_PAGE_SIZE)))
+
+
+def _cards(document: DocumentIR) -> List[_Card]:
+    files = {cls.anchor: (cls.methods[0].file if cls.methods else "") for cls in document.classes if cls.item is None}
+    return [
+        (anchor, title, item, item.name if item is not None else title, item.file if item is not None else files.get(anchor, ""))
+        for anchor, title, item in document.cards()
+    ]
+
+
+def _entry(index: int, card: _Card) -> Dict[str, Any]:
+    anchor, title, item, name, file = card
+    return {
+        "index": index,
+        "anchor": anchor,
+        "title": title,
+        "name": name,
+        "kind": item.kind if item is not None else "class",
+        "file": file,
+        "parent_class": item.parent_class if item is not None else None,
+    }
+
+
+def table_of_contents(document: DocumentIR) -> Dict[str, Any]:
+    cards = _cards(document)
+    entries = [_entry(i, c) for i, c in enumerate(cards)]
+    functions = entries[:len(document.functions)]
+    classes: List[Dict[str, Any]] = []
+    i = len(functions)
+    for cls in document.classes:
+        classes.append({**entries[i], "methods": entries[i + 1:i + 1 + len(cls.methods)]})
+        i += 1 + len(cls.methods)
+    return {"item_count": document.item_count, "entries": len(entries), "functions": functions, "classes": classes}
+
+
+def page_of_anchor(document: DocumentIR, anchor: str, page_size: int) -> int:
+    for i, (card_anchor, _, _) in enumerate(document.cards()):
+        if card_anchor == anchor:
+            return i // page_size
+    raise HTTPException(status_code=404, detail="Item not found in revision")
+
+
+def item_page(document: DocumentIR, page: int, page_size: int, fmt: str) -> Dict[str, Any]:
+    """Bodies of one page of entries; docstrings are prepared for the revision's format."""
+    cards = _cards(document)
+    pages = max(1, -(-len(cards) // page_size))
+    if page < 0 or page >= pages:
+        raise HTTPException(status_code=404, detail="Page out of range")
+    text_fmt = MARKDOWN if fmt == "MARKDOWN" else HTML
+    start = page * page_size
+    items = []
+    for i, card in enumerate(cards[start:start + page_size], start):
+        item = card[2]
+        items.append({
+            **_entry(i, card),
+            "code": item.code if item is not None else "",
+            "docstring": item.text(text_fmt)[1] if item is not None else "",
+        })
+    return {"page": page, "page_size": page_size, "pages": pages, "total": len(cards), "items": items}
@@ -0,0 +1,200 @@
+"""
+Full-text search over generated documentation (db.documentation_search).
+
+One entry per (project, result item): name, parent class, file, kind and the docstring
+as plain text, plus `keywords` with camelCase/snake_case names split into words. Result
+items are content-addressed (see result_store), so an item unchanged across revisions
+is one entry listing every revision it appears in (`revision_ids`); `latest_revision_id`
+is the newest of them. Saving a revision upserts only its own items, and deleting
+revisions pulls them from their entries.
+
+Queries use the weighted text index "search_text", whose project_id prefix keeps each
+search inside one project's entries. Hits rank by text score, then most recently seen.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import DeleteOne, UpdateOne
+
+from utils.doc_ir import HTML, clean_docstring_for
+from utils.index_common import FETCH_CHUNK, chunks, tokenize
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_QUERY_LENGTH = 200
+SNIPPET_CHARS = 200
+
+
+_ws_re = re.compile(r"\s+")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(MAX_LIMIT, int(limit or DEFAULT_LIMIT)))
+
+
+def entry_fields(project_id: str, ref: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Searchable fields of one stored result item."""
+    name = item.get("name") or ""
+    parent = item.get("parent_class") or ""
+    file = item.get("file") or ""
+    docstring = (item.get("docstrings") or {}).get(HTML)
+    if docstring is None:
+        docstring = clean_docstring_for(HTML, item.get("generated_docstring") or "")
+    return {
+        "project_id": project_id,
+        "ref": ref,
+        "name": name,
+        "parent_class": parent or None,
+        "file": file,
+        "kind": item.get("type") or "function",
+        "keywords": " ".join(dict.fromkeys(tokenize(f"{name} {parent} {file}"))),
+        "docstring": docstring,
+    }
+
+
+def index_updates(
+    project_id: str, revision_id: str, created_at: float, items: Dict[str, Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """(filter, pipeline) upserts adding one revision to the entries of its items (ref -> item)."""
+    updates = []
+    for ref, item in items.items():
+        newer = {"$gte": [created_at, {"$ifNull": ["$last_seen", created_at]}]}
+        # Pipeline update: revisions can be indexed out of order (backfill)
+        updates.append(({"_id": f"{project_id}:{ref}"}, [{"$set": {
+            # $literal: a docstring starting with "$" must not read as a field path
+            **{k: {"$literal": v} for k, v in entry_fields(project_id, ref, item).items()},
+            "revision_ids": {"$setUnion": [{"$ifNull": ["$revision_ids", []]}, [revision_id]]},
+            "latest_revision_id": {"$cond": [newer, revision_id, "$latest_revision_id"]},
+            "last_seen": {"$max": [{"$ifNull": ["$last_seen", created_at]}, created_at]},
+        }}]))
+    return updates
+
+
+def index_ops(project_id: str, revision_id: str, created_at: float, items: Dict[str, Dict[str, Any]]) -> List[UpdateOne]:
+    return [UpdateOne(f, u, upsert=True) for f, u in index_updates(project_id, revision_id, created_at, items)]
+
+
+async def _items_by_ref(db, refs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    found: Dict[str, Dict[str, Any]] = {}
+    projection = {"name": 1, "type": 1, "file": 1, "parent_class": 1, "generated_docstring": 1, "docstrings": 1}
+    for chunk in chunks(list(dict.fromkeys(refs)), FETCH_CHUNK):
+        async for item in db.documentation_items.find({"_id": {"$in": chunk}}, projection):
+            found[item.pop("_id")] = item
+    return found
+
+
+async def index_revision(db, project_id: str, revision_id: str, created_at: float, refs: List[str]) -> int:
+    """Add a saved revision's items to the search index. Returns entries written."""
+    ops = index_ops(project_id, revision_id, created_at, await _items_by_ref(db, refs))
+    for chunk in chunks(ops, FETCH_CHUNK):
+        await db.documentation_search.bulk_write(chunk, ordered=False)
+    return len(ops)
+
+
+async def unindex_revisions(db, revision_ids: List[str]) -> None:
+    """Drop deleted revisions from their entries, and entries no revision holds any more."""
+    gone = set(revision_ids)
+    for chunk in chunks(list(gone), FETCH_CHUNK):
+        ops = []
+        cursor = db.documentation_search.find(
+            {"revision_ids": {"$in": chunk}}, {"revision_ids": 1, "latest_revision_id": 1}
+        )
+        async for entry in cursor:
+            left = [r for r in entry.get("revision_ids") or [] if r not in gone]
+            if not left:
+                ops.append(DeleteOne({"_id": entry["_id"]}))
+                continue
+            update: Dict[str, Any] = {"revision_ids": left}
+            if entry.get("latest_revision_id") in gone:
+                update["latest_revision_id"] = await _newest_revision(db, left)
+            ops.append(UpdateOne({"_id": entry["_id"]}, {"$set": update}))
+        for op_chunk in chunks(ops, FETCH_CHUNK):
+            await db.documentation_search.bulk_write(op_chunk, ordered=False)
+
+
+async def _newest_revision(db, revision_ids: List[str]) -> str:
+    oids = [ObjectId(r) for r in revision_ids if ObjectId.is_valid(r)]
+    doc = await db.documentations.find_one({"_id": {"$in": oids}}, {"_id": 1}, sort=[("created_at", -1)])
+    return str(doc["_id"]) if doc else revision_ids[-1]
+
+
+async def unindex_projects(db, project_ids: List[str]) -> None:
+    await db.documentation_search.delete_many({"project_id": {"$in": project_ids}})
+
+
+async def rebuild_search_index(db, batch: int = 50) -> int:
+    """Index every stored revision (entries are upserts, so reruns are harmless). Returns revisions indexed."""
+    indexed = 0
+    cursor = db.documentations.find(
+        {"result_refs": {"$exists": True}}, {"project_id": 1, "created_at": 1, "result_refs": 1}
+    ).batch_size(batch)
+    async for doc in cursor:
+        await index_revision(db, doc.get("project_id"), str(doc["_id"]), doc.get("created_at") or 0, doc.get("result_refs") or [])
+        indexed += 1
+    return indexed
+
+
+def search_filter(project_id: str, q: str, revision_id: Optional[str] = None) -> Dict[str, Any]:
+    q = _ws_re.sub(" ", (q or "")).strip()[:MAX_QUERY_LENGTH]
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    # Split identifiers too, so "getUser" also matches "get_user" and "get user"
+    words = set(q.lower().split())
+    terms = " ".join([q] + [t for t in dict.fromkeys(tokenize(q)) if t not in words])
+    query: Dict[str, Any] = {"project_id": project_id, "$text": {"$search": terms}}
+    if revision_id:
+        query["revision_ids"] = revision_id
+    return query
+
+
+def snippet(text: str, q: str, width: int = SNIPPET_CHARS) -> str:
+    """Docstring excerpt around the first query term found, else its start."""
+    flat = _ws_re.sub(" ", text or "").strip()
+    if len(flat) <= width:
+        return flat
+    lower = flat.lower()
+    hits = [i for i in (lower.find(t) for t in tokenize(q)) if i >= 0]
+    start = max(0, min(hits) - width // 4) if hits else 0
+    start = min(start, len(flat) - width)
+    out = flat[start:start + width]
+    return ("…" if start else "") + out + ("…" if start + width < len(flat) else "")
+
+
+def _hit(entry: Dict[str, Any], q: str) -> Dict[str, Any]:
+    return {
+        "name": entry.get("name"),
+        "kind": entry.get("kind"),
+        "file": entry.get("file"),
+        "parent_class": entry.get("parent_class"),
+        "snippet": snippet(entry.get("docstring") or "", q),
+        "score": round(entry.get("score") or 0.0, 3),
+        "latest_revision_id": entry.get("latest_revision_id"),
+        "revision_count": entry.get("revision_count") or 0,
+    }
+
+
+async def search(db, project_id: str, q: str, page: int = 0, limit: Optional[int] = None, revision_id: Optional[str] = None) -> Dict[str, Any]:
+    limit = clamp_limit(limit)
+    page = max(0, int(page or 0))
+    query = search_filter(project_id, q, revision_id)
+    projection = {
+        "name": 1, "kind": 1, "file": 1, "parent_class": 1, "docstring": 1, "latest_revision_id": 1,
+        "revision_count": {"$size": "$revision_ids"}, "score": {"$meta": "textScore"},
+    }
+    cursor = (
+        db.documentation_search.find(query, projection)
+        .sort([("score", {"$meta": "textScore"}), ("last_seen", -1), ("_id", 1)])
+        .skip(page * limit)
+        .limit(limit + 1)
+    )
+    rows = await cursor.to_list(length=limit + 1)
+    # One extra row tells whether there is a next page without counting every match
+    return {
+        "query": q,
+        "page": page,
+        "limit": limit,
+        "has_more": len(rows) > limit,
+        "results": [_hit(r, q) for r in rows[:limit]],
+    }
@@ -0,0 +1,230 @@
+"""
+Static multi-page documentation site, packaged as a zip.
+
+One page per source file (its functions, classes and methods) plus an index page and a
+compact search index, so large projects don't load as one monolithic HTML page and can
+be searched offline. The index is written as search.json and, because browsers won't
+fetch local JSON from file:// pages, also as search-index.js for the bundled search box.
+
+The zip is written by a worker thread into a bounded queue that the HTTP response
+drains, so bytes go out while later pages are still being rendered (see stream_site_zip).
+"""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import zipfile
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from utils.doc_ir import HTML, DocItem, DocumentIR
+from utils.index_common import tokenize
+
+SEARCH_INDEX_VERSION = 1
+
+_slug_re = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _page_name(file: str) -> str:
+    # Readable and collision-free: two paths can slug the same
+    digest = hashlib.sha1(file.encode("utf-8")).hexdigest()[:8]
+    return f"files/{_slug_re.sub('-', file).strip('-')[:80] or 'module'}-{digest}.html"
+
+
+def _esc(text: str) -> str:
+    return (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def _by_file(document: DocumentIR) -> Dict[str, List[Tuple[str, str, Optional[DocItem], int]]]:
+    """file -> its cards (anchor, title, item, depth) in reading order."""
+    files: Dict[str, List[Tuple[str, str, Optional[DocItem], int]]] = defaultdict(list)
+    for it in document.functions:
+        files[it.file].append((it.anchor, it.title, it, 0))
+    for cls in document.classes:
+        file = cls.item.file if cls.item is not None else (cls.methods[0].file if cls.methods else "")
+        files[file].append((cls.anchor, cls.name, cls.item, 0))
+        for m in cls.methods:
+            files[file].append((m.anchor, m.title, m, 1))
+    return dict(sorted(files.items()))
+
+
+def build_search_index(document: DocumentIR) -> dict:
+    """{"docs": [[title, kind, url, file]], "terms": {term: [doc ids]}}: compact, no bodies."""
+    docs: List[list] = []
+    terms: Dict[str, List[int]] = defaultdict(list)
+    for file, cards in _by_file(document).items():
+        page = _page_name(file)
+        for anchor, title, item, _ in cards:
+            doc_id = len(docs)
+            docs.append([title, item.kind if item is not None else "class", f"{page}#{anchor}", file])
+            text = " ".join([title, file, item.docstring if item is not None else ""])
+            for term in dict.fromkeys(tokenize(text)):
+                terms[term].append(doc_id)
+    return {"v": SEARCH_INDEX_VERSION, "docs": docs, "terms": dict(sorted(terms.items()))}
+
+
+_STYLE = """
+body{font-family:Arial,Helvetica,sans-serif;margin:24px;color:#111827}
+a{color:#1f2937}
+.meta{color:#6b7280;font-size:12px}
+.layout{display:grid;grid-template-columns:260px 1fr;gap:16px}
+nav{border:1px solid #e5e7eb;border-radius:8px;padding:12px;position:sticky;top:16px;max-height:calc(100vh - 64px);overflow:auto}
+nav a{display:block;text-decoration:none;padding:3px 0;font-size:14px}
+nav a.sub{padding-left:12px;color:#4b5563}
+.item-card{border:1px solid #e5e7eb;border-radius:8px;padding:16px;margin:16px 0}
+.item-title{font-weight:600;margin-bottom:8px}
+pre{white-space:pre-wrap}
+.code{background:#f5f5f5;padding:12px;border-radius:6px;overflow:auto}
+.doc{padding:12px;border:1px solid #e5e7eb;border-radius:6px}
+#q{width:100%;padding:6px;margin:8px 0}
+#results li{margin:4px 0}
+"""
+
+_SEARCH_JS = """
+(function(){
+  var idx = window.SEARCH_INDEX, q = document.getElementById("q"), out = document.getElementById("results");
+  if (!idx || !q) return;
+  function terms(s){ return (s.replace(/([a-z0-9])([A-Z])/g, "$1 $2").toLowerCase().match(/[a-z0-9]+/g) || []).filter(function(t){ return t.length > 1; }); }
+  q.addEventListener("input", function(){
+    var ts = terms(q.value), scores = {};
+    ts.forEach(function(t){
+      Object.keys(idx.terms).forEach(function(k){
+        if (k.indexOf(t) === 0) idx.terms[k].forEach(function(d){ scores[d] = (scores[d] || 0) + (k === t ? 2 : 1); });
+      });
+    });
+    var ids = Object.keys(scores).sort(function(a, b){ return scores[b] - scores[a]; }).slice(0, 50);
+    out.innerHTML = "";
+    ids.forEach(function(id){
+      var d = idx.docs[id], li = document.createElement("li"), a = document.createElement("a");
+      a.href = d[2]; a.textContent = d[0] + " (" + d[1] + ", " + d[3] + ")"; li.appendChild(a); out.appendChild(li);
+    });
+  });
+})();
+"""
+
+
+def _page(title: str, body: str, root: str) -> str:
+    return (
+        f"<!doctype html><html><head><meta charset=\"utf-8\" /><title>{_esc(title)}</title>"
+        f"<link rel=\"stylesheet\" href=\"{root}assets/style.css\" /></head><body>{body}</body></html>"
+    )
+
+
+def iter_site_files(
+    project_id: str,
+    document: DocumentIR,
+    *,
+    project_name: Optional[str] = None,
+    project_description: Optional[str] = None,
+    revision_id: Optional[str] = None,
+) -> Iterator[Tuple[str, str]]:
+    """(path, content) for every file of the site; pages are rendered as they are consumed."""
+    ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    title = project_name or f"Project {project_id}"
+    files = _by_file(document)
+    index = build_search_index(document)
+
+    yield "assets/style.css", _STYLE
+    yield "assets/search.js", _SEARCH_JS
+    compact = json.dumps(index, separators=(",", ":"), ensure_ascii=False)
+    yield "search.json", compact
+    yield "search-index.js", f"window.SEARCH_INDEX={compact};"
+
+    file_links = "".join(
+        f"<li><a href=\"{_page_name(f)}\">{_esc(f or '(unknown file)')}</a> <span class=\"meta\">{len(cards)} items</span></li>"
+        for f, cards in files.items()
+    )
+    yield "index.html", _page(title, (
+        f"<header><h1>{_esc(title)}</h1><div class=\"meta\">Version: {_esc(revision_id or 'N/A')} • Generated at: {ts}</div>"
+        f"<p>{_esc(project_description or 'No description provided.')}</p></header>"
+        "<input id=\"q\" type=\"search\" placeholder=\"Search names and docstrings\" autofocus />"
+        "<ul id=\"results\"></ul>"
+        f"<h2>Files</h2><ul>{file_links}</ul>"
+        "<script src=\"search-index.js\"></script><script src=\"assets/search.js\"></script>"
+    ), "")
+
+    for file, cards in files.items():
+        nav = "".join(
+            f"<a href=\"#{anchor}\" class=\"{'sub' if depth else ''}\">{_esc(item.name if item is not None and depth else title_txt)}</a>"
+            for anchor, title_txt, item, depth in cards
+        )
+        sections = []
+        for anchor, title_txt, item, _ in cards:
+            code, doc = item.text(HTML) if item is not None else ("", "")
+            sections.append(
+                f"<section class=\"item-card\" id=\"{anchor}\"><div class=\"item-title\">{_esc(title_txt)}</div>"
+                + (f"<pre class=\"code\">{code}</pre>" if code else "")
+                + (f"<pre class=\"doc\">{_esc(doc)}</pre>" if doc else "")
+                + "</section>"
+            )
+        yield _page_name(file), _page(f"{file} - {title}", (
+            f"<header><a href=\"../index.html\">{_esc(title)}</a><h1>{_esc(file or '(unknown file)')}</h1></header>"
+            f"<div class=\"layout\"><nav>{nav}</nav><main>{''.join(sections)}</main></div>"
+        ), "../")
+
+
+class _QueueWriter:
+    """Write-only file object handing bytes to an asyncio queue from a worker thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, cancelled: threading.Event):
+        self._loop = loop
+        self._queue = queue
+        self._cancelled = cancelled
+        self._pos = 0
+
+    def write(self, data) -> int:
+        if self._cancelled.is_set():
+            raise OSError("site export cancelled")
+        data = bytes(data)
+        if data:
+            # Blocks while the queue is full: the zip is written no faster than it is sent
+            asyncio.run_coroutine_threadsafe(self._queue.put(data), self._loop).result()
+            self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+
+def write_site_zip(fileobj, files: Iterator[Tuple[str, str]]) -> None:
+    # zipfile handles unseekable outputs by writing data descriptors after each entry
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, content in files:
+            zf.writestr(path, content)
+
+
+async def stream_site_zip(files: Iterator[Tuple[str, str]], max_pending: int = 16) -> AsyncIterator[bytes]:
+    """Zip bytes as a worker thread writes them; closing the iterator stops the worker."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    cancelled = threading.Event()
+    done = object()
+
+    def build():
+        try:
+            write_site_zip(_QueueWriter(loop, queue, cancelled), files)
+        finally:
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    worker = loop.run_in_executor(None, build)
+    # A worker stopped by cancellation fails; don't log that as never retrieved
+    worker.add_done_callback(lambda f: f.cancelled() or f.exception())
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        await worker  # surfaces a failed build
+    finally:
+        if not worker.done():
+            cancelled.set()
+            # Unblock a writer waiting on the full queue
+            while not queue.empty():
+                queue.get_nowait()
@@ -0,0 +1,135 @@
+"""
+Flat index of the functions, classes and methods of uploaded files (db.symbols).
+
+File documents nest their symbols, so any lookup by name meant loading whole files.
+Each symbol here is one small document: project_id, file_id, file, kind, name,
+qualified_name (Class.method for methods), parent_class, code_hash (sha256 of its code)
+and its line span. Uploads write a file's symbols right after the file is inserted, and
+file and project deletes remove them.
+
+Prefix lookups go through lowercased copies of name and qualified_name, so
+`^prefix` regexes on them are case-insensitive and still bounded index scans.
+"""
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+KINDS = ("function", "class", "method")
+_BATCH = 1000
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256((code or "").encode("utf-8")).hexdigest()
+
+
+def _symbol(project_id: str, file_id: str, filename: str, kind: str, entry: Dict[str, Any], parent: Optional[str] = None) -> Dict[str, Any]:
+    name = entry.get("name") or ""
+    qualified = f"{parent}.{name}" if parent else name
+    return {
+        "project_id": project_id,
+        "file_id": file_id,
+        "file": filename,
+        "kind": kind,
+        "name": name,
+        "qualified_name": qualified,
+        "parent_class": parent,
+        "name_lower": name.lower(),
+        "qualified_lower": qualified.lower(),
+        "code_hash": code_hash(entry.get("code") or ""),
+        # Files uploaded before spans were parsed have none
+        "lineno": entry.get("lineno"),
+        "end_lineno": entry.get("end_lineno"),
+    }
+
+
+def file_symbols(file_doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Symbol documents of one stored file, in source order per kind."""
+    project_id, file_id, filename = file_doc.get("project_id"), str(file_doc["_id"]), file_doc.get("filename") or ""
+    rows = [_symbol(project_id, file_id, filename, "function", f) for f in file_doc.get("functions") or []]
+    for cls in file_doc.get("classes") or []:
+        rows.append(_symbol(project_id, file_id, filename, "class", cls))
+        rows.extend(
+            _symbol(project_id, file_id, filename, "method", m, parent=cls.get("name"))
+            for m in cls.get("methods") or []
+        )
+    return rows
+
+
+async def index_files(db, file_docs: Iterable[Dict[str, Any]]) -> int:
+    """(Re)write the symbols of stored files. Returns symbols written."""
+    file_docs = list(file_docs)
+    if not file_docs:
+        return 0
+    await unindex_files(db, [str(f["_id"]) for f in file_docs])
+    rows = [row for f in file_docs for row in file_symbols(f)]
+    for i in range(0, len(rows), _BATCH):
+        await db.symbols.insert_many(rows[i:i + _BATCH], ordered=False)
+    return len(rows)
+
+
+async def unindex_files(db, file_ids: List[str]) -> None:
+    for i in range(0, len(file_ids), _BATCH):
+        await db.symbols.delete_many({"file_id": {"$in": file_ids[i:i + _BATCH]}})
+
+
+async def rebuild_symbol_index(db, batch: int = 100) -> int:
+    """Rewrite every file's symbols and drop symbols of files that no longer exist. Returns files indexed."""
+    indexed = 0
+    file_ids: List[str] = []
+    pending: List[Dict[str, Any]] = []
+    cursor = db.files.find({}, {"project_id": 1, "filename": 1, "functions": 1, "classes": 1}).batch_size(batch)
+    async for f in cursor:
+        pending.append(f)
+        file_ids.append(str(f["_id"]))
+        if len(pending) >= batch:
+            await index_files(db, pending)
+            indexed += len(pending)
+            pending = []
+    await index_files(db, pending)
+    indexed += len(pending)
+    live = set(file_ids)
+    await unindex_files(db, [fid for fid in await db.symbols.distinct("file_id") if fid not in live])
+    return indexed
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(MAX_LIMIT, int(limit or DEFAULT_LIMIT)))
+
+
+def prefix_query(prefix: str, project_id: Optional[str] = None, kind: Optional[str] = None, file: Optional[str] = None) -> Dict[str, Any]:
+    """Filter for symbols whose name (or Class.method when the prefix has a dot) starts with `prefix`."""
+    prefix = (prefix or "").strip()
+    if not prefix:
+        raise HTTPException(status_code=400, detail="Symbol prefix is required")
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    field = "qualified_lower" if "." in prefix else "name_lower"
+    query: Dict[str, Any] = {field: {"$regex": "^" + re.escape(prefix.lower())}}
+    if project_id is not None:
+        query["project_id"] = project_id
+    if kind:
+        query["kind"] = kind
+    if file:
+        query["file"] = file
+    return query
+
+
+_PUBLIC = {
+    "project_id": 1, "file_id": 1, "file": 1, "kind": 1, "name": 1, "qualified_name": 1,
+    "parent_class": 1, "code_hash": 1, "lineno": 1, "end_lineno": 1,
+}
+
+
+async def find_symbols(db, prefix: str, project_id: Optional[str] = None, kind: Optional[str] = None, file: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    query = prefix_query(prefix, project_id, kind, file)
+    sort_field = "qualified_lower" if "qualified_lower" in query else "name_lower"
+    limit = clamp_limit(limit)
+    cursor = db.symbols.find(query, _PUBLIC).sort([(sort_field, 1), ("file", 1), ("lineno", 1)]).limit(limit)
+    rows = await cursor.to_list(length=limit)
+    for r in rows:
+        r["id"] = str(r.pop("_id"))
+    return rows
@@ -1,3 +1,4 @@
+from typing import Optional
 from fastapi import APIRouter, Depends
 from controller.AuthController import get_current_user
 from utils.db import get_db
@@ -11,6 +12,7 @@ from controller.AdminController import (
     cleanup_orphaned_files as ctl_cleanup_orphans,
     cleanup_orphaned_projects as ctl_cleanup_orphaned_projects,
     cleanup_orphaned_documentations as ctl_cleanup_orphaned_docs,
+    migrate_documentation_results as ctl_migrate_documentation_results,
     list_documentations as ctl_list_documentations,
     admin_delete_documentation as ctl_delete_documentation,
     admin_get_documentation as ctl_get_documentation,
@@ -18,7 +20,12 @@ from controller.AdminController import (
     admin_delete_all_projects as ctl_delete_all_projects,
     admin_delete_all_files as ctl_delete_all_files,
     admin_delete_all_documentations as ctl_delete_all_documentations,
+    admin_find_symbols as ctl_find_symbols,
+    admin_rebuild_symbols as ctl_rebuild_symbols,
+    compact_documentations as ctl_compact_documentations,
 )
+from utils.revision_listing import DEFAULT_LIMIT
+from utils.symbol_index import DEFAULT_LIMIT as SYMBOL_LIMIT
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -69,10 +76,19 @@ async def admin_delete_all_files(db=Depends(get_db), current_user=Depends(get_cu
 async def cleanup_orphaned_files(db=Depends(get_db), current_user=Depends(get_current_user)):
     return await ctl_cleanup_orphans(db, current_user)
 
+# Symbols
+@router.get("/symbols")
+async def find_symbols(prefix: str, kind: Optional[str] = None, project_id: Optional[str] = None, limit: int = SYMBOL_LIMIT, db=Depends(get_db), current_user=Depends(get_current_user)):
+    return await ctl_find_symbols(db, current_user, prefix, kind, project_id, limit)
+
+@router.post("/symbols/rebuild")
+async def rebuild_symbols(db=Depends(get_db), current_user=Depends(get_current_user)):
+    return await ctl_rebuild_symbols(db, current_user)
+
 # Documentations
 @router.get("/documentations")
-async def list_documentations(db=Depends(get_db), current_user=Depends(get_current_user)):
-    return await ctl_list_documentations(db, current_user)
+async def list_documentations(limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None, project_id: Optional[str] = None, db=Depends(get_db), current_user=Depends(get_current_user)):
+    return await ctl_list_documentations(db, current_user, limit, cursor, project_id)
 
 @router.get("/documentations/{revision_id}")
 async def get_documentation(revision_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
@@ -89,3 +105,11 @@ async def admin_delete_all_documentations(db=Depends(get_db), current_user=Depen
 @router.post("/documentations/cleanup-orphans")
 async def cleanup_orphaned_documentations(db=Depends(get_db), current_user=Depends(get_current_user)):
     return await ctl_cleanup_orphaned_docs(db, current_user)
+
+@router.post("/documentations/migrate-results")
+async def migrate_documentation_results(db=Depends(get_db), current_user=Depends(get_current_user)):
+    return await ctl_migrate_documentation_results(db, current_user)
+
+@router.post("/documentations/compact")
+async def compact_documentations(keep: Optional[int] = None, db=Depends(get_db), current_user=Depends(get_current_user)):
+    return await ctl_compact_documentations(db, current_user, keep)
@@ -1,29 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from fastapi.responses import JSONResponse, Response
-from controller.DocumentationController import plan_documentation_generation, generate_documentation_with_hf
-from model.DocumentationModel import DocumentationPlan, DocumentationGenerationResponse
+from fastapi import APIRouter, Depends, HTTPException, Body, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from controller.DocumentationController import plan_documentation_generation, estimate_documentation_generation, generate_documentation_single_flight, cancel_generation, get_generation_run, _make_prompt_for_item
+from model.DocumentationModel import DocumentationPlan, DocumentationGenerationResponse, DocstringItem
 from controller.AuthController import get_current_user
 from utils.db import get_db
 from utils.project_verification import get_and_check_project_ownership
 import logging
 from bson import ObjectId
-from utils.doc_templates import render_html, render_markdown, render_pdf
+from utils.render_pool import render_pool
+from utils.doc_templates import iter_html, iter_markdown
+from utils.doc_ir import DocumentIR, build_document, document_cache
+from starlette.concurrency import iterate_in_threadpool
+from utils.render_cache import render_cache, make_etag, etag_matches
+from utils.result_store import resolve_revision_results, without_variants
+from utils.revision_archive import find_revision
+from utils.revision_listing import DEFAULT_LIMIT, list_revision_summaries
+from utils.site_export import iter_site_files, stream_site_zip
+from utils import search_index
+from utils.revision_viewer import DEFAULT_PAGE_SIZE, clamp_page_size, item_page, page_of_anchor, table_of_contents
 import os
 # New imports for demo endpoint
-from utils.hf_client import hf_generate_batch_async
+from utils.hf_client import hf_generate_coalesced_async, hf_warmup_async, hf_health, HFCircuitOpenError
+from utils.inference_scheduler import inference_job, INTERACTIVE
 from utils.doc_cleaner import clean_docstring
 from utils.parser import extract_functions_classes_from_content
 import asyncio
+import json
 import httpx
+from typing import Iterator, Optional
 
 logger = logging.getLogger("documentation")
 
 router = APIRouter(prefix="/documentation", tags=["documentation"])
 
 @router.get("/projects/{project_id}/plan", response_model=DocumentationPlan)
-async def get_documentation_plan(project_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+async def get_documentation_plan(project_id: str, batch_size: int = 4, db=Depends(get_db), current_user=Depends(get_current_user)):
     await get_and_check_project_ownership(project_id, db, current_user)
     plan = await plan_documentation_generation(project_id, db)
+    # Expected duration/batches/tokens for the run, from past runs and live endpoint metrics
+    try:
+        plan.estimate = await estimate_documentation_generation(plan, db, batch_size=_effective_batch_size(batch_size))
+    except Exception as e:
+        logger.warning(f"[PLAN] Could not estimate generation for project={project_id}: {e}")
     # Disable caching so client always gets fresh counts
     return JSONResponse(
         content=plan.model_dump(),
@@ -33,10 +52,79 @@ async def get_documentation_plan(project_id: str, db=Depends(get_db), current_us
         },
     )
 
+def _effective_batch_size(batch_size: int) -> int:
+    # Allow server to pick an effective batch size when client doesn't specify
+    try:
+        env_bs = int(os.getenv("HF_BATCH_SIZE", "8"))
+    except Exception:
+        env_bs = 8
+    return max(1, min(64, batch_size or env_bs))
+
+_background_runs: set = set()
+
+def _ndjson_line(obj: dict) -> bytes:
+    return (json.dumps(obj, default=str) + "\n").encode("utf-8")
+
+async def _ndjson_generation(project_id: str, run) -> StreamingResponse:
+    """
+    Run a generation with a results callback and stream its rows as NDJSON.
+    Errors raised before anything was produced keep their HTTP status; later ones
+    become a final {"event": "error"} line.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    gone = False
+
+    async def on_results(rows):
+        # The run outlives a disconnected client; its rows must not pile up here
+        if gone:
+            return
+        for r in rows:
+            queue.put_nowait({"event": "item", **r})
+
+    async def runner():
+        try:
+            resp = await run(on_results)
+            queue.put_nowait({"event": "summary", **resp.model_dump(exclude={"results"})})
+        except HTTPException as e:
+            queue.put_nowait({"event": "error", "status_code": e.status_code, "detail": e.detail, "headers": e.headers})
+        except Exception as e:
+            logger.exception(f"[GEN] Streaming generation failed: {e}")
+            queue.put_nowait({"event": "error", "status_code": 500, "detail": "Generation failed"})
+        finally:
+            queue.put_nowait(None)
+
+    # Not tied to the client connection: a disconnect doesn't throw away a paid-for run
+    task = asyncio.create_task(runner())
+    _background_runs.add(task)
+    task.add_done_callback(_background_runs.discard)
+    first = await queue.get()
+    if first is not None and first.get("event") == "error":
+        await task
+        raise HTTPException(status_code=first["status_code"], detail=first["detail"], headers=first.get("headers"))
+
+    async def body():
+        nonlocal gone
+        msg = first
+        try:
+            while msg is not None:
+                yield _ndjson_line(msg)
+                msg = await queue.get()
+        finally:
+            gone = True
+            active = get_generation_run(project_id)
+            if active is not None:
+                active.unsubscribe(on_results)
+            while not queue.empty():
+                queue.get_nowait()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 @router.post("/projects/{project_id}/generate", response_model=DocumentationGenerationResponse)
 async def generate_documentation(
     project_id: str,
     batch_size: int = 4,
+    stream: bool = False,
+    force: bool = False,
     opts: dict = Body(default={}),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
@@ -62,124 +150,316 @@ async def generate_documentation(
           if "clean_up_tokenization_spaces" in opts:
             params["clean_up_tokenization_spaces"] = bool(opts.get("clean_up_tokenization_spaces"))
 
-      # Allow server to pick an effective batch size when client doesn't specify
-      try:
-        env_bs = int(os.getenv("HF_BATCH_SIZE", "8"))
-      except Exception:
-        env_bs = 8
-      eff_bs = batch_size or env_bs
-      eff_bs = max(1, min(64, eff_bs))
+      eff_bs = _effective_batch_size(batch_size)
+
+      # Pick up where an interrupted run with the same inputs left off unless told otherwise
+      resume = bool(opts.get("resume", True)) if isinstance(opts, dict) else True
+      # A second request for the same project joins the running generation unless forced
+      force = force or (bool(opts.get("force")) if isinstance(opts, dict) else False)
 
-      resp = await generate_documentation_with_hf(project_id, db, batch_size=eff_bs, parameters=params, created_by=created_by)
+      # NDJSON: one line per item as its batch returns, then a summary line with the revision id
+      if stream or (isinstance(opts, dict) and bool(opts.get("stream"))):
+        async def run(on_results):
+          return await generate_documentation_single_flight(
+            project_id, db, force=force, on_results=on_results, include_results=False,
+            batch_size=eff_bs, parameters=params, created_by=created_by, resume=resume,
+          )
+        return await _ndjson_generation(project_id, run)
+
+      resp = await generate_documentation_single_flight(
+        project_id, db, force=force, batch_size=eff_bs, parameters=params, created_by=created_by, resume=resume,
+      )
       logger.info(f"[GEN] Completed generation for project={project_id}, items={len(resp.results)}")
       return resp
     except Exception as e:
       logger.exception(f"[GEN] Generation failed for project={project_id}: {e}")
       raise
 
+@router.get("/projects/{project_id}/generate/status")
+async def generation_status(project_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+    await get_and_check_project_ownership(project_id, db, current_user)
+    run = get_generation_run(project_id)
+    return run.info() if run else {"project_id": project_id, "running": False}
+
+@router.post("/projects/{project_id}/generate/cancel")
+async def cancel_documentation_generation(project_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Stop the running generation for this project and free its inference capacity."""
+    await get_and_check_project_ownership(project_id, db, current_user)
+    cancelled = await cancel_generation(project_id)
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="No generation is running for this project")
+    return {"project_id": project_id, "cancelled": True}
+
 @router.get("/projects/{project_id}/revisions")
-async def list_revisions(project_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+async def list_revisions(project_id: str, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None, db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Summary fields only, newest first; pass `next_cursor` back as `cursor` for older revisions."""
+    await get_and_check_project_ownership(project_id, db, current_user)
+    docs, next_cursor = await list_revision_summaries(db, {"project_id": project_id}, limit, cursor)
+    return {"project_id": project_id, "revisions": docs, "next_cursor": next_cursor}
+
+_MEDIA_TYPES = {"PDF": "application/pdf", "MARKDOWN": "text/markdown", "HTML": "text/html"}
+
+def _revision_fmt(doc: dict) -> str:
+    fmt = (doc.get("format") or "HTML").upper()
+    return fmt if fmt in _MEDIA_TYPES else "HTML"
+
+async def _revision_document(db, revision_id: str, doc: dict, results: Optional[list] = None) -> DocumentIR:
+    """Grouped, ordered document model of a revision; built once and shared by every format."""
+    document = document_cache.get(revision_id)
+    if document is None:
+        rows = results if results is not None else await resolve_revision_results(db, doc, variants=True)
+        document = document_cache.put(revision_id, await asyncio.to_thread(build_document, rows))
+    return document
+
+async def _render_revision(db, project_id: str, revision_id: str, doc: dict, fmt: str, results: Optional[list] = None):
+    """Rendered bytes and ETag of a revision, from the render cache when possible."""
+    async def render():
+        document = await _revision_document(db, revision_id, doc, results)
+        # Determine title/description to use
+        title_override = doc.get("title") or doc.get("project_name")
+        desc_override = doc.get("description") or (doc.get("preferences_snapshot") or {}).get("project_description")
+        # Off the event loop; 503 + Retry-After when the render pool is saturated
+        return await render_pool.render(fmt, project_id, document, project_name=title_override, project_description=desc_override, revision_id=revision_id)
+    return await render_cache.get_or_render(render_cache.key(revision_id, fmt, doc.get("meta_version", 0)), render)
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+@router.get("/projects/{project_id}/search")
+async def search_project_documentation(
+    project_id: str,
+    q: str,
+    page: int = 0,
+    limit: int = search_index.DEFAULT_LIMIT,
+    revision_id: Optional[str] = None,
+    db=Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Ranked full-text search over the project's documented items, across all revisions or one."""
     await get_and_check_project_ownership(project_id, db, current_user)
-    docs = await db.documentations.find({"project_id": project_id}).sort("created_at", -1).to_list(length=None)
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-        # include elapsed time if present
-        if "generation_time_seconds" in d:
-            d["generation_time_seconds"] = d.get("generation_time_seconds")
-        # do not send binary content in the list
-        d.pop("binary", None)
-        # trim content in list view
-        if isinstance(d.get("content"), str) and len(d["content"]) > 500:
-            d["content"] = d["content"][:500] + "..."
-    return {"project_id": project_id, "revisions": docs}
+    return await search_index.search(db, project_id, q, page, limit, revision_id)
 
 @router.get("/projects/{project_id}/revisions/{revision_id}")
-async def get_revision(project_id: str, revision_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+async def get_revision(project_id: str, revision_id: str, if_none_match: Optional[str] = Header(default=None), db=Depends(get_db), current_user=Depends(get_current_user)):
     await get_and_check_project_ownership(project_id, db, current_user)
-    doc = await db.documentations.find_one({"_id": ObjectId(revision_id), "project_id": project_id})
+    doc = await find_revision(db, {"_id": ObjectId(revision_id), "project_id": project_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Revision not found")
     doc["id"] = str(doc.pop("_id"))
-    fmt = (doc.get("format") or "HTML").upper()
+    fmt = _revision_fmt(doc)
+    key = render_cache.key(revision_id, fmt, doc.get("meta_version", 0))
+
+    # The response only changes with its metadata version and rendered content
+    def response_etag(content_etag: str) -> str:
+        return make_etag(f"{key}:{content_etag}".encode("utf-8"))
+
+    if fmt == "PDF":
+        etag = response_etag("")
+    else:
+        cached = await render_cache.lookup(key)
+        etag = response_etag(cached[1]) if cached else None
+    if etag and etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    # Loaded with the pre-cleaned docstrings, which the render below uses and the response drops
+    results = await resolve_revision_results(db, doc, variants=True)
+    doc.pop("result_refs", None)
+    doc["results"] = without_variants(results)
 
     # pass through elapsed time if stored
     if "generation_time_seconds" in doc:
         doc["generation_time_seconds"] = doc.get("generation_time_seconds")
 
-    # Determine title/description to use
-    title_override = doc.get("title") or doc.get("project_name")
-    desc_override = doc.get("description") or (doc.get("preferences_snapshot") or {}).get("project_description")
-
-    # Generate content on the fly for preview (non-PDF)
+    # Preview content for non-PDF formats; PDF is fetched via download
     if fmt == "PDF":
         doc.pop("binary", None)
         doc["download_url"] = f"/api/documentation/projects/{project_id}/revisions/{revision_id}/download"
-    elif fmt == "MARKDOWN":
-        content = render_markdown(project_id, doc.get("results") or [], project_name=title_override, project_description=desc_override, revision_id=revision_id)
-        doc["content"] = content
-        doc["content_type"] = "text/markdown"
     else:
-        html = render_html(project_id, doc.get("results") or [], project_name=title_override, project_description=desc_override, revision_id=revision_id)
-        doc["content"] = html
-        doc["content_type"] = "text/html"
+        content, content_etag = await _render_revision(db, project_id, revision_id, doc, fmt, results)
+        doc["content"] = content.decode("utf-8")
+        doc["content_type"] = _MEDIA_TYPES[fmt]
+        etag = response_etag(content_etag)
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+    return JSONResponse(content=jsonable_encoder(doc), headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+# Revision metadata without the (potentially huge) result refs and stored artifacts
+_VIEWER_PROJECTION = {"result_refs": 0, "results": 0, "binary": 0, "content": 0}
+
+async def _viewer_revision(db, project_id: str, revision_id: str) -> dict:
+    doc = await find_revision(db, {"_id": ObjectId(revision_id), "project_id": project_id}, _VIEWER_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Revision not found")
     return doc
 
+async def _viewer_document(db, revision_id: str, doc: dict) -> DocumentIR:
+    document = document_cache.get(revision_id)
+    if document is None:
+        # Only now fetch what the projection left out
+        refs = await find_revision(db, {"_id": doc["_id"]}, {"result_refs": 1, "results": 1})
+        document = await _revision_document(db, revision_id, refs or {})
+    return document
+
+async def _cached_json(key: str, if_none_match: Optional[str], build) -> Response:
+    """JSON body built once per key and served from the render cache, with ETag/304."""
+    async def render():
+        return json.dumps(jsonable_encoder(await build()))
+    body, etag = await render_cache.get_or_render(key, render)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+@router.get("/projects/{project_id}/revisions/{revision_id}/toc")
+async def get_revision_toc(project_id: str, revision_id: str, if_none_match: Optional[str] = Header(default=None), db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Revision metadata and table of contents; item bodies come from /items."""
+    await get_and_check_project_ownership(project_id, db, current_user)
+    doc = await _viewer_revision(db, project_id, revision_id)
+
+    async def build():
+        document = await _viewer_document(db, revision_id, doc)
+        meta = {k: v for k, v in doc.items() if k not in ("_id", "preferences_snapshot")}
+        return {**meta, "id": revision_id, "format": _revision_fmt(doc), "page_size": DEFAULT_PAGE_SIZE, "toc": table_of_contents(document)}
+    return await _cached_json(render_cache.key(revision_id, "toc", doc.get("meta_version", 0)), if_none_match, build)
+
+@router.get("/projects/{project_id}/revisions/{revision_id}/items")
+async def get_revision_items(
+    project_id: str,
+    revision_id: str,
+    page: int = 0,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    anchor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    db=Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """One page of item bodies in reading order; `anchor` selects the page holding that item."""
+    await get_and_check_project_ownership(project_id, db, current_user)
+    doc = await _viewer_revision(db, project_id, revision_id)
+    fmt = _revision_fmt(doc)
+    size = clamp_page_size(page_size)
+    if anchor:
+        page = page_of_anchor(await _viewer_document(db, revision_id, doc), anchor, size)
+
+    async def build():
+        return item_page(await _viewer_document(db, revision_id, doc), page, size, fmt)
+    # Item bodies never change within a revision, whatever its metadata version
+    return await _cached_json(render_cache.key(revision_id, f"items-{fmt}-p{page}-n{size}"), if_none_match, build)
+
 @router.patch("/projects/{project_id}/revisions/{revision_id}")
 async def update_revision_metadata(project_id: str, revision_id: str, payload: dict = Body(default={}), db=Depends(get_db), current_user=Depends(get_current_user)):
     await get_and_check_project_ownership(project_id, db, current_user)
     allowed = {"title", "filename", "description"}
     update = {k: v for k, v in (payload or {}).items() if k in allowed and isinstance(v, str)}
-    if not update:
+    pinned = (payload or {}).get("pinned")
+    if not update and not isinstance(pinned, bool):
         raise HTTPException(status_code=400, detail="No valid fields to update")
-    res = await db.documentations.update_one({"_id": ObjectId(revision_id), "project_id": project_id}, {"$set": update})
+    query = {"_id": ObjectId(revision_id), "project_id": project_id}
+    if isinstance(pinned, bool):
+        # Pinned revisions are never archived; pinning an archived one brings it back
+        if pinned and not await find_revision(db, query, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Revision not found")
+        update["pinned"] = pinned
+    # meta_version moves rendered artifacts and revision ETags to a new cache key
+    res = await db.documentations.update_one(query, {"$set": update, "$inc": {"meta_version": 1}})
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="Revision not found")
+    render_cache.invalidate(revision_id)
     return {"updated": True, "fields": list(update.keys())}
 
 @router.get("/projects/{project_id}/revisions/{revision_id}/download")
-async def download_revision(project_id: str, revision_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+async def download_revision(project_id: str, revision_id: str, if_none_match: Optional[str] = Header(default=None), db=Depends(get_db), current_user=Depends(get_current_user)):
     await get_and_check_project_ownership(project_id, db, current_user)
-    doc = await db.documentations.find_one({"_id": ObjectId(revision_id), "project_id": project_id})
+    doc = await find_revision(db, {"_id": ObjectId(revision_id), "project_id": project_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Revision not found")
-    fmt = (doc.get("format") or "HTML").upper()
+    fmt = _revision_fmt(doc)
     default_name = f"documentation_{project_id}_{revision_id}.{ 'pdf' if fmt == 'PDF' else ('md' if fmt == 'MARKDOWN' else 'html') }"
     filename = doc.get("filename") or default_name
 
-    # Determine title/description
-    title_override = (doc.get("title") or doc.get("project_name"))
+    key = render_cache.key(revision_id, fmt, doc.get("meta_version", 0))
+    cached = await render_cache.lookup(key)
+    if cached and etag_matches(if_none_match, cached[1]):
+        return _not_modified(cached[1])
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Cache-Control": "private, no-cache"}
+    if cached is None and fmt != "PDF":
+        # Stream HTML/Markdown as it renders; the ETag is only known once it is cached
+        return StreamingResponse(_stream_revision(db, project_id, revision_id, doc, fmt, key), media_type=_MEDIA_TYPES[fmt], headers=headers)
+    body, etag = cached or await _render_revision(db, project_id, revision_id, doc, fmt)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    return Response(content=body, media_type=_MEDIA_TYPES[fmt], headers={**headers, "ETag": etag})
+
+@router.get("/projects/{project_id}/revisions/{revision_id}/export/site")
+async def export_revision_site(project_id: str, revision_id: str, if_none_match: Optional[str] = Header(default=None), db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Static multi-page site (one page per source file, offline search index) as a zip."""
+    await get_and_check_project_ownership(project_id, db, current_user)
+    doc = await _viewer_revision(db, project_id, revision_id)
+    base = (doc.get("filename") or f"documentation_{project_id}_{revision_id}").rsplit(".", 1)[0]
+    headers = {"Content-Disposition": f"attachment; filename={base}-site.zip", "Cache-Control": "private, no-cache"}
+    key = render_cache.key(revision_id, "site", doc.get("meta_version", 0))
+    cached = await render_cache.lookup(key)
+    if cached is not None:
+        if etag_matches(if_none_match, cached[1]):
+            return _not_modified(cached[1])
+        return Response(content=cached[0], media_type="application/zip", headers={**headers, "ETag": cached[1]})
+    document = await _viewer_document(db, revision_id, doc)
+    files = iter_site_files(
+        project_id, document,
+        project_name=doc.get("title") or doc.get("project_name"),
+        project_description=doc.get("description") or (doc.get("preferences_snapshot") or {}).get("project_description"),
+        revision_id=revision_id,
+    )
+    return StreamingResponse(_stream_and_cache(stream_site_zip(files), key), media_type="application/zip", headers=headers)
+
+def _coalesce(chunks: Iterator[str], size: int = 64 * 1024) -> Iterator[str]:
+    # Fewer, larger writes: each chunk costs a threadpool hop and a gzip flush
+    buf, n = [], 0
+    for c in chunks:
+        buf.append(c)
+        n += len(c)
+        if n >= size:
+            yield "".join(buf)
+            buf, n = [], 0
+    if buf:
+        yield "".join(buf)
+
+async def _stream_and_cache(chunks, key: str):
+    """Pass chunks through, then cache the whole artifact under `key` if it fits in memory."""
+    kept, size = [], 0
+    async for data in chunks:
+        if kept is not None:
+            kept.append(data)
+            size += len(data)
+            if size > render_cache.max_bytes:
+                kept = None  # too big for the memory tier; don't hold it all
+        yield data
+    if kept is not None:
+        await render_cache.put(key, b"".join(kept))
+
+async def _stream_revision(db, project_id: str, revision_id: str, doc: dict, fmt: str, key: str):
+    """Render chunks in the threadpool as the client reads them, caching the artifact if it fits."""
+    document = await _revision_document(db, revision_id, doc)
+    title_override = doc.get("title") or doc.get("project_name")
     desc_override = doc.get("description") or (doc.get("preferences_snapshot") or {}).get("project_description")
+    renderer = iter_markdown if fmt == "MARKDOWN" else iter_html
+    chunks = renderer(project_id, document, project_name=title_override, project_description=desc_override, revision_id=revision_id)
 
-    if fmt == "PDF":
-        pdf_bytes = render_pdf(project_id, doc.get("results") or [], project_name=title_override, project_description=desc_override, revision_id=revision_id)
-        return Response(content=pdf_bytes or b"", media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
-    elif fmt == "MARKDOWN":
-        content = render_markdown(project_id, doc.get("results") or [], project_name=title_override, project_description=desc_override, revision_id=revision_id)
-        return Response(content=content or "", media_type="text/markdown", headers={"Content-Disposition": f"attachment; filename={filename}"})
-    else:
-        html = render_html(project_id, doc.get("results") or [], project_name=title_override, project_description=desc_override, revision_id=revision_id)
-        return Response(content=html or "", media_type="text/html", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    async def encoded():
+        async for piece in iterate_in_threadpool(_coalesce(chunks)):
+            yield piece.encode("utf-8")
+    async for data in _stream_and_cache(encoded(), key):
+        yield data
 
 # ---------- Model warmup endpoint (non-blocking) ----------
 @router.post("/warmup")
 async def warmup_model():
     """Kick off a background request to HF endpoint to pre-boot the model.
     Returns immediately; ignores errors (boot unavailability, capacity, etc.).
+    While the inference circuit is half-open this request is the recovery probe.
     """
     async def _do_warmup():
-        prompts = [
-            "Warmup ping: generate a short placeholder docstring.",
-        ]
-        params = {
-            "max_length": 32,
-            "do_sample": False,
-            "temperature": 0.1,
-            "clean_up_tokenization_spaces": True,
-        }
-        try:
-            await hf_generate_batch_async(prompts, parameters=params)
-        except Exception:
-            # Ignore all errors; the purpose is to trigger boot if possible
+        # Ignore all errors; the purpose is to trigger boot if possible
+        if not await hf_warmup_async():
             logger.info("Warmup attempted (may have failed due to capacity/boot)")
 
     try:
@@ -187,7 +467,7 @@ async def warmup_model():
     except Exception:
         # Fallback: just ignore if scheduling fails
         pass
-    return {"status": "scheduled"}
+    return {"status": "scheduled", "circuit": hf_health()["state"]}
 
 # ---------- Public demo endpoint for single/multi-snippet generation ----------
 @router.post("/demo/generate")
@@ -241,23 +521,7 @@ async def generate_demo_docstring(payload: dict = Body(default={})):
             "parent_class": None,
         }]
 
-    def make_prompt(it: dict) -> str:
-        header = f"{it['type'].upper()}: {it['name']}"
-        if it.get("parent_class"):
-            header += f" (class {it['parent_class']})"
-        src = it.get("code") or ""
-        if len(src) > 800:
-            src = src[:800] + "..."
-        return f"""Generate a clear docstring for this {it['type']}:
-
-{header}
-```python
-{src}
-```
-
-Docstring:"""
-
-    prompts = [make_prompt(it) for it in items]
+    prompts = [_make_prompt_for_item(DocstringItem(**it)) for it in items]
 
     params = {
         "max_length": 128,
@@ -266,51 +530,62 @@ Docstring:"""
         "clean_up_tokenization_spaces": True,
     }
 
-    # Try batch generation with graceful retries
-    attempts = 0
-    outputs = None
-    last_exc: Exception | None = None
-    while attempts < 3:
-        try:
-            outputs = await hf_generate_batch_async(prompts, parameters=params)
-            break
-        except httpx.HTTPStatusError as e:
-            last_exc = e
-            # Respect upstream status to drive client UX
-            code_status = getattr(e, "response", None).status_code if getattr(e, "response", None) is not None else 0
-            headers = {}
-            if code_status >= 500:
-                headers["X-Model-Status"] = "booting"
-            elif code_status >= 400:
-                headers["X-Model-Status"] = "paused"
-            # Backoff before retry
-            attempts += 1
-            if attempts >= 3:
-                raise HTTPException(status_code=code_status or 502, detail="Upstream HF error (demo)", headers=headers or None)
-            await asyncio.sleep(2 * attempts)
-        except Exception as e:
-            last_exc = e
-            attempts += 1
-            if attempts >= 3:
-                raise HTTPException(status_code=502, detail=f"Demo generation failed: {str(e)}")
-            await asyncio.sleep(1.5 * attempts)
-
-    # If mismatch, fallback per-item
-    if outputs is None:
-        outputs = []
-    if len(outputs) != len(prompts):
-        fixed = [None] * len(prompts)
-        for idx, p in enumerate(prompts):
+    # Demo calls are small and interactive: served ahead of queued batch work
+    with inference_job("demo", INTERACTIVE) as job:
+        # Try batch generation with graceful retries
+        attempts = 0
+        outputs = None
+        last_exc: Exception | None = None
+        while attempts < 3:
             try:
-                single = await hf_generate_batch_async([p], parameters=params)
-                fixed[idx] = (single[0] if isinstance(single, list) and single else "")
+                outputs = await hf_generate_coalesced_async(prompts, parameters=params)
+                break
+            except HFCircuitOpenError as e:
+                # Endpoint is known to be down; fail fast instead of retrying
+                raise HTTPException(
+                    status_code=503,
+                    detail="Model is unavailable (demo)",
+                    headers={"X-Model-Status": e.model_status, "Retry-After": str(int(e.retry_after))},
+                )
             except httpx.HTTPStatusError as e:
-                # Map headers but continue to fill empty string
-                pass
-            except Exception:
-                pass
-            await asyncio.sleep(0.05)
-        outputs = [o if o is not None else "" for o in fixed]
+                last_exc = e
+                # Respect upstream status to drive client UX
+                code_status = getattr(e, "response", None).status_code if getattr(e, "response", None) is not None else 0
+                headers = {}
+                if code_status >= 500:
+                    headers["X-Model-Status"] = "booting"
+                elif code_status >= 400:
+                    headers["X-Model-Status"] = "paused"
+                # Backoff before retry
+                attempts += 1
+                if attempts >= 3:
+                    raise HTTPException(status_code=code_status or 502, detail="Upstream HF error (demo)", headers=headers or None)
+                await asyncio.sleep(2 * attempts)
+            except Exception as e:
+                last_exc = e
+                attempts += 1
+                if attempts >= 3:
+                    raise HTTPException(status_code=502, detail=f"Demo generation failed: {str(e)}")
+                await asyncio.sleep(1.5 * attempts)
+
+        # If mismatch, fallback per-item
+        if outputs is None:
+            outputs = []
+        if len(outputs) != len(prompts) or any(o is None for o in outputs):
+            fixed = list(outputs) + [None] * (len(prompts) - len(outputs))
+            for idx, p in enumerate(prompts):
+                if fixed[idx] is not None:
+                    continue
+                try:
+                    single = await hf_generate_coalesced_async([p], parameters=params)
+                    fixed[idx] = (single[0] if isinstance(single, list) and single else "")
+                except httpx.HTTPStatusError as e:
+                    # Map headers but continue to fill empty string
+                    pass
+                except Exception:
+                    pass
+                await asyncio.sleep(0.05)
+            outputs = [o if o is not None else "" for o in fixed]
 
     # Build cleaned results
     results = []
@@ -344,4 +619,5 @@ Docstring:"""
         "count": len(results),
         "results": results,
         "extraction": {"functions": func_count, "classes": class_count, "methods": method_count},
+        "queue_wait_seconds": round(job.queue_wait_seconds, 3),
     }
\ No newline at end of file
@@ -1,9 +1,11 @@
+from typing import Optional
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from controller.FileController import delete_project_files, upload_file, get_file, delete_file, upload_project_files, upload_project_zip, get_file_tree, get_files_in_project
 from model.FileModel import FileResponse
 from controller.AuthController import get_current_user
 from utils.db import get_db
 from utils.project_verification import get_and_check_project_ownership
+from utils.symbol_index import DEFAULT_LIMIT, find_symbols
 
 router = APIRouter(prefix="/projects/{project_id}/files", tags=["files"])
 
@@ -42,6 +44,19 @@ async def upload_zip_view(project_id: str, zip_file: UploadFile = File(...), db=
     await get_and_check_project_ownership(project_id, db, current_user)
     return await upload_project_zip(project_id, zip_file, db)
 
+@router.get("/symbols", summary="Find functions, classes and methods by name prefix")
+async def find_symbols_view(
+    project_id: str,
+    prefix: str,
+    kind: Optional[str] = None,
+    file: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    db=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    await get_and_check_project_ownership(project_id, db, current_user)
+    return await find_symbols(db, prefix, project_id=project_id, kind=kind, file=file, limit=limit)
+
 @router.get("/{file_id}", summary="Get a file from a project", response_model=FileResponse)
 async def get_file_view(project_id: str, file_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
     await get_and_check_project_ownership(project_id, db, current_user)
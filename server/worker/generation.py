@@ -0,0 +1,163 @@
+"""
+Generation worker: claims batches from db.generation_tasks and runs them against the
+inference endpoint, so generation scales with workers rather than API pods.
+
+    GENERATION_WORKERS=mongo uvicorn server:app          # API nodes enqueue instead of generating
+    python -m worker.generation --concurrency 4          # one or more workers, any node
+
+Each worker shares one pooled HF client, limiter, scheduler and circuit breaker across
+the tasks it runs.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from utils.generation_queue import claim_task, complete_task, heartbeat, lease_seconds, release_task
+from utils.generation_runner import generate_outputs
+from utils.hf_client import CircuitBreaker, close_hf_client, hf_breaker, hf_warmup_async, start_hf_client
+from utils.inference_scheduler import inference_job
+
+logger = logging.getLogger("worker.generation")
+
+
+def _failure_summary(status) -> Optional[Dict[str, Any]]:
+    if status.circuit_open is not None:
+        return {"circuit_open": {"model_status": status.circuit_open.model_status, "retry_after": status.circuit_open.retry_after}}
+    if status.saw_5xx or status.saw_4xx:
+        return {"saw_5xx": status.saw_5xx, "saw_4xx": status.saw_4xx}
+    return None
+
+
+async def _keep_lease(db, task_id, worker_id: str, lease: float, lost: asyncio.Event) -> None:
+    while True:
+        await asyncio.sleep(lease / 3)
+        if not await heartbeat(db, task_id, worker_id, lease):
+            lost.set()
+            return
+
+
+async def process_task(db, task: Dict[str, Any], worker_id: str, lease: Optional[float] = None) -> bool:
+    """Run one leased batch and write the outputs back. Returns True if the result was accepted."""
+    lease = lease or lease_seconds()
+    lost = asyncio.Event()
+    keeper = asyncio.create_task(_keep_lease(db, task["_id"], worker_id, lease, lost))
+    prompts = task.get("prompts") or []
+    outputs = [None] * len(prompts)
+    queued = max(0.0, ((task.get("claimed_at") or datetime.utcnow()) - task["created_at"]).total_seconds())
+    try:
+        with inference_job(task.get("tenant") or "anonymous", task.get("lane") or "batch") as job:
+            work = asyncio.create_task(generate_outputs(prompts, outputs, task.get("params") or {}, max(1, len(prompts))))
+            lost_wait = asyncio.create_task(lost.wait())
+            done, _ = await asyncio.wait({work, lost_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if work not in done:
+                # Someone else owns the task now; stop spending tokens on it
+                work.cancel()
+                logger.warning("Lease lost for task %s; abandoning", task["_id"])
+                return False
+            lost_wait.cancel()
+            status = work.result()
+        accepted = await complete_task(
+            db, task["_id"], worker_id,
+            [o if o is not None else "" for o in outputs],
+            failure=_failure_summary(status),
+            queue_wait_seconds=round(queued + job.queue_wait_seconds, 3),
+        )
+        if not accepted:
+            logger.warning("Result for task %s rejected (lease expired)", task["_id"])
+        return accepted
+    except asyncio.CancelledError:
+        await release_task(db, task["_id"], worker_id, "worker shutting down")
+        raise
+    except Exception as e:
+        logger.exception("Task %s failed: %s", task["_id"], e)
+        await release_task(db, task["_id"], worker_id, f"{type(e).__name__}: {e}")
+        return False
+    finally:
+        keeper.cancel()
+
+
+async def run_worker(db, worker_id: str, concurrency: int = 2, poll_seconds: float = 1.0, stop: Optional[asyncio.Event] = None, once: bool = False) -> int:
+    """Claim and process tasks until stopped. With once=True, return when the queue is empty."""
+    stop = stop or asyncio.Event()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    running: set = set()
+    processed = 0
+
+    def finished(t: asyncio.Task):
+        nonlocal processed
+        running.discard(t)
+        slots.release()
+        processed += 1
+
+    while not stop.is_set():
+        await slots.acquire()
+        task = None
+        state = hf_breaker.state
+        if state == CircuitBreaker.HALF_OPEN:
+            # Nothing else calls the endpoint here, so probe it ourselves
+            await hf_warmup_async()
+        elif state == CircuitBreaker.CLOSED:
+            try:
+                task = await claim_task(db, worker_id)
+            except Exception as e:
+                logger.warning("Could not claim a task: %s", e)
+        # else: leave tasks in the queue for healthier workers while our breaker is open
+        if task is None:
+            slots.release()
+            if once and not running:
+                break
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        t = asyncio.create_task(process_task(db, task, worker_id))
+        running.add(t)
+        t.add_done_callback(finished)
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Documentation generation worker")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("GENERATION_WORKER_CONCURRENCY", "2")), help="batches processed at once")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between polls when the queue is empty")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is drained")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    from utils.db import db
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def runner():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        await start_hf_client()
+        started = time.monotonic()
+        try:
+            n = await run_worker(db, worker_id, args.concurrency, args.poll, stop=stop, once=args.once)
+        finally:
+            await close_hf_client()
+        logger.info("Worker %s processed %d tasks in %.1fs", worker_id, n, time.monotonic() - started)
+
+    logger.info("Worker %s starting (concurrency=%d)", worker_id, args.concurrency)
+    asyncio.run(runner())
+
+
+if __name__ == "__main__":
+    main()